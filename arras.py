@@ -7,35 +7,151 @@ Usage:
 
 Opens http://localhost:7280 showing arras.io/#wpd with a YOLO detection overlay.
 Click "Start YOLO" to begin tab capture and real-time object detection (~1fps).
+The page is served right away; the model loads and warms up in the background
+(see /ready).
 """
 
 import http.server
 import json
 import base64
+import hashlib
 import os
+import struct
 import sys
+import urllib.parse
 import webbrowser
 import threading
+import queue
 import time
+from collections import OrderedDict, deque
 import numpy as np
 import cv2
-from ultralytics import YOLO
-import ollama
 from PIL import Image
 import io
+from tracker import Tracker
+from backends import load_model
+from postprocess import NameTable, class_mask, empty_rows, filter_rows, result_rows
+from roi import RegionScheduler
+from tiling import SlicedDetector
+from metrics import Metrics, SpeedProbe, StageTimer
+from recorder import Recorder
+from stats_reader import DigitTemplates, StatsReader, binarize
 
 # --------------- Configuration ---------------
 MODEL_PATH = "best_v2.pt"
+MODEL_BACKEND = "torch"  # "torch", "onnx", "onnx-int8", "openvino" or "openvino-int8" (exports are cached)
+MODEL_THREADS = 0  # CPU threads for inference (0 = backend default)
+WARMUP_SIZE = (640, 360)  # (w, h) of the dummy frames used to warm the model up (the page sends <= 640 wide)
+WARMUP_RUNS = 2  # Dummy inferences before the model is reported ready
 CLASSES_FILE = os.path.join("dataset", "classes.txt")
 PORT = 7280
 CONF_THRESHOLD = 0.2  # Detection confidence threshold (0.0 - 1.0)
 FPS_CAP = 60  # Maximum detection FPS (frames per second)
+DETECT_CLASSES = []  # Class names to report, e.g. ["bullet", "drone", "player"] (empty = all)
+
+# Server / inference queue
+SERVER_THREADED = True  # Handle each connection on its own thread (False = old single-threaded server)
+INFER_WORKERS = 1  # Inference worker threads (each extra worker loads its own model copy)
+INFER_QUEUE_SIZE = 2  # Max frames waiting per session; its older frames are dropped when full
+INFER_MAX_AGE = 0.5  # Frames waiting longer than this (seconds) are dropped as stale
+INFER_TIMEOUT = 5.0  # Max seconds a /detect request waits for its result
+BATCH_MAX_SIZE = 8  # Max frames (from all sessions) run as one batched forward pass
+BATCH_WAIT_MS = 8  # How long a worker waits to fill a batch while several clients are active
+SESSION_TIMEOUT = 60.0  # Seconds of silence after which a client's session (tracker, gate) is forgotten
+
+# WebSocket frame streaming (/ws); the /detect POST stays as the fallback
+WS_ENABLED = True  # Stream binary frames over a persistent WebSocket (needs SERVER_THREADED)
+WS_MAX_IN_FLIGHT = 2  # Frames the client may have awaiting a result at once
+RESPONSE_FORMAT = "binary"  # Format the page asks for: "binary" (packed float32 rows) or "json"
+CAPTURE_POOL = 3  # Reusable canvases the page encodes frames into (frames being encoded at once)
+
+# Frame-difference gating: reuse the last result for frames that barely changed
+GATE_ENABLED = True  # Skip inference on near-identical frames (death screen, menus, idle)
+GATE_THUMB_SIZE = (64, 36)  # Grayscale thumbnail (w, h) frames are compared at
+GATE_THRESHOLD = 2.0  # Mean absolute thumbnail difference (0-255) below which a frame is "unchanged"
+GATE_MAX_SKIPS = 15  # Force a real inference after this many cached replies in a row
+GATE_SHIFT = True  # Detect a global camera pan and shift cached boxes along with it
+GATE_MIN_RESPONSE = 0.3  # Phase-correlation peak needed to trust a detected pan
+
+# Tracking: stable ids + velocities so the page can move boxes between detections
+TRACKER_ENABLED = True  # Run the IoU/Kalman tracker on every inferred frame
+TRACKER_IOU = 0.3  # Minimum IoU to continue a track
+TRACKER_HIGH_CONF = 0.5  # Detections above this start tracks; weaker ones only extend them
+TRACKER_MAX_AGE = 0.5  # Seconds a track survives without a detection
+EXTRAPOLATE_MAX = 0.5  # Max seconds the page extrapolates boxes along their velocity
+
+# Overlay drawing in the page
+OFFSCREEN_RENDER = True  # Draw in a Web Worker via OffscreenCanvas where supported (main thread otherwise)
+
+# Regions of interest: run the model on playfield crops instead of the whole frame
+ROI_ENABLED = False  # Crop to ROI_REGIONS and drop boxes inside ROI_MASKS
+# rect is (x1, y1, x2, y2) as fractions of the frame; "every" runs the region on every
+# Nth frame (reusing its last boxes in between); anchor "self" centres it on the player.
+# Where regions overlap, an object goes to the earliest whose crop holds it whole. The
+# playfield regions cover the frame around the ROI_MASKS panels and above the bottom row
+# holding the score bar, so HUD pixels never reach the model; the narrow side strips run
+# less often.
+ROI_REGIONS = [
+    {"name": "self", "rect": (0.30, 0.25, 0.70, 0.75), "every": 1, "anchor": "self"},
+    {"name": "playfield", "rect": (0.18, 0.22, 0.82, 0.94), "every": 3},
+    {"name": "playfield_top", "rect": (0.30, 0.00, 0.82, 0.22), "every": 3},
+    {"name": "playfield_left", "rect": (0.00, 0.22, 0.18, 0.70), "every": 6},
+    {"name": "playfield_right", "rect": (0.82, 0.35, 1.00, 0.74), "every": 6},
+]
+ROI_MARGIN = 0.05  # Crops reach this fraction of the frame width past their region (never into a mask)
+# HUD areas that never hold real objects, as (x1, y1, x2, y2) fractions
+ROI_MASKS = [
+    (0.40, 0.94, 0.60, 0.985),  # score / level bar (same crop as analyze_stats)
+    (0.82, 0.74, 1.00, 1.00),   # minimap
+    (0.82, 0.00, 1.00, 0.35),   # leaderboard
+    (0.00, 0.00, 0.30, 0.22),   # upgrade tree
+    (0.00, 0.70, 0.18, 1.00),   # skill points
+]
+
+# Sliced inference: run overlapping native-resolution tiles so small bullets survive
+TILE_MODE = "off"  # "off", "always", or "auto" (tile only while frames are crowded); ignored with ROI_ENABLED
+TILE_SIZE = 256  # Tile side in pixels (the training imgsz, so tiles are not rescaled)
+TILE_OVERLAP = 0.2  # Fraction of a tile shared with its neighbour
+TILE_FULL_FRAME = True  # Add the whole frame to the batch for objects bigger than a tile
+TILE_MERGE = "nms"  # Merge duplicates with class-aware "nms" or weighted box fusion ("wbf")
+TILE_MERGE_THRESHOLD = 0.5  # Overlap above which two same-class boxes are duplicates
+TILE_MATCH_METRIC = "ios"  # "iou", or "ios" (intersection over smaller; also merges tile-cut boxes)
+TILE_AUTO_MIN_DETECTIONS = 25  # Auto mode: tile while the last frame had at least this many boxes
+TILE_AUTO_PROBE = 30  # Auto mode: also tile every Nth frame to notice crowding
+
+# Adaptive quality: the page trades send size, JPEG quality, model input size and
+# frame rate against latency, using the inference time and queue depth in each reply
+ADAPT_ENABLED = True  # Let the page step its settings down under load and back up when idle
+ADAPT_TARGET_MS = 150  # Round-trip latency (ms) the page tries to stay under
+ADAPT_PERIOD_MS = 1000  # How often (ms) the page reconsiders its settings
+ADAPT_SEND_WIDTHS = [640, 512, 416, 320]  # Capture widths, best first
+ADAPT_JPEG_QUALITIES = [0.7, 0.6, 0.5, 0.4]  # JPEG qualities, best first
+ADAPT_IMGSZ = [0, 224, 192, 160]  # Model input sizes, best first (0 = the model's own; torch backend only)
+ADAPT_MAX_INTERVAL_MS = 500  # Slowest capture interval; steps double from 1000 / FPS_CAP
+
+# Latency metrics (/metrics in Prometheus format, /metrics.json for the page)
+METRICS_WINDOW = 1000  # Samples per stage the percentiles are computed over
+
+# Recording: log every /detect frame and response for offline replay (python replay.py LOG)
+RECORD_PATH = None  # e.g. "session.arrasrec" (None = don't record; an existing file is overwritten)
 
 # VL Model for stats extraction
 VL_ENABLED = False  # Set to True to enable VL stats extraction
 VL_MODEL = "hf.co/unsloth/InternVL3-1B-GGUF:Q4_K_M"
 VL_PROMPT = "What is the score and level shown in this game stats panel? Respond with just the numbers in format 'Score: X, Level: Y'"
 VL_POLL_INTERVAL = 2.0  # Poll stats every 2 seconds
+VL_TIMEOUT = 10.0  # Seconds before a VL request is abandoned
+STATS_WAIT = 0.05  # Seconds /analyze_stats waits for a fresh result before answering with the latest one
+STATS_CROP = (0.40, 0.94, 0.60, 0.985)  # Score / level bar as (x1, y1, x2, y2) fractions of the frame
+FRAME_CACHE_SIZE = 4  # Recently decoded /detect frames kept for /analyze_stats?frame=<id|latest>
+STATS_MIN_FRAME_WIDTH = 640  # Narrower cached frames are too blurry to read; the page uploads the crop instead
+STATS_SERVER_SIDE = False  # Read stats from incoming /detect frames every VL_POLL_INTERVAL; the page polls GET /stats
+
+# Template-based stats reader (milliseconds instead of seconds; VL is only the fallback)
+STATS_READER_ENABLED = True  # Read score/level by matching digit templates
+STATS_TEMPLATES_DIR = None  # Captured glyphs 0.png ... 9.png (None = render from STATS_FONT)
+STATS_FONT = None  # TrueType font for rendered templates (None = Ubuntu Bold / DejaVu Sans Bold)
+STATS_MIN_CONFIDENCE = 0.65  # Below this template match score a read fails (or goes to the VL model, if enabled)
 
 # Class colors (RGB format) - order matches arras_data.yaml
 COLOR_BASE_WALL = (58, 136, 254)       # base_wall
@@ -96,8 +212,10 @@ CLASS_COLORS = [
 ]
 
 # --------------- Load model & classes ---------------
-print(f"Loading YOLO model ({MODEL_PATH})...")
-model = YOLO(MODEL_PATH)
+# The model is loaded by load_and_warmup() on a background thread so the page
+# comes up immediately; /ready reports how far along it is.
+model = None
+startup = {"ready": False, "stage": "starting", "progress": 0.0, "error": None, "seconds": 0.0}
 
 # Default class names for arras.io objects (from arras_data.yaml)
 DEFAULT_CLASSES = [
@@ -118,23 +236,68 @@ else:
     # Use default classes if file doesn't exist
     class_names = DEFAULT_CLASSES
 print(f"Classes: {class_names}")
+name_table = NameTable(class_names)
+detect_mask = class_mask(class_names, DETECT_CLASSES) if DETECT_CLASSES else None
+
+# --------------- Stats Analysis ---------------
+stats_reader = StatsReader(DigitTemplates(STATS_TEMPLATES_DIR, STATS_FONT)) if STATS_READER_ENABLED else None
+
+
+def crop_stats(img_array):
+    """Crop to player stats area (STATS_CROP: 40-60% x, 94-98.5% y)."""
+    height, width = img_array.shape[:2]
+    x1 = int(width * STATS_CROP[0])
+    x2 = int(width * STATS_CROP[2])
+    y1 = int(height * STATS_CROP[1])
+    y2 = int(height * STATS_CROP[3])
+    return img_array[y1:y2, x1:x2]
+
 
-# --------------- VL Stats Analysis ---------------
 def analyze_stats(img_array):
+    """Extract score and level: digit templates first, the VL model when unsure."""
+    return analyze_stats_crop(crop_stats(img_array))
+
+
+def analyze_stats_crop(cropped):
+    """analyze_stats for an already cropped stats region."""
+    if stats_reader is not None:
+        t0 = time.perf_counter()
+        reading = stats_reader.read(cropped)
+        metrics.record({"stats_reader": (time.perf_counter() - t0) * 1000})
+        if reading["score"] is not None and reading["confidence"] >= STATS_MIN_CONFIDENCE:
+            text = f"Score: {reading['score']}"
+            if reading["level"] is not None:
+                text += f", Level: {reading['level']}"
+            return dict(reading, success=True, text=text, source="template")
+    if not VL_ENABLED:
+        return {"success": False, "error": "stats not recognized"}
+    return analyze_stats_vl(cropped)
+
+
+_vl_client = None
+_vl_client_lock = threading.Lock()
+
+
+def vl_client():
+    """One shared ollama client, so every VL call reuses the same connection.
+
+    ollama is imported here rather than at startup, so it is only needed with VL_ENABLED.
+    """
+    global _vl_client
+    with _vl_client_lock:
+        if _vl_client is None:
+            import ollama
+            _vl_client = ollama.Client(timeout=VL_TIMEOUT)
+        return _vl_client
+
+
+def analyze_stats_vl(cropped):
     """Analyze cropped stats region with VL model to extract score and level."""
     try:
         t0 = time.time()
-        # Crop to player stats area (40-60% x, 94-98.5% y)
-        height, width = img_array.shape[:2]
-        x1 = int(width * 0.40)
-        x2 = int(width * 0.60)
-        y1 = int(height * 0.94)
-        y2 = int(height * 0.985)
-        
-        cropped = img_array[y1:y2, x1:x2]
         crop_h, crop_w = cropped.shape[:2]
-        
-        print(f"[VL] Analyzing stats region: {crop_w}x{crop_h} pixels (cropped from {width}x{height})")
+
+        print(f"[VL] Analyzing stats region: {crop_w}x{crop_h} pixels")
         
         # Convert to PIL Image
         img_rgb = cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB)
@@ -148,7 +311,7 @@ def analyze_stats(img_array):
         print(f"[VL] Querying {VL_MODEL}...")
         
         # Query VL model
-        response = ollama.chat(
+        response = vl_client().chat(
             model=VL_MODEL,
             messages=[{
                 "role": "user",
@@ -165,13 +328,645 @@ def analyze_stats(img_array):
         elapsed = time.time() - t0
         
         print(f"[VL] Response ({elapsed:.2f}s): {result}")
+        metrics.record({"vl": elapsed * 1000})
         
-        return {"success": True, "text": result}
+        return {"success": True, "text": result, "source": "vl"}
     except Exception as e:
         elapsed = time.time() - t0 if 't0' in locals() else 0
         print(f"[VL] Error ({elapsed:.2f}s): {e}")
         return {"success": False, "error": str(e)}
 
+
+class StatsWorker:
+    """Runs stats analysis on one background thread, newest frame only.
+
+    At most one analysis is in flight. Crops submitted in the meantime replace
+    each other, so only the latest is analyzed next, and a crop identical to
+    the last analyzed one (after binarization) is skipped. Results are published
+    with an increasing sequence number so callers can wait for a newer one.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = None
+        self._last_key = None
+        self.latest = {"success": False, "error": "no result yet"}
+        self.seq = 0
+        self.analyzed = 0
+        self.coalesced = 0
+        self.unchanged = 0
+
+    def start(self):
+        threading.Thread(target=self._run, name="stats", daemon=True).start()
+
+    def submit(self, cropped):
+        """Queue a crop (replacing any not yet started) and return the current sequence number."""
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = cropped
+            self._cond.notify_all()
+            return self.seq
+
+    def wait_newer(self, seq, timeout):
+        """Latest result, waiting up to timeout for one newer than seq."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > seq, timeout)
+            return dict(self.latest, seq=self.seq)
+
+    def result(self):
+        with self._cond:
+            return dict(self.latest, seq=self.seq)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                cropped, self._pending = self._pending, None
+
+            key = hashlib.blake2b(binarize(cropped).tobytes(), digest_size=16).digest()
+            if key == self._last_key:
+                result = None
+            else:
+                result = dict(analyze_stats_crop(cropped), updated=time.time())
+                self._last_key = key if result.get("success") else None
+
+            with self._cond:
+                if result is None:
+                    self.unchanged += 1
+                else:
+                    self.latest = result
+                    self.analyzed += 1
+                self.seq += 1
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"analyzed": self.analyzed, "coalesced": self.coalesced,
+                    "unchanged": self.unchanged, "seq": self.seq}
+
+
+stats_worker = StatsWorker()
+
+
+class FrameCache:
+    """Ring buffer of the last few decoded /detect frames, by server frame id.
+
+    Lets /analyze_stats crop the stats bar out of a frame the page already
+    uploaded for detection instead of receiving (and decoding) a second one,
+    and drives the optional server-side stats reads.
+    """
+
+    def __init__(self, size=FRAME_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._frames = deque(maxlen=size)  # (frame id, session id, BGR image)
+        self._next_id = 1
+        self._last_stats = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, img, session_id=None):
+        """Keep a frame and return its id; with STATS_SERVER_SIDE, also feed the stats worker."""
+        with self._lock:
+            frame_id = self._next_id
+            self._next_id += 1
+            self._frames.append((frame_id, session_id, img))
+            now = time.monotonic()
+            read_stats = (STATS_SERVER_SIDE and now - self._last_stats >= VL_POLL_INTERVAL
+                          and img.shape[1] >= STATS_MIN_FRAME_WIDTH)
+            if read_stats:
+                self._last_stats = now
+        if read_stats:
+            stats_worker.submit(crop_stats(img))
+        return frame_id
+
+    def get(self, ref, session_id=None, min_width=0):
+        """The frame with id ref, or with ref "latest" the newest one of session_id (any session if None).
+
+        A frame narrower than min_width is as good as missing: None, counted as a miss.
+        """
+        with self._lock:
+            for frame_id, session, img in reversed(self._frames):
+                if (str(frame_id) == ref) or (ref == "latest" and session_id in (None, session)):
+                    if img.shape[1] < min_width:
+                        break
+                    self.hits += 1
+                    return img
+            self.misses += 1
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {"frames": len(self._frames), "hits": self.hits, "misses": self.misses}
+
+
+frame_cache = FrameCache()
+
+# --------------- Detection & inference queue ---------------
+metrics = Metrics(METRICS_WINDOW)
+recorder = Recorder(RECORD_PATH) if RECORD_PATH else None
+
+# Detections travel as packed float32 rows of [x1, y1, x2, y2, conf, cls] (see
+# postprocess.py); with the tracker enabled they gain track id, vx and vy.
+
+# Binary response header: frame id, image width, image height, row count, flags, columns per row,
+# inference time (ms) and the session's queue depth (16 bytes, so the float32 rows stay aligned)
+BINARY_HEADER = struct.Struct("<IHHHBBHH")
+BINARY_FLAG_BUSY = 0x01
+BINARY_FLAG_CACHED = 0x02
+
+
+# /ws frame header: frame id, confidence, model input size (0 = default), padding,
+# capture time in ms since the epoch (0 = unknown)
+WS_FRAME_HEADER = struct.Struct("<IfHxxd")
+
+
+def run_detection(yolo, img, conf, detector=None, imgsz=0):
+    """Run YOLO on a decoded BGR frame.
+
+    detector optionally replaces the plain full-frame call; it is any object with
+    detect(yolo, img, conf) -> rows (RegionScheduler, SlicedDetector).
+    imgsz overrides the model input size of the plain call (0 = the model's own).
+    Returns {"rows", "imgW", "imgH"} where rows is an (N, 6) float32 array of
+    [x1, y1, x2, y2, conf, cls], taken from boxes.data in one transfer.
+    """
+    if detector is None:
+        return run_detection_batch(yolo, [img], [conf], imgsz)[0]
+    rows = filter_rows(detector.detect(yolo, img, conf), mask=detect_mask)
+    return {"rows": rows, "imgW": img.shape[1], "imgH": img.shape[0]}
+
+
+def run_detection_batch(yolo, imgs, confs, imgsz=0):
+    """run_detection for several frames in one forward pass; returns one result per frame.
+
+    The model runs at the lowest of the confidences and each frame's rows are
+    then cut to its own.
+    """
+    results = yolo(imgs, verbose=False, conf=min(confs), **({"imgsz": imgsz} if imgsz else {}))
+    out = []
+    for img, conf, result in zip(imgs, confs, results):
+        rows = filter_rows(result_rows([result]), conf=conf if conf > min(confs) else None, mask=detect_mask)
+        out.append({"rows": rows, "imgW": img.shape[1], "imgH": img.shape[0]})
+    return out
+
+
+def encode_json(result, **extra):
+    """Serialize a detection result as the /detect JSON body."""
+    meta = {"imgW": result["imgW"], "imgH": result["imgH"],
+            "inferMs": round(result.get("inferMs", 0.0), 1), "queue": result.get("queue", 0), **extra}
+    if result.get("busy"):
+        meta["busy"] = True
+    if result.get("cached"):
+        meta["cached"] = True
+    # The detections array is formatted in one pass; splice it in front of the rest
+    detections = name_table.detections_json(result["rows"])
+    return ('{"detections": ' + detections + ", " + json.dumps(meta)[1:]).encode()
+
+
+def encode_binary(result, frame_id=0):
+    """Serialize a detection result as BINARY_HEADER + little-endian float32 rows.
+
+    Rows are [x1, y1, x2, y2, conf, cls], plus [id, vx, vy] when tracked; the
+    header's columns field says which.
+
+    Class names are not included; clients fetch them once from /classes.
+    """
+    rows = result["rows"]
+    flags = (BINARY_FLAG_BUSY if result.get("busy") else 0) | (BINARY_FLAG_CACHED if result.get("cached") else 0)
+    infer_ms = min(0xFFFF, int(round(result.get("inferMs", 0.0))))
+    header = BINARY_HEADER.pack(frame_id, result["imgW"], result["imgH"], len(rows), flags, rows.shape[1],
+                                infer_ms, min(0xFFFF, result.get("queue", 0)))
+    return header + rows.astype("<f4", copy=False).tobytes()
+
+
+class FrameGate:
+    """Cheap change detector that lets near-identical frames reuse the last result.
+
+    Each frame is reduced to a small grayscale thumbnail and compared against the
+    thumbnail of the last frame that actually went through the model. If the
+    plain difference is too large, a global camera pan is estimated with phase
+    correlation and the comparison is retried with the pan compensated; cached
+    boxes are then shifted by the same amount.
+    """
+
+    def __init__(self, threshold=GATE_THRESHOLD, max_skips=GATE_MAX_SKIPS):
+        self.threshold = threshold
+        self.max_skips = max_skips
+        self._lock = threading.Lock()
+        self._ref = None  # (thumbnail, result, conf) of the last inferred frame
+        self._skips = 0
+        self.checks = 0
+        self.hits = 0
+        self.shifted_hits = 0
+
+    @staticmethod
+    def thumbnail(img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, GATE_THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def update(self, thumb, result, conf):
+        """Make an inferred frame the new reference."""
+        with self._lock:
+            self._ref = (thumb, result, conf)
+            self._skips = 0
+
+    def check(self, thumb, img_shape, conf):
+        """Return a cached result for this frame, or None if it needs inference."""
+        with self._lock:
+            self.checks += 1
+            if self._ref is None or self._skips >= self.max_skips:
+                return None
+            ref_thumb, result, ref_conf = self._ref
+
+        # Cached rows can be filtered up to a higher threshold, never down
+        if conf < ref_conf or (result["imgH"], result["imgW"]) != tuple(img_shape[:2]):
+            return None
+
+        dx = dy = 0.0
+        diff = cv2.absdiff(thumb, ref_thumb).mean()
+        if diff >= self.threshold and GATE_SHIFT:
+            (dx, dy), response = cv2.phaseCorrelate(ref_thumb, thumb)
+            if response < GATE_MIN_RESPONSE or (abs(dx) < 0.5 and abs(dy) < 0.5):
+                return None
+            diff = self._shifted_diff(ref_thumb, thumb, dx, dy)
+        if diff >= self.threshold:
+            return None
+
+        rows = result["rows"]
+        rows = rows[rows[:, 4] >= conf]
+        if dx or dy:
+            rows = rows.copy()
+            rows[:, [0, 2]] += dx * result["imgW"] / thumb.shape[1]
+            rows[:, [1, 3]] += dy * result["imgH"] / thumb.shape[0]
+
+        with self._lock:
+            self._skips += 1
+            self.hits += 1
+            if dx or dy:
+                self.shifted_hits += 1
+        return {"rows": rows, "imgW": result["imgW"], "imgH": result["imgH"], "cached": True}
+
+    @staticmethod
+    def _shifted_diff(ref_thumb, thumb, dx, dy):
+        """Mean difference after moving ref by (dx, dy), ignoring the uncovered border."""
+        h, w = thumb.shape
+        moved = cv2.warpAffine(ref_thumb, np.float32([[1, 0, dx], [0, 1, dy]]), (w, h))
+        mx, my = int(np.ceil(abs(dx))), int(np.ceil(abs(dy)))
+        if 2 * mx >= w or 2 * my >= h:
+            return float("inf")
+        return cv2.absdiff(moved[my:h - my, mx:w - mx], thumb[my:h - my, mx:w - mx]).mean()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": GATE_ENABLED,
+                "checks": self.checks,
+                "hits": self.hits,
+                "shifted_hits": self.shifted_hits,
+                "skipped_inferences": self.hits,
+                "hit_rate": round(self.hits / self.checks, 4) if self.checks else 0.0,
+                "threshold": self.threshold,
+            }
+
+
+class Session:
+    """One overlay client: its own frame gate, tracker, ROI/tiling state and latest result.
+
+    The page makes up a session id per tab and sends it with every frame;
+    requests without one share the "default" session. Counters and the pending
+    deque are guarded by the InferenceQueue's lock.
+    """
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.gate = FrameGate()
+        self.tracker = Tracker(TRACKER_IOU, TRACKER_HIGH_CONF, TRACKER_MAX_AGE) if TRACKER_ENABLED else None
+        self.track_lock = threading.Lock()
+        self.roi = None
+        if ROI_ENABLED:
+            self_class = class_names.index("self") if "self" in class_names else None
+            self.roi = RegionScheduler(ROI_REGIONS, ROI_MASKS, self_class, ROI_MARGIN)
+        self.tiler = None
+        if TILE_MODE != "off":
+            self.tiler = SlicedDetector(TILE_SIZE, TILE_OVERLAP, TILE_MODE, TILE_FULL_FRAME, TILE_MERGE,
+                                        TILE_MERGE_THRESHOLD, TILE_MATCH_METRIC,
+                                        TILE_AUTO_MIN_DETECTIONS, TILE_AUTO_PROBE)
+        self.detector = self.roi or self.tiler
+        self.pending = deque()  # Jobs waiting for inference, oldest first
+        self.latest = {"rows": empty_rows(), "imgW": 0, "imgH": 0}
+        self.last_seen = time.time()
+        self.frames = 0
+        self.inferred = 0
+        self.dropped = 0
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "cached": self.gate.hits,
+            "dropped": self.dropped,
+            "pending": len(self.pending),
+            "idle": round(time.time() - self.last_seen, 1),
+        }
+
+
+class InferenceJob:
+    """A single frame waiting for (or finished with) inference."""
+    __slots__ = ("img", "conf", "imgsz", "session", "thumb", "submitted", "captured", "done", "result", "error",
+                 "timings")
+
+    def __init__(self, img, conf, session, thumb=None, imgsz=0, captured=0.0):
+        self.img = img
+        self.conf = conf
+        self.imgsz = imgsz  # Model input size asked for by the client (0 = default)
+        self.session = session
+        self.thumb = thumb  # FrameGate thumbnail, if gating is enabled
+        self.submitted = time.time()
+        self.captured = captured  # When the client grabbed the frame (s since the epoch, 0 = unknown)
+        self.done = threading.Event()
+        self.result = None  # Stays None if the frame was dropped
+        self.error = None
+        self.timings = {}  # Stage durations (ms) measured on the inference side
+
+
+class InferenceQueue:
+    """Per-session frame queues in front of the model, served by batching workers.
+
+    Only the newest frames matter for an overlay, so each session keeps at most
+    maxsize waiting frames and drops its oldest to make room, and frames that
+    waited longer than max_age are dropped by the workers instead of being
+    inferred. Dropped requests are answered with the session's latest result
+    marked as busy. Frames the session's FrameGate considers unchanged never
+    enter the queue at all.
+
+    Workers build batches round-robin across sessions, so a fast client cannot
+    crowd out the others, and run each batch as one forward pass. While more
+    than one session is active a worker waits up to batch_wait for more frames;
+    a lone client never waits.
+    """
+
+    def __init__(self, workers=INFER_WORKERS, maxsize=INFER_QUEUE_SIZE, max_age=INFER_MAX_AGE,
+                 batch_max=BATCH_MAX_SIZE, batch_wait=BATCH_WAIT_MS / 1000):
+        self.workers = max(1, workers)
+        self.maxsize = max(1, maxsize)
+        self.max_age = max_age
+        self.batch_max = max(1, batch_max)
+        self.batch_wait = batch_wait
+        self._cond = threading.Condition()
+        self.sessions = OrderedDict()  # id -> Session, in round-robin order
+        self.batches = 0
+        self.batch_sizes = [0] * (self.batch_max + 1)  # Histogram of batch sizes
+        self.processed = 0
+        self.dropped = 0
+        self.started = False
+
+    def start(self):
+        for i in range(self.workers):
+            # Ultralytics predictors are not thread-safe, so extra workers get their own copy
+            yolo = model if i == 0 else load_model(MODEL_PATH, MODEL_BACKEND, threads=MODEL_THREADS)
+            threading.Thread(target=self._worker, args=(yolo,), name=f"infer-{i}", daemon=True).start()
+        self.started = True
+
+    def session(self, session_id=None):
+        """The Session for session_id, created on first use; idle sessions expire."""
+        session_id = str(session_id or "default")[:64]
+        now = time.time()
+        with self._cond:
+            session = self.sessions.get(session_id)
+            if session is None:
+                for sid in [sid for sid, s in self.sessions.items()
+                            if now - s.last_seen > SESSION_TIMEOUT and not s.pending]:
+                    del self.sessions[sid]
+                session = self.sessions[session_id] = Session(session_id)
+            session.last_seen = now
+            return session
+
+    def submit(self, img, conf, imgsz=0, session=None, captured=0.0):
+        """Queue a frame for inference, dropping the session's oldest waiting frame if full.
+
+        If the frame gate finds the frame unchanged, the returned job is already
+        done and carries the cached result. imgsz is only honoured if it is one
+        of the ADAPT_IMGSZ sizes. captured is the client's capture time in
+        seconds; the tracker measures motion with it, falling back to the
+        submit time when it is unknown.
+        """
+        t0 = time.perf_counter()
+        session = session or self.session()
+        imgsz = imgsz if imgsz in ADAPT_IMGSZ and MODEL_BACKEND == "torch" else 0
+        job = InferenceJob(img, conf, session, FrameGate.thumbnail(img) if GATE_ENABLED else None, imgsz, captured)
+        with self._cond:
+            # A caller holding its Session across frames (a WebSocket, replay.py) may
+            # have been silent past SESSION_TIMEOUT; expired sessions are no longer
+            # scanned by _collect, so put it back (or use the one that replaced it)
+            job.session = session = self.sessions.setdefault(session.id, session)
+            session.frames += 1
+            session.last_seen = job.submitted
+        if not self.started:
+            # Model still loading: answer busy right away instead of queueing
+            job.done.set()
+            return job
+        if job.thumb is not None:
+            cached = session.gate.check(job.thumb, img.shape, conf)
+            job.timings["gate"] = (time.perf_counter() - t0) * 1000
+            if cached is not None:
+                job.result = cached
+                job.done.set()
+                return job
+
+        with self._cond:
+            if len(session.pending) >= self.maxsize:
+                self._drop(session.pending.popleft())
+            session.pending.append(job)
+            self._cond.notify()
+        return job
+
+    def wait(self, job, timeout=INFER_TIMEOUT):
+        """Block until job finishes and return its response (busy if it was dropped).
+
+        Responses carry the session's own queue depth (its frames still waiting),
+        so a client can tell its frames are piling up and back off.
+        """
+        if not job.done.wait(timeout) or (job.result is None and job.error is None):
+            return self.busy_response(job.session)
+        if job.error is not None:
+            raise job.error
+        with self._cond:
+            return dict(job.result, queue=len(job.session.pending))
+
+    def busy_response(self, session):
+        """The session's latest result, flagged so the client knows its frame was skipped."""
+        with self._cond:
+            return dict(session.latest, busy=True, queue=len(session.pending))
+
+    def _depth(self):
+        return sum(len(s.pending) for s in self.sessions.values())
+
+    def _drop(self, job):
+        # Caller holds self._cond
+        self.dropped += 1
+        job.session.dropped += 1
+        job.done.set()
+
+    def counters(self):
+        with self._cond:
+            return {"frames_processed_total": self.processed, "frames_dropped_total": self.dropped,
+                    "batches_total": self.batches}
+
+    def gauges(self):
+        with self._cond:
+            return {"queue_depth": self._depth(), "sessions": len(self.sessions)}
+
+    def gate_stats(self):
+        """FrameGate stats summed over all sessions."""
+        with self._cond:
+            gates = [s.gate.stats() for s in self.sessions.values()]
+        stats = {key: sum(g[key] for g in gates) for key in ("checks", "hits", "shifted_hits", "skipped_inferences")}
+        stats.update(enabled=GATE_ENABLED, threshold=GATE_THRESHOLD,
+                     hit_rate=round(stats["hits"] / stats["checks"], 4) if stats["checks"] else 0.0)
+        return stats
+
+    def session_stats(self):
+        with self._cond:
+            sessions = {sid: s.stats() for sid, s in self.sessions.items()}
+            batches, sizes = self.batches, list(self.batch_sizes)
+        frames = sum(n * count for n, count in enumerate(sizes))
+        return {
+            "sessions": sessions,
+            "batcher": {"max_size": self.batch_max, "wait_ms": self.batch_wait * 1000, "batches": batches,
+                        "mean_size": round(frames / batches, 2) if batches else 0.0,
+                        "sizes": {n: count for n, count in enumerate(sizes) if count}},
+        }
+
+    def detector_stats(self, attr):
+        """stats() of every session's RegionScheduler ("roi") or SlicedDetector ("tiler")."""
+        with self._cond:
+            detectors = {sid: getattr(s, attr) for sid, s in self.sessions.items()}
+        return {sid: d.stats() for sid, d in detectors.items() if d is not None}
+
+    def _take_batch(self):
+        """Block until a fresh job is waiting, then gather up to batch_max of them."""
+        with self._cond:
+            batch, deadline = [], None
+            while True:
+                self._collect(batch)
+                if len(batch) >= self.batch_max:
+                    return batch
+                if not batch:
+                    self._cond.wait()
+                    continue
+                if deadline is None:
+                    now = time.time()
+                    if sum(now - s.last_seen < 1.0 for s in self.sessions.values()) < 2:
+                        return batch
+                    deadline = now + self.batch_wait
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return batch
+                self._cond.wait(remaining)
+
+    def _collect(self, batch):
+        """Move waiting jobs into batch, one per session per round; caller holds self._cond."""
+        now = time.time()
+        while len(batch) < self.batch_max:
+            took = False
+            for session in list(self.sessions.values()):
+                if len(batch) >= self.batch_max:
+                    break
+                if not session.pending:
+                    continue
+                job = session.pending.popleft()
+                took = True
+                # Served sessions go to the back, so the next round starts with the others
+                self.sessions.move_to_end(session.id)
+                if now - job.submitted > self.max_age:
+                    self._drop(job)
+                else:
+                    batch.append(job)
+            if not took:
+                return
+
+    def _worker(self, yolo):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._run_batch(yolo, batch)
+            except Exception as e:
+                for job in batch:
+                    job.error = e
+            for job in batch:
+                job.done.set()
+
+    def _run_batch(self, yolo, batch):
+        started, t0 = time.time(), time.perf_counter()
+        probe = SpeedProbe(yolo)
+        # Plain full-frame jobs share forward passes (one per input size); ROI and
+        # tiling keep per-session state and batch their own crops
+        groups = {}
+        for job in batch:
+            if job.session.detector is None:
+                groups.setdefault(job.imgsz, []).append(job)
+            else:
+                job.result = run_detection(probe, job.img, job.conf, job.session.detector, job.imgsz)
+        for imgsz, jobs in groups.items():
+            results = run_detection_batch(probe, [job.img for job in jobs], [job.conf for job in jobs], imgsz)
+            for job, result in zip(jobs, results):
+                job.result = result
+
+        for job in batch:
+            session = job.session
+            if session.tracker is not None:
+                with session.track_lock:
+                    # Capture time, so upload jitter does not show up as motion
+                    job.result["rows"] = session.tracker.update(job.result["rows"], job.captured or job.submitted)
+        # Whatever Ultralytics did not account for is our own postprocessing;
+        # every frame in the batch waited for all of it
+        wall = (time.perf_counter() - t0) * 1000
+        for job in batch:
+            job.result["inferMs"] = wall
+            job.timings.update(probe.stages, queue_wait=(started - job.submitted) * 1000,
+                               postprocess=max(0.0, wall - sum(probe.stages.values())))
+            if job.thumb is not None:
+                job.session.gate.update(job.thumb, job.result, job.conf)
+        with self._cond:
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            self.processed += len(batch)
+            for job in batch:
+                job.session.latest = job.result
+                job.session.inferred += 1
+
+
+infer_queue = InferenceQueue()
+
+
+def load_and_warmup():
+    """Load the model, run a few dummy frames through it, then start the workers."""
+    global model
+    t0 = time.time()
+
+    def stage(name, progress):
+        startup.update(stage=name, progress=progress, seconds=round(time.time() - t0, 2))
+        print(f"[startup] {name} ({startup['seconds']:.1f}s)")
+
+    try:
+        stage(f"loading {MODEL_PATH} ({MODEL_BACKEND})", 0.1)
+        model = load_model(MODEL_PATH, MODEL_BACKEND, threads=MODEL_THREADS)
+
+        # The first calls pay for graph setup and allocation; do it before real frames arrive
+        dummy = np.zeros((WARMUP_SIZE[1], WARMUP_SIZE[0], 3), np.uint8)
+        for i in range(WARMUP_RUNS):
+            stage(f"warming up ({i + 1}/{WARMUP_RUNS})", 0.5 + 0.4 * i / max(1, WARMUP_RUNS))
+            model(dummy, verbose=False, conf=CONF_THRESHOLD)
+
+        stage("starting workers", 0.95)
+        infer_queue.start()
+        startup["ready"] = True
+        stage("ready", 1.0)
+    except Exception as e:
+        startup["error"] = str(e)
+        stage("failed", startup["progress"])
+        print(f"[startup] Error: {e}")
+
 # --------------- Serve HTML + detection API ---------------
 
 HTML_PAGE = r"""<!DOCTYPE html>
@@ -223,6 +1018,11 @@ HTML_PAGE = r"""<!DOCTYPE html>
 
   input[type=range] { width: 100%; margin: 4px 0; accent-color: #22c55e; }
 
+  #timings { margin-top: 6px; font-size: 11px; display: none; }
+  #timings table { width: 100%; border-collapse: collapse; }
+  #timings td { padding: 1px 2px; color: #ccc; font-variant-numeric: tabular-nums; text-align: right; }
+  #timings td:first-child { text-align: left; color: #aaa; }
+
   #legend { margin-top: 8px; border-top: 1px solid rgba(255,255,255,0.1); padding-top: 6px; }
   .legend-item { display: flex; align-items: center; gap: 6px; font-size: 11px; margin: 2px 0; }
   .legend-dot { width: 8px; height: 8px; border-radius: 2px; flex-shrink: 0; }
@@ -253,13 +1053,18 @@ HTML_PAGE = r"""<!DOCTYPE html>
 
 <div id="controls">
   <h3>YOLO Overlay</h3>
+  <div class="row"><label>Model</label><span class="val" id="model-status">Loading…</span></div>
   <div class="row"><label>Status</label><span class="val" id="status">Idle</span></div>
   <div class="row"><label>Detections</label><span class="val" id="det-count">0</span></div>
   <div class="row"><label>Latency</label><span class="val" id="latency">—</span></div>
+  <div class="row"><label>Frame age</label><span class="val" id="frame-age">—</span></div>
+  <div class="row"><label>Quality</label><span class="val" id="adapt">—</span></div>
   <div class="row"><label>Score</label><span class="val" id="score">—</span></div>
   <div class="row"><label>Level</label><span class="val" id="level">—</span></div>
   <div class="row"><label>Confidence</label><span class="val" id="conf-val">__CONF__</span></div>
   <input type="range" id="conf-slider" min="0.05" max="0.95" step="0.05" value="__CONF__">
+  <div class="row"><label for="timings-toggle">Stage timings</label><input type="checkbox" id="timings-toggle"></div>
+  <div id="timings"></div>
   <button id="start-btn" onclick="toggleCapture()">Start YOLO</button>
   <div id="legend"></div>
 </div>
@@ -277,23 +1082,42 @@ let classNames = [];
 let stream = null;
 let isRunning = false;
 let detecting = false;
-let detections = [];
+// Detections go to the renderer as packed rows of [x1, y1, x2, y2, conf, cls]
+// or, when the server tracks, [x1, y1, x2, y2, conf, cls, id, vx, vy]
+let detCount = 0;
+const EXTRAPOLATE_MAX = __EXTRAPOLATE_MAX__;  // seconds
+const OFFSCREEN_RENDER = __OFFSCREEN_RENDER__;
 let detImgW = 640, detImgH = 480;
 let confThreshold = __CONF__;
 let fpsDelay = __FPS_DELAY__;
+let sendWidth = 640;
+let sendQuality = 0.7;
+let modelImgsz = 0;  // 0 = the model's own input size
 let detectInterval = null;
 let statsInterval = null;
-let vlEnabled = __VL_ENABLED__;
+let statsEnabled = __STATS_ENABLED__;
+const STATS_SERVER_SIDE = __STATS_SERVER_SIDE__;
+const STATS_CROP = __STATS_CROP__;  // [x1, y1, x2, y2] fractions of the frame
+const STATS_INTERVAL = __STATS_INTERVAL__;  // ms
+const STATS_MIN_FRAME_WIDTH = __STATS_MIN_FRAME_WIDTH__;  // Narrowest sent frame the server reads stats from
+let wsEnabled = __WS_ENABLED__;
+let binaryResponses = __BINARY__;
+const WS_MAX_IN_FLIGHT = __WS_MAX_IN_FLIGHT__;
+let ws = null;
+let wsReady = false;
+let wsFrameId = 0;
+const wsInFlight = new Map();  // frame id -> { captured, sent } (null while the frame is captured)
+// Identifies this tab to the server, which keeps a tracker and frame gate per session
+const sessionId = Math.random().toString(36).slice(2, 10) + Date.now().toString(36);
 
 const videoEl  = document.createElement('video');
-const capCanvas = document.createElement('canvas');
-const capCtx   = capCanvas.getContext('2d');
+const CAPTURE_POOL = __CAPTURE_POOL__;
 const overlay  = document.getElementById('overlay');
-const overlayCtx = overlay.getContext('2d');
 
 // -------- Init --------
 fetch('/classes').then(r => r.json()).then(names => {
   classNames = names;
+  renderer.setNames(names);
   const legend = document.getElementById('legend');
   names.forEach((name, i) => {
     legend.innerHTML += `<div class="legend-item">
@@ -302,6 +1126,25 @@ fetch('/classes').then(r => r.json()).then(names => {
   });
 });
 
+// Poll /ready until the model has loaded and warmed up
+function pollReady() {
+  fetch('/ready').then(r => r.json()).then(s => {
+    const el = document.getElementById('model-status');
+    if (s.ready) {
+      modelReady = true;
+      adaptLast = performance.now();  // First period starts with the first real inference
+      el.textContent = `Ready (${s.seconds.toFixed(1)}s)`;
+    } else if (s.error) {
+      el.textContent = 'Failed';
+      el.title = s.error;
+    } else {
+      el.textContent = `${Math.round(s.progress * 100)}% ${s.stage}`;
+      setTimeout(pollReady, 500);
+    }
+  }).catch(() => setTimeout(pollReady, 1000));
+}
+pollReady();
+
 // Check if iframe loaded
 const iframe = document.getElementById('game-frame');
 iframe.addEventListener('load', () => {
@@ -320,8 +1163,110 @@ setTimeout(() => {
 document.getElementById('conf-slider').addEventListener('input', e => {
   confThreshold = parseFloat(e.target.value);
   document.getElementById('conf-val').textContent = confThreshold.toFixed(2);
+  renderer.setConf(confThreshold);
 });
 
+// -------- Stage timings panel --------
+const TIMING_STAGES = ['uplink', 'read', 'parse', 'b64decode', 'imdecode', 'gate', 'queue_wait',
+                       'preprocess', 'forward', 'nms', 'postprocess', 'serialize', 'send', 'total',
+                       'capture_to_reply'];
+let timingsInterval = null;
+
+document.getElementById('timings-toggle').addEventListener('change', e => {
+  document.getElementById('timings').style.display = e.target.checked ? 'block' : 'none';
+  clearInterval(timingsInterval);
+  if (e.target.checked) {
+    refreshTimings();
+    timingsInterval = setInterval(refreshTimings, 1000);
+  }
+});
+
+function refreshTimings() {
+  fetch('/metrics.json').then(r => r.json()).then(m => {
+    let html = '<table><tr><td>stage (ms)</td><td>p50</td><td>p95</td><td>p99</td></tr>';
+    for (const stage of TIMING_STAGES) {
+      const s = m.stages[stage];
+      if (!s) continue;
+      html += `<tr><td>${stage}</td><td>${s.p50.toFixed(1)}</td><td>${s.p95.toFixed(1)}</td><td>${s.p99.toFixed(1)}</td></tr>`;
+    }
+    document.getElementById('timings').innerHTML = html + '</table>';
+  }).catch(() => {});
+}
+
+// -------- Adaptive quality --------
+// Closed loop on measured latency plus the inference time and queue depth the
+// server reports (this session's frames waiting behind the answered one; only
+// frames beyond what the client keeps in flight count): under pressure one setting steps down per period (model input
+// size first when inference dominates, otherwise JPEG quality and send width;
+// the capture interval last), and with headroom the most recently lowered one
+// steps back up. Nothing is measured until the model is ready: replies are all
+// busy while it loads.
+const ADAPT = __ADAPT__;
+const adaptKnobs = {
+  quality: { values: ADAPT.qualities, i: 0 },
+  width: { values: ADAPT.widths, i: 0 },
+  imgsz: { values: ADAPT.imgsz, i: 0 },
+  interval: { values: ADAPT.intervals, i: 0 },
+};
+const adaptLowered = [];  // Knob names in the order they were stepped down
+let adaptLatency = 0, adaptInfer = 0, adaptQueue = 0, adaptBusy = 0, adaptLast = 0;
+let modelReady = false;
+
+function applyKnobs() {
+  sendQuality = adaptKnobs.quality.values[adaptKnobs.quality.i];
+  sendWidth = adaptKnobs.width.values[adaptKnobs.width.i];
+  modelImgsz = adaptKnobs.imgsz.values[adaptKnobs.imgsz.i];
+  fpsDelay = adaptKnobs.interval.values[adaptKnobs.interval.i];
+  document.getElementById('adapt').textContent =
+    `${sendWidth}px q${Math.round(sendQuality * 100)} ${modelImgsz ? modelImgsz : 'model'} ${Math.round(1000 / fpsDelay)}fps`;
+}
+applyKnobs();
+
+function adaptStep(down) {
+  if (!down) {
+    // Undo the most recent step down
+    if (!adaptLowered.length) return;
+    adaptKnobs[adaptLowered.pop()].i--;
+    applyKnobs();
+    return;
+  }
+  const order = adaptInfer > adaptLatency / 2 ? ['imgsz', 'width', 'quality', 'interval']
+    : ['quality', 'width', 'imgsz', 'interval'];
+  for (const name of order) {
+    const k = adaptKnobs[name];
+    if (k.i + 1 < k.values.length) {
+      k.i++;
+      adaptLowered.push(name);
+      applyKnobs();
+      return;
+    }
+  }
+}
+
+function adaptObserve(data, latency) {
+  if (!ADAPT.enabled || !modelReady) return;
+  if (data.busy) {
+    adaptBusy++;
+  } else {
+    adaptLatency = adaptLatency ? 0.8 * adaptLatency + 0.2 * latency : latency;
+    if (!data.cached && data.inferMs) adaptInfer = adaptInfer ? 0.8 * adaptInfer + 0.2 * data.inferMs : data.inferMs;
+  }
+  // Our own pipelining keeps up to allowance - 1 frames queued behind this one
+  const allowance = wsReady ? WS_MAX_IN_FLIGHT : 1;
+  adaptQueue = Math.max(adaptQueue, (data.queue || 0) + 1 - allowance);
+
+  const now = performance.now();
+  if (now - adaptLast < ADAPT.periodMs) return;
+  adaptLast = now;
+  if (adaptBusy || adaptQueue > 0 || adaptLatency > ADAPT.targetMs * 1.2) {
+    adaptStep(true);
+  } else if (adaptLatency < ADAPT.targetMs * 0.6) {
+    adaptStep(false);
+  }
+  adaptBusy = 0;
+  adaptQueue = 0;
+}
+
 // -------- Capture control --------
 async function toggleCapture() {
   if (isRunning) {
@@ -376,6 +1321,7 @@ async function startCapture() {
   videoEl.srcObject = stream;
   videoEl.muted = true;
   await videoEl.play();
+  startFrameCapture(stream.getVideoTracks()[0]);
 
   isRunning = true;
   const btn = document.getElementById('start-btn');
@@ -383,12 +1329,14 @@ async function startCapture() {
   btn.classList.add('running');
   document.getElementById('status').textContent = 'Running';
 
+  // Stream frames over a WebSocket when available (POST /detect otherwise)
+  openSocket();
   // Start detection loop (~1fps)
   detectLoop();
-  // Start render loop (60fps)
-  renderLoop();
-  // Start stats polling (every 2s) if VL is enabled
-  if (vlEnabled) {
+  // Start drawing (on animation frames, only when something changed)
+  renderer.start();
+  // Start stats polling (every 2s) if the stats reader or VL is enabled
+  if (statsEnabled) {
     statsLoop();
   }
 }
@@ -400,7 +1348,9 @@ function stopCapture() {
     stream = null;
   }
   videoEl.srcObject = null;
-  detections = [];
+  stopFrameCapture();
+  if (ws) ws.close();
+  detCount = 0;
   clearTimeout(detectInterval);
   clearTimeout(statsInterval);
 
@@ -410,45 +1360,303 @@ function stopCapture() {
   document.getElementById('status').textContent = 'Idle';
   document.getElementById('det-count').textContent = '0';
   document.getElementById('latency').textContent = '—';
+  document.getElementById('frame-age').textContent = '—';
   document.getElementById('score').textContent = '—';
   document.getElementById('level').textContent = '—';
 
   // Clear overlay
-  overlay.width = window.innerWidth;
-  overlay.height = window.innerHeight;
-  overlayCtx.clearRect(0, 0, overlay.width, overlay.height);
+  renderer.stop();
+}
+
+// -------- WebSocket transport --------
+function openSocket() {
+  if (!wsEnabled || ws) return;
+  ws = new WebSocket(`ws://${location.host}/ws?session=${sessionId}` + (binaryResponses ? '&format=binary' : ''));
+  ws.binaryType = 'arraybuffer';
+  ws.onopen = () => { wsReady = true; };
+  ws.onmessage = e => {
+    // Results are binary when requested; errors always arrive as JSON text
+    const data = typeof e.data === 'string' ? JSON.parse(e.data) : decodeBinary(e.data);
+    const frame = wsInFlight.get(data.id);
+    wsInFlight.delete(data.id);
+    if (!data.error) applyDetections(data, frame && frame.captured, frame && frame.sent);
+  };
+  // On error or close we simply fall back to POST /detect
+  ws.onclose = () => {
+    ws = null;
+    wsReady = false;
+    wsInFlight.clear();
+  };
+}
+
+function sendFrameWs() {
+  const id = wsFrameId = (wsFrameId + 1) >>> 0;
+  wsInFlight.set(id, null);  // Holds the slot while the frame is captured
+  grabFrame(sendWidth, sendQuality).then(frame => {
+    if (!frame || !wsReady) { wsInFlight.delete(id); return; }
+    wsInFlight.set(id, { captured: frame.captured, sent: nowMs() });
+    // Binary message: <u32 frame id><f32 conf><u16 imgsz><2 pad><f64 capture time, ms since
+    // the epoch><JPEG bytes>, little-endian (see WS_FRAME_HEADER)
+    const header = new DataView(new ArrayBuffer(20));
+    header.setUint32(0, id, true);
+    header.setFloat32(4, confThreshold, true);
+    header.setUint16(8, modelImgsz, true);
+    header.setFloat64(12, frame.captured, true);
+    ws.send(new Blob([header.buffer, frame.blob]));
+  });
+}
+
+// Binary reply: <u32 id><u16 imgW><u16 imgH><u16 count><u8 flags><u8 stride>
+// <u16 inference ms><u16 queue depth> followed by count little-endian float32
+// rows (see encode_binary)
+function decodeBinary(buf) {
+  const head = new DataView(buf, 0, 16);
+  const count = head.getUint16(8, true);
+  const flags = head.getUint8(10);
+  const stride = head.getUint8(11);
+  return {
+    id: head.getUint32(0, true),
+    imgW: head.getUint16(4, true),
+    imgH: head.getUint16(6, true),
+    busy: (flags & 1) !== 0,
+    cached: (flags & 2) !== 0,
+    inferMs: head.getUint16(12, true),
+    queue: head.getUint16(14, true),
+    rows: new Float32Array(buf, 16, count * stride),
+    count: count,
+    stride: stride
+  };
+}
+
+// Pack JSON detections into the same row layout the binary format uses
+function packDetections(list) {
+  const stride = list.length && list[0].id !== undefined ? 9 : 6;
+  const rows = new Float32Array(list.length * stride);
+  list.forEach((d, i) => rows.set(stride === 9
+    ? [d.x1, d.y1, d.x2, d.y2, d.conf, d.cls, d.id, d.vx, d.vy]
+    : [d.x1, d.y1, d.x2, d.y2, d.conf, d.cls], i * stride));
+  return { rows: rows, stride: stride };
+}
+
+// captured is when the frame was grabbed and sent when its request went out (both
+// ms since the epoch); the controller adapts on send-to-reply latency, while the
+// frame age (capture to overlay) also covers grabbing and encoding
+function applyDetections(data, captured, sent) {
+  // A busy reply means our frame was dropped; it carries the latest result
+  document.getElementById('status').textContent = data.busy ? 'Busy' : 'Running';
+  let rows = data.rows, stride = data.stride;
+  detCount = data.count;
+  if (!rows) {
+    const list = data.detections || [];
+    const packed = packDetections(list);
+    rows = packed.rows;
+    stride = packed.stride;
+    detCount = list.length;
+  }
+  detImgW = data.imgW || detImgW;
+  detImgH = data.imgH || detImgH;
+  const now = nowMs();
+  renderer.setDetections(rows, detCount, stride, detImgW, detImgH, captured || now);
+  document.getElementById('det-count').textContent = detCount;
+  if (captured) document.getElementById('frame-age').textContent = Math.round(now - captured) + 'ms';
+  if (sent) {
+    const latency = now - sent;
+    document.getElementById('latency').textContent =
+      Math.round(latency) + 'ms' + (data.inferMs ? ` (model ${Math.round(data.inferMs)}ms)` : '');
+    adaptObserve(data, latency);
+  }
+}
+
+// -------- Frame capture --------
+// Frames are grabbed and JPEG-encoded off the main thread: a Web Worker reads
+// the shared track through MediaStreamTrackProcessor where available (keeping
+// only the newest frame), or is handed an ImageBitmap that createImageBitmap
+// scaled asynchronously. It draws into one of a few reusable OffscreenCanvases
+// and encodes with convertToBlob. Without workers the same encoder runs on the
+// page with ordinary canvases and toBlob. Every frame carries the time it was
+// grabbed, in ms since the epoch, which the server and the frame-age display use
+// to measure capture-to-overlay latency. A screen-capture track only emits a
+// frame when the screen changes, so the newest frame is what the screen shows
+// at grab time, however long ago it arrived.
+const nowMs = () => performance.timeOrigin + performance.now();
+
+// Scales a source (or its crop, [x1, y1, x2, y2] fractions) into a pooled
+// canvas and encodes it, width 0 meaning native resolution; resolves to null
+// when every canvas is still busy encoding
+function createEncoder(makeCanvas, poolSize) {
+  const pool = [];
+  return function encode(source, srcW, srcH, width, quality, crop) {
+    const sx = crop ? Math.round(crop[0] * srcW) : 0;
+    const sy = crop ? Math.round(crop[1] * srcH) : 0;
+    const sw = crop ? Math.round(crop[2] * srcW) - sx : srcW;
+    const sh = crop ? Math.round(crop[3] * srcH) - sy : srcH;
+    const w = width ? Math.min(width, sw) : sw;
+    const h = Math.round(w * sh / sw);
+    let slot = pool.find(c => !c.busy && c.canvas.width === w && c.canvas.height === h) || pool.find(c => !c.busy);
+    if (!slot) {
+      if (pool.length >= poolSize) return Promise.resolve(null);
+      const canvas = makeCanvas();
+      slot = { canvas: canvas, ctx: canvas.getContext('2d'), busy: false };
+      pool.push(slot);
+    }
+    if (slot.canvas.width !== w || slot.canvas.height !== h) {
+      slot.canvas.width = w;
+      slot.canvas.height = h;
+    }
+    slot.busy = true;
+    slot.ctx.drawImage(source, sx, sy, sw, sh, 0, 0, w, h);
+    const encoded = slot.canvas.convertToBlob
+      ? slot.canvas.convertToBlob({ type: 'image/jpeg', quality: quality })
+      : new Promise(resolve => slot.canvas.toBlob(resolve, 'image/jpeg', quality));
+    return encoded.finally(() => { slot.busy = false; });
+  };
+}
+
+// Worker side: messages are { type: 'track', readable }, { type: 'grab', id, width,
+// quality, crop[, bitmap, captured] }; grabs answer { id, blob, captured }. Stopping
+// terminates the worker, which releases the frame it holds
+function captureWorker(poolSize) {
+  const encode = createEncoder(() => new OffscreenCanvas(1, 1), poolSize);
+  let latest = null;
+
+  async function pump(readable) {
+    const reader = readable.getReader();
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      if (latest) latest.close();
+      latest = value;
+    }
+  }
+
+  self.onmessage = async e => {
+    const m = e.data;
+    if (m.type === 'track') {
+      pump(m.readable).catch(() => {});
+      return;
+    }
+    const source = m.bitmap || latest;
+    const captured = m.bitmap ? m.captured : performance.timeOrigin + performance.now();
+    let blob = null;
+    if (source) {
+      try {
+        // drawImage runs before the first await, so pump() cannot close the frame mid-draw
+        blob = await encode(source, source.displayWidth || source.width, source.displayHeight || source.height,
+                            m.width, m.quality, m.bitmap ? null : m.crop);
+      } catch (err) {
+        blob = null;
+      }
+    }
+    if (m.bitmap) m.bitmap.close();
+    self.postMessage({ id: m.id, blob: blob, captured: captured });
+  };
+}
+
+let capture = null;  // { worker, processor track, pending grabs } when capturing in a worker
+let encodeOnPage = null;
+let grabId = 0;
+
+function startFrameCapture(track) {
+  if (typeof Worker !== 'function' || typeof OffscreenCanvas !== 'function') return;
+  try {
+    const src = `${createEncoder.toString()}\n${captureWorker.toString()}\ncaptureWorker(${CAPTURE_POOL});`;
+    const worker = new Worker(URL.createObjectURL(new Blob([src], { type: 'text/javascript' })));
+    capture = { worker: worker, track: null, grabs: new Map() };
+    worker.onmessage = e => {
+      const resolve = capture && capture.grabs.get(e.data.id);
+      if (!resolve) return;
+      capture.grabs.delete(e.data.id);
+      resolve(e.data.blob ? { blob: e.data.blob, captured: e.data.captured } : null);
+    };
+    if (typeof MediaStreamTrackProcessor === 'function') {
+      // A clone, so the processor consuming frames never starves the <video> element
+      const clone = track.clone();
+      const processor = new MediaStreamTrackProcessor({ track: clone });
+      worker.postMessage({ type: 'track', readable: processor.readable }, [processor.readable]);
+      capture.track = clone;
+    }
+  } catch (e) {
+    console.warn('Capture worker unavailable, encoding on the page:', e);
+    stopFrameCapture();
+  }
+}
+
+function stopFrameCapture() {
+  if (!capture) return;
+  if (capture.track) capture.track.stop();
+  capture.worker.terminate();
+  capture.grabs.forEach(resolve => resolve(null));
+  capture = null;
+}
+
+// Capture the current frame (or a crop of it) at most width pixels wide, 0 = native
+// resolution; resolves to { blob, captured } or null
+function grabFrame(width, quality, crop) {
+  const vw = videoEl.videoWidth, vh = videoEl.videoHeight;
+  if (!vw) return Promise.resolve(null);
+  if (capture) {
+    const id = grabId = (grabId + 1) >>> 0;
+    return new Promise(resolve => {
+      capture.grabs.set(id, resolve);
+      if (capture.track) {
+        capture.worker.postMessage({ type: 'grab', id: id, width: width, quality: quality, crop: crop });
+        return;
+      }
+      const r = crop || [0, 0, 1, 1];
+      const sx = Math.round(r[0] * vw), sy = Math.round(r[1] * vh);
+      const sw = Math.round(r[2] * vw) - sx, sh = Math.round(r[3] * vh) - sy;
+      const w = width ? Math.min(width, sw) : sw;
+      const captured = nowMs();
+      createImageBitmap(videoEl, sx, sy, sw, sh,
+                        { resizeWidth: w, resizeHeight: Math.round(w * sh / sw), resizeQuality: 'low' })
+        .then(bitmap => {
+          if (!capture) { bitmap.close(); return; }
+          capture.worker.postMessage({ type: 'grab', id: id, width: w, quality: quality, bitmap: bitmap,
+                                       captured: captured }, [bitmap]);
+        })
+        .catch(() => {
+          if (capture) capture.grabs.delete(id);
+          resolve(null);
+        });
+    });
+  }
+  if (!encodeOnPage) encodeOnPage = createEncoder(() => document.createElement('canvas'), CAPTURE_POOL);
+  const captured = nowMs();
+  return encodeOnPage(videoEl, vw, vh, width, quality, crop).then(blob => blob && { blob: blob, captured: captured });
 }
 
 // -------- Detection loop (1fps) --------
 function detectLoop() {
   if (!isRunning) return;
 
-  if (!detecting && videoEl.videoWidth > 0) {
+  if (wsReady) {
+    if (wsInFlight.size < WS_MAX_IN_FLIGHT && videoEl.videoWidth > 0) {
+      sendFrameWs();
+    }
+  } else if (!detecting && videoEl.videoWidth > 0) {
     detecting = true;
-    const t0 = performance.now();
-
-    // Resize to max 640px wide
-    const aspect = videoEl.videoHeight / videoEl.videoWidth;
-    const sendW = Math.min(640, videoEl.videoWidth);
-    const sendH = Math.round(sendW * aspect);
-    capCanvas.width = sendW;
-    capCanvas.height = sendH;
-    capCtx.drawImage(videoEl, 0, 0, sendW, sendH);
-
-    const dataUrl = capCanvas.toDataURL('image/jpeg', 0.7);
-
-    fetch('/detect', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ image: dataUrl, conf: confThreshold })
+    let captured = 0, sent = 0;
+
+    // The encoded frame is the whole body; everything else rides in the query string
+    grabFrame(sendWidth, sendQuality)
+    .then(frame => {
+      if (!frame) return null;
+      captured = frame.captured;
+      const query = new URLSearchParams({ conf: confThreshold, imgsz: modelImgsz, session: sessionId,
+                                          format: binaryResponses ? 'binary' : 'json', captured: captured });
+      sent = nowMs();
+      return fetch('/detect?' + query, {
+        method: 'POST',
+        headers: { 'Content-Type': frame.blob.type || 'image/jpeg' },
+        body: frame.blob
+      })
+      .then(r => {
+        if (!r.ok) return r.json();
+        return binaryResponses ? r.arrayBuffer().then(decodeBinary) : r.json();
+      });
     })
-    .then(r => r.json())
     .then(data => {
-      detections = data.detections || [];
-      detImgW = data.imgW || sendW;
-      detImgH = data.imgH || sendH;
-      document.getElementById('det-count').textContent = detections.length;
-      document.getElementById('latency').textContent = Math.round(performance.now() - t0) + 'ms';
+      if (data) applyDetections(data, captured, sent);
       detecting = false;
     })
     .catch(err => {
@@ -461,89 +1669,234 @@ function detectLoop() {
 }
 
 // -------- Render loop (60fps) --------
-function renderLoop() {
-  if (!isRunning) return;
-
-  overlay.width = window.innerWidth;
-  overlay.height = window.innerHeight;
-  const ctx = overlayCtx;
-  ctx.clearRect(0, 0, overlay.width, overlay.height);
+// Draws only when something changed (new detections, the confidence slider, a
+// resize) or while tracked boxes are still gliding along their velocity. The
+// canvas is resized on window resize only, since resizing reallocates and clears
+// it; label widths are measured once per class/confidence text, and each color's
+// boxes and label backgrounds go out as one path. The same code runs in a Web
+// Worker on an OffscreenCanvas when the browser allows, so drawing stays off the
+// game tab's main thread. Times are absolute (timeOrigin + now), which a worker
+// shares with the page.
+function createRenderer(canvas, ctx, colors, extrapolateMax) {
+  const FONT = 'bold 13px system-ui, sans-serif';
+  const LABEL_H = 18;
+  const raf = typeof requestAnimationFrame === 'function' ? requestAnimationFrame : cb => setTimeout(cb, 16);
+  let names = [];
+  let rows = new Float32Array(0), count = 0, stride = 6, imgW = 640, imgH = 480, time = 0;
+  let conf = 0;
+  let running = false, changed = true, dirty = true, moving = false, lastDt = 0;
+  const labels = new Map();  // cls * 101 + percent -> { text, width }
+  const colorEnd = new Int32Array(colors.length);  // order[] slice end of each color
+  let order = new Uint16Array(64);  // visible rows, grouped by color
+  let slots = [];  // label entry per order[] slot
+  let corners = new Float32Array(128);  // x1, y1 per order[] slot
+  let visible = 0;
+
+  function label(cls, c) {
+    const pct = Math.round(c * 100);
+    const key = cls * 101 + pct;
+    let entry = labels.get(key);
+    if (!entry) {
+      const text = `${names[cls] !== undefined ? names[cls] : cls} ${pct}%`;
+      entry = { text: text, width: ctx.measureText(text).width };
+      labels.set(key, entry);
+    }
+    return entry;
+  }
 
-  if (detections.length === 0) {
-    requestAnimationFrame(renderLoop);
-    return;
+  // Counting sort of the rows above the threshold by color; runs once per change
+  function prepare() {
+    if (order.length < count) {
+      order = new Uint16Array(count * 2);
+      corners = new Float32Array(count * 4);
+    }
+    colorEnd.fill(0);
+    moving = false;
+    for (let i = 0; i < count; i++) {
+      if (rows[i * stride + 4] >= conf) colorEnd[rows[i * stride + 5] % colors.length]++;
+    }
+    let total = 0;
+    for (let c = 0; c < colors.length; c++) {
+      total += colorEnd[c];
+      colorEnd[c] = total - colorEnd[c];  // Start for now; the fill below advances it to the end
+    }
+    visible = total;
+    if (slots.length < total) slots = new Array(total * 2);
+    for (let i = 0; i < count; i++) {
+      const o = i * stride;
+      if (rows[o + 4] < conf) continue;
+      const j = colorEnd[rows[o + 5] % colors.length]++;
+      order[j] = i;
+      slots[j] = label(rows[o + 5], rows[o + 4]);
+      if (stride >= 9 && (rows[o + 7] || rows[o + 8])) moving = true;
+    }
   }
 
-  const scaleX = overlay.width / detImgW;
-  const scaleY = overlay.height / detImgH;
-
-  for (const det of detections) {
-    if (det.conf < confThreshold) continue;
-
-    const x1 = det.x1 * scaleX;
-    const y1 = det.y1 * scaleY;
-    const x2 = det.x2 * scaleX;
-    const y2 = det.y2 * scaleY;
-    const w = x2 - x1;
-    const h = y2 - y1;
-    const color = CLASS_COLORS[det.cls % CLASS_COLORS.length];
-
-    // Box
-    ctx.strokeStyle = color;
-    ctx.lineWidth = 2;
-    ctx.strokeRect(x1, y1, w, h);
-
-    // Label background
-    const label = `${det.name} ${(det.conf * 100).toFixed(0)}%`;
-    ctx.font = 'bold 13px system-ui, sans-serif';
-    const tw = ctx.measureText(label).width;
-    const lh = 18;
-    ctx.fillStyle = color;
-    ctx.globalAlpha = 0.8;
-    ctx.fillRect(x1, y1 - lh, tw + 8, lh);
-    ctx.globalAlpha = 1.0;
-
-    // Label text
+  function draw(now) {
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    lastDt = stride >= 9 ? Math.min(Math.max(now - time, 0) / 1000, extrapolateMax) : 0;
+    if (!visible) return;
+    const sx = canvas.width / imgW;
+    const sy = canvas.height / imgH;
+    const dt = lastDt;
+    let start = 0;
+    for (let c = 0; c < colors.length; c++) {
+      const end = colorEnd[c];
+      if (end === start) continue;
+      ctx.strokeStyle = ctx.fillStyle = colors[c];
+      ctx.beginPath();
+      for (let j = start; j < end; j++) {
+        const o = order[j] * stride;
+        const dx = dt ? rows[o + 7] * dt : 0;
+        const dy = dt ? rows[o + 8] * dt : 0;
+        const x1 = (rows[o] + dx) * sx;
+        const y1 = (rows[o + 1] + dy) * sy;
+        corners[j * 2] = x1;
+        corners[j * 2 + 1] = y1;
+        ctx.rect(x1, y1, (rows[o + 2] + dx) * sx - x1, (rows[o + 3] + dy) * sy - y1);
+      }
+      ctx.stroke();
+      ctx.beginPath();
+      for (let j = start; j < end; j++) {
+        ctx.rect(corners[j * 2], corners[j * 2 + 1] - LABEL_H, slots[j].width + 8, LABEL_H);
+      }
+      ctx.globalAlpha = 0.8;
+      ctx.fill();
+      ctx.globalAlpha = 1.0;
+      start = end;
+    }
     ctx.fillStyle = '#fff';
-    ctx.fillText(label, x1 + 4, y1 - 4);
+    for (let j = 0; j < visible; j++) {
+      ctx.fillText(slots[j].text, corners[j * 2] + 4, corners[j * 2 + 1] - 4);
+    }
+  }
+
+  function frame() {
+    if (!running) return;
+    if (changed) {
+      prepare();
+      changed = false;
+      dirty = true;
+    }
+    // Boxes with a velocity keep moving until the extrapolation limit is reached
+    if (dirty || (moving && lastDt < extrapolateMax)) {
+      draw(performance.timeOrigin + performance.now());
+      dirty = false;
+    }
+    raf(frame);
   }
 
-  requestAnimationFrame(renderLoop);
+  return {
+    setSize(w, h) {
+      canvas.width = w;
+      canvas.height = h;
+      ctx.font = FONT;  // Resizing resets the context state
+      ctx.lineWidth = 2;
+      changed = true;
+    },
+    setNames(n) { names = n; labels.clear(); changed = true; },
+    setConf(c) { conf = c; changed = true; },
+    setDetections(r, n, s, w, h, t) {
+      rows = r; count = n; stride = s; imgW = w; imgH = h; time = t;
+      changed = true;
+    },
+    start() {
+      if (running) return;
+      running = true;
+      changed = true;
+      raf(frame);
+    },
+    stop() {
+      running = false;
+      count = 0;
+      visible = 0;
+      ctx.clearRect(0, 0, canvas.width, canvas.height);
+    }
+  };
 }
 
-// -------- Stats polling (2s interval) --------
-function statsLoop() {
-  if (!isRunning || !vlEnabled) return;
+// Worker side of the OffscreenCanvas renderer: messages are { type: method, args }
+function rendererWorker() {
+  let renderer = null;
+  self.onmessage = e => {
+    const m = e.data;
+    if (m.type === 'init') {
+      renderer = createRenderer(m.canvas, m.canvas.getContext('2d'), m.colors, m.extrapolateMax);
+    } else {
+      renderer[m.type](...m.args);
+    }
+  };
+}
 
-  if (videoEl.videoWidth > 0) {
-    // Capture current frame
-    const aspect = videoEl.videoHeight / videoEl.videoWidth;
-    const sendW = Math.min(640, videoEl.videoWidth);
-    const sendH = Math.round(sendW * aspect);
-    capCanvas.width = sendW;
-    capCanvas.height = sendH;
-    capCtx.drawImage(videoEl, 0, 0, sendW, sendH);
+function makeRenderer() {
+  if (OFFSCREEN_RENDER && overlay.transferControlToOffscreen && typeof Worker === 'function') {
+    try {
+      const src = `${createRenderer.toString()}\n(${rendererWorker.toString()})();`;
+      const worker = new Worker(URL.createObjectURL(new Blob([src], { type: 'text/javascript' })));
+      const canvas = overlay.transferControlToOffscreen();
+      worker.postMessage({ type: 'init', canvas: canvas, colors: CLASS_COLORS, extrapolateMax: EXTRAPOLATE_MAX },
+                         [canvas]);
+      const proxy = {};
+      ['setSize', 'setNames', 'setConf', 'setDetections', 'start', 'stop'].forEach(name => {
+        proxy[name] = (...args) => worker.postMessage({ type: name, args: args });
+      });
+      return proxy;
+    } catch (e) {
+      console.warn('OffscreenCanvas worker unavailable, drawing on the main thread:', e);
+    }
+  }
+  return createRenderer(overlay, overlay.getContext('2d'), CLASS_COLORS, EXTRAPOLATE_MAX);
+}
 
-    const dataUrl = capCanvas.toDataURL('image/jpeg', 0.7);
+const renderer = makeRenderer();
+renderer.setSize(window.innerWidth, window.innerHeight);
+renderer.setConf(confThreshold);
+window.addEventListener('resize', () => renderer.setSize(window.innerWidth, window.innerHeight));
 
-    fetch('/analyze_stats', {
+// -------- Stats polling (2s interval) --------
+// The stats bar is read from a frame the server already has: with
+// STATS_SERVER_SIDE the server reads incoming /detect frames by itself and the
+// page only polls the result; otherwise it asks for this session's newest frame
+// to be analyzed. Only when the server has none (or it was sent too small to
+// read) does the page upload, and then just the stats bar at native resolution.
+function requestStats() {
+  if (STATS_SERVER_SIDE) return fetch('/stats').then(r => r.json());
+  // Frames sent narrower than the server reads from would only earn a 404 first
+  const sentWidth = sendWidth ? Math.min(sendWidth, videoEl.videoWidth) : videoEl.videoWidth;
+  if (sentWidth < STATS_MIN_FRAME_WIDTH) return uploadStatsCrop();
+  return fetch(`/analyze_stats?frame=latest&session=${sessionId}`, { method: 'POST' })
+    .then(r => r.ok ? r.json() : uploadStatsCrop());
+}
+
+function uploadStatsCrop() {
+  return grabFrame(0, 0.9, STATS_CROP)
+    .then(frame => frame && fetch('/analyze_stats?cropped=1', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ image: dataUrl })
-    })
-    .then(r => r.json())
+      headers: { 'Content-Type': frame.blob.type || 'image/jpeg' },
+      body: frame.blob
+    }))
+    .then(r => r && r.json());
+}
+
+function statsLoop() {
+  if (!isRunning || !statsEnabled) return;
+
+  if (videoEl.videoWidth > 0) {
+    requestStats()
     .then(data => {
-      if (data.success) {
-        // Parse response like "Score: 12345, Level: 23"
-        const text = data.text;
+      if (data && data.success) {
+        // The template reader answers with numbers; VL text looks like "Score: 12345, Level: 23"
+        const text = data.text || '';
         const scoreMatch = text.match(/score[:\s]+(\d+)/i);
         const levelMatch = text.match(/level[:\s]+(\d+)/i);
-        
-        if (scoreMatch) {
-          document.getElementById('score').textContent = scoreMatch[1];
+        const score = data.score != null ? data.score : (scoreMatch && scoreMatch[1]);
+        const level = data.level != null ? data.level : (levelMatch && levelMatch[1]);
+
+        if (score != null) {
+          document.getElementById('score').textContent = score;
         }
-        if (levelMatch) {
-          document.getElementById('level').textContent = levelMatch[1];
+        if (level != null) {
+          document.getElementById('level').textContent = level;
         }
       }
     })
@@ -552,7 +1905,7 @@ function statsLoop() {
     });
   }
 
-  statsInterval = setTimeout(statsLoop, 2000); // Poll every 2 seconds
+  statsInterval = setTimeout(statsLoop, STATS_INTERVAL);
 }
 </script>
 </body>
@@ -560,8 +1913,49 @@ function statsLoop() {
 """
 
 
+def adapt_config():
+    """Settings ladder for the page's adaptive controller (first entries are the defaults)."""
+    intervals = [int(1000 / FPS_CAP)]
+    while intervals[-1] * 2 <= ADAPT_MAX_INTERVAL_MS:
+        intervals.append(intervals[-1] * 2)
+    return {
+        "enabled": ADAPT_ENABLED,
+        "targetMs": ADAPT_TARGET_MS,
+        "periodMs": ADAPT_PERIOD_MS,
+        "widths": ADAPT_SEND_WIDTHS,
+        "qualities": ADAPT_JPEG_QUALITIES,
+        # Exported backends have a fixed input size
+        "imgsz": ADAPT_IMGSZ if MODEL_BACKEND == "torch" else [0],
+        "intervals": intervals,
+    }
+
+
+def record_metrics(timer, job, result, captured=0.0):
+    """Fold one finished /detect request into the latency metrics.
+
+    captured is the page's capture time of the frame (ms since the epoch); it
+    adds "capture_to_reply", meaningful when page and server share a clock.
+    """
+    timer.add(job.timings)
+    stages = timer.total()
+    if captured:
+        stages["capture_to_reply"] = max(time.time() * 1000 - captured, 0.0)
+    metrics.record(stages)
+    if result.get("busy"):
+        metrics.count("frames_busy_total")
+    elif result.get("cached"):
+        metrics.count("frames_cached_total")
+    else:
+        metrics.count("frames_inferred_total")
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_OP_TEXT, WS_OP_BINARY, WS_OP_CLOSE, WS_OP_PING, WS_OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
 class Handler(http.server.BaseHTTPRequestHandler):
     def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
         if self.path in ("/", "/index.html"):
             # Convert Python RGB tuples to JavaScript RGB strings
             js_colors = [f"'rgb({r},{g},{b})'" for r, g, b in CLASS_COLORS]
@@ -570,10 +1964,59 @@ class Handler(http.server.BaseHTTPRequestHandler):
             html = HTML_PAGE.replace("__CONF__", str(CONF_THRESHOLD))
             html = html.replace("__FPS_DELAY__", str(int(1000 / FPS_CAP)))
             html = html.replace("__CLASS_COLORS__", colors_js)
-            html = html.replace("__VL_ENABLED__", "true" if VL_ENABLED else "false")
+            html = html.replace("__STATS_ENABLED__", "true" if VL_ENABLED or STATS_READER_ENABLED else "false")
+            html = html.replace("__STATS_SERVER_SIDE__", "true" if STATS_SERVER_SIDE else "false")
+            html = html.replace("__STATS_CROP__", json.dumps(STATS_CROP))
+            html = html.replace("__STATS_INTERVAL__", str(int(VL_POLL_INTERVAL * 1000)))
+            html = html.replace("__STATS_MIN_FRAME_WIDTH__", str(STATS_MIN_FRAME_WIDTH))
+            html = html.replace("__WS_ENABLED__", "true" if WS_ENABLED and SERVER_THREADED else "false")
+            html = html.replace("__WS_MAX_IN_FLIGHT__", str(WS_MAX_IN_FLIGHT))
+            html = html.replace("__CAPTURE_POOL__", str(CAPTURE_POOL))
+            html = html.replace("__BINARY__", "true" if RESPONSE_FORMAT == "binary" else "false")
+            html = html.replace("__EXTRAPOLATE_MAX__", str(EXTRAPOLATE_MAX))
+            html = html.replace("__OFFSCREEN_RENDER__", "true" if OFFSCREEN_RENDER else "false")
+            html = html.replace("__ADAPT__", json.dumps(adapt_config()))
             self._send(200, "text/html", html.encode())
+        elif self.path == "/ready":
+            self._send(200 if startup["ready"] else 503, "application/json", json.dumps(startup).encode())
         elif self.path == "/classes":
             self._send(200, "application/json", json.dumps(class_names).encode())
+        elif url.path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            if not (WS_ENABLED and SERVER_THREADED):
+                self.send_error(404)
+                return
+            query = urllib.parse.parse_qs(url.query)
+            self._serve_ws(binary=query.get("format") == ["binary"], session_id=query.get("session", [None])[0])
+        elif self.path == "/gate_stats":
+            self._send(200, "application/json", json.dumps(infer_queue.gate_stats()).encode())
+        elif self.path == "/roi_stats":
+            stats = {"enabled": ROI_ENABLED, "sessions": infer_queue.detector_stats("roi")}
+            self._send(200, "application/json", json.dumps(stats).encode())
+        elif self.path == "/tile_stats":
+            stats = {"mode": TILE_MODE, "sessions": infer_queue.detector_stats("tiler")}
+            self._send(200, "application/json", json.dumps(stats).encode())
+        elif self.path == "/sessions":
+            self._send(200, "application/json", json.dumps(infer_queue.session_stats()).encode())
+        elif url.path == "/metrics":
+            gate = infer_queue.gate_stats()
+            extra = dict(infer_queue.counters(), **{f"gate_{k}_total": gate[k]
+                                                    for k in ("checks", "hits", "shifted_hits")})
+            text = metrics.prometheus(extra_counters=extra, gauges=infer_queue.gauges())
+            self._send(200, "text/plain; version=0.0.4", text.encode())
+        elif url.path == "/metrics.json":
+            snap = metrics.snapshot()
+            snap["counters"].update(infer_queue.counters())
+            snap["gauges"] = infer_queue.gauges()
+            snap["gate"] = infer_queue.gate_stats()
+            self._send(200, "application/json", json.dumps(snap).encode())
+        elif self.path == "/stats":
+            # Latest published stats, for polling without uploading a frame
+            self._send(200, "application/json", json.dumps(stats_worker.result()).encode())
+        elif self.path == "/stats_reader":
+            stats = stats_reader.stats() if stats_reader else {}
+            stats = dict(stats, enabled=STATS_READER_ENABLED, worker=stats_worker.stats(),
+                         frame_cache=frame_cache.stats())
+            self._send(200, "application/json", json.dumps(stats).encode())
         elif self.path == "/vl_config":
             config = {"model": VL_MODEL, "prompt": VL_PROMPT, "interval": VL_POLL_INTERVAL, "enabled": VL_ENABLED}
             self._send(200, "application/json", json.dumps(config).encode())
@@ -584,43 +2027,72 @@ class Handler(http.server.BaseHTTPRequestHandler):
         else:
             self.send_error(404)
 
+    def _image_body(self, timer=None):
+        """Encoded image bytes and parameters of a POST.
+
+        The page sends the image itself as the body (Content-Type image/*) with
+        parameters in the query string; JSON bodies carry {"image": data URL, ...}.
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if timer:
+            timer.mark("read")
+        if self.headers.get("Content-Type", "").startswith("image/"):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            return body, {key: values[0] for key, values in query.items()}
+        data = json.loads(body)
+        if timer:
+            timer.mark("parse")
+        img_b64 = data["image"]
+        if "," in img_b64:
+            img_b64 = img_b64.split(",", 1)[1]
+        img_bytes = base64.b64decode(img_b64)
+        if timer:
+            timer.mark("b64decode")
+        return img_bytes, data
+
     def do_POST(self):
-        if self.path == "/analyze_stats":
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/analyze_stats":
             try:
-                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
-                data = json.loads(body)
-
-                # Decode image
-                img_b64 = data["image"]
-                if "," in img_b64:
-                    img_b64 = img_b64.split(",", 1)[1]
-                img_bytes = base64.b64decode(img_b64)
-                nparr = np.frombuffer(img_bytes, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-                if img is None:
-                    self._send(400, "application/json", b'{"success":false,"error":"bad image"}')
-                    return
-
-                # Analyze stats with VL model
-                result = analyze_stats(img)
+                query = urllib.parse.parse_qs(url.query)
+                if "frame" in query:
+                    # ?frame=<id>|latest[&session=<id>]: crop a frame /detect already decoded
+                    img = frame_cache.get(query["frame"][0], query.get("session", [None])[0],
+                                          STATS_MIN_FRAME_WIDTH)
+                    if img is None:
+                        error = f"no cached frame at least {STATS_MIN_FRAME_WIDTH}px wide"
+                        self._send(404, "application/json",
+                                   json.dumps({"success": False, "error": error}).encode())
+                        return
+                    cropped = crop_stats(img)
+                else:
+                    # An uploaded frame, or with cropped=1 just the stats bar
+                    img_bytes, params = self._image_body()
+                    img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+                    if img is None:
+                        self._send(400, "application/json", b'{"success":false,"error":"bad image"}')
+                        return
+                    cropped = img if params.get("cropped") in ("1", 1, True) else crop_stats(img)
+
+                # Hand the crop to the stats worker; answer with a fresh result
+                # if it is quick (templates), otherwise with the latest one
+                seq = stats_worker.submit(cropped)
+                result = stats_worker.wait_newer(seq, STATS_WAIT)
                 self._send(200, "application/json", json.dumps(result).encode())
 
             except Exception as e:
                 self._send(500, "application/json",
                            json.dumps({"success": False, "error": str(e)}).encode())
-        elif self.path == "/detect":
+        elif url.path == "/detect":
             try:
-                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
-                data = json.loads(body)
-
-                # Decode image
-                img_b64 = data["image"]
-                if "," in img_b64:
-                    img_b64 = img_b64.split(",", 1)[1]
-                img_bytes = base64.b64decode(img_b64)
+                timer = StageTimer()
+                img_bytes, data = self._image_body(timer)
+                captured = float(data.get("captured", 0))
+                if captured:
+                    timer.stages["uplink"] = max(time.time() * 1000 - captured, 0.0)
                 nparr = np.frombuffer(img_bytes, np.uint8)
                 img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                timer.mark("imdecode")
 
                 if img is None:
                     self._send(400, "application/json", b'{"error":"bad image"}')
@@ -628,28 +2100,24 @@ class Handler(http.server.BaseHTTPRequestHandler):
 
                 conf = float(data.get("conf", CONF_THRESHOLD))
 
-                # Run YOLO
-                results = model(img, verbose=False, conf=conf)
-
-                detections = []
-                for r in results:
-                    for box in r.boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        c = float(box.conf[0])
-                        cls = int(box.cls[0])
-                        name = class_names[cls] if cls < len(class_names) else str(cls)
-                        detections.append({
-                            "x1": round(x1, 1), "y1": round(y1, 1),
-                            "x2": round(x2, 1), "y2": round(y2, 1),
-                            "conf": round(c, 3), "cls": cls, "name": name
-                        })
-
-                resp = json.dumps({
-                    "detections": detections,
-                    "imgW": img.shape[1],
-                    "imgH": img.shape[0]
-                })
-                self._send(200, "application/json", resp.encode())
+                # Run YOLO on the inference workers; if our frame gets dropped
+                # as stale, answer with the latest result instead of stalling
+                session = infer_queue.session(data.get("session"))
+                cached_id = frame_cache.put(img, session.id)
+                job = infer_queue.submit(img, conf, int(data.get("imgsz", 0)), session, captured / 1000)
+                result = infer_queue.wait(job)
+                timer.skip()
+                if data.get("format") == "binary":
+                    body, content_type = encode_binary(result), "application/octet-stream"
+                else:
+                    body, content_type = encode_json(result, frame=cached_id), "application/json"
+                timer.mark("serialize")
+                self._send(200, content_type, body)
+                timer.mark("send")
+                record_metrics(timer, job, result, captured)
+                if recorder is not None:
+                    recorder.write(session.id, img_bytes, conf, job.imgsz, result,
+                                   timer.stages["total"], job.submitted)
 
             except Exception as e:
                 self._send(500, "application/json",
@@ -664,6 +2132,147 @@ class Handler(http.server.BaseHTTPRequestHandler):
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
         self.end_headers()
 
+    # -------- WebSocket streaming --------
+    def _serve_ws(self, binary=False, session_id=None):
+        """Upgrade to a WebSocket and stream frames through the inference queue.
+
+        Each client message is binary: <u32 frame id><f32 conf><u16 imgsz><2 pad>
+        <f64 capture time><JPEG/WebP bytes> (little-endian, see WS_FRAME_HEADER).
+        Each reply is the
+        usual /detect JSON plus "id" (or, with ?format=binary, an encode_binary
+        message), sent as soon as that frame finishes, so the client can keep
+        several in flight. ?session=<id> names the client's Session.
+        """
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        # Written by hand: send_response() would use HTTP/1.0, which browsers reject here
+        self.wfile.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                          "Upgrade: websocket\r\n"
+                          "Connection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        self.close_connection = True
+        self._ws_lock = threading.Lock()
+        session = infer_queue.session(session_id)
+
+        # Results go out on their own thread so reading the next frame never
+        # waits on inference of the previous one
+        pending, closed = queue.Queue(), threading.Event()
+        replies = threading.Thread(target=self._ws_reply_loop, args=(pending, binary, closed), daemon=True)
+        replies.start()
+        try:
+            while True:
+                opcode, payload = self._ws_recv()
+                if opcode == WS_OP_CLOSE:
+                    self._ws_send(WS_OP_CLOSE, payload[:2])
+                    break
+                if opcode != WS_OP_BINARY or len(payload) < WS_FRAME_HEADER.size:
+                    continue
+
+                timer = StageTimer()
+                frame_id, conf, imgsz, captured = WS_FRAME_HEADER.unpack_from(payload)
+                if captured:
+                    timer.stages["uplink"] = max(time.time() * 1000 - captured, 0.0)
+                nparr = np.frombuffer(payload, np.uint8, offset=WS_FRAME_HEADER.size)
+                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                timer.mark("imdecode")
+                job = cached_id = None
+                if img is not None:
+                    cached_id = frame_cache.put(img, session.id)
+                    job = infer_queue.submit(img, conf, imgsz, session, captured / 1000)
+                # The encoded frame is only kept around when it is going to be recorded
+                frame = nparr.tobytes() if recorder is not None else None
+                pending.put((frame_id, job, timer, frame, captured, cached_id))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            # The reply thread must be done with wfile before the handler closes it
+            closed.set()
+            pending.put(None)
+            replies.join()
+
+    def _ws_reply_loop(self, pending, binary, closed):
+        """Send each frame's result in order until the connection closes."""
+        while True:
+            item = pending.get()
+            if item is None or closed.is_set():
+                return
+            frame_id, job, timer, frame, captured, cached_id = item
+            result = None
+            try:
+                if job is None:
+                    raise ValueError("bad image")
+                result = infer_queue.wait(job)
+                timer.skip()
+                if binary:
+                    opcode, body = WS_OP_BINARY, encode_binary(result, frame_id)
+                else:
+                    opcode, body = WS_OP_TEXT, encode_json(result, id=frame_id, frame=cached_id)
+                timer.mark("serialize")
+            except Exception as e:
+                # Errors always go out as text so the client can tell them apart
+                result, opcode, body = None, WS_OP_TEXT, json.dumps({"id": frame_id, "error": str(e)}).encode()
+            try:
+                self._ws_send(opcode, body)
+            except (OSError, ValueError):
+                return  # The client is gone (writing to a closed wfile raises ValueError)
+            if result is None:
+                continue
+            timer.mark("send")
+            record_metrics(timer, job, result, captured)
+            if frame is not None:
+                recorder.write(job.session.id, frame, job.conf, job.imgsz, result,
+                               timer.stages["total"], job.submitted)
+
+    def _ws_read(self, n):
+        data = self.rfile.read(n)
+        if len(data) < n:
+            raise ConnectionError("WebSocket closed")
+        return data
+
+    def _ws_recv(self):
+        """Read one (possibly fragmented) message and return (opcode, payload).
+
+        Control frames may be interleaved with the fragments of a data message:
+        pings are answered and pongs ignored here without losing the fragments
+        read so far, and a close is returned right away.
+        """
+        message_op, chunks = None, []
+        while True:
+            b0, b1 = self._ws_read(2)
+            opcode, length = b0 & 0x0F, b1 & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", self._ws_read(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", self._ws_read(8))[0]
+            mask = self._ws_read(4) if b1 & 0x80 else None
+            payload = self._ws_read(length)
+            if mask:
+                payload = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), length)).tobytes()
+
+            if opcode == WS_OP_PING:
+                self._ws_send(WS_OP_PONG, payload)
+                continue
+            if opcode >= WS_OP_CLOSE:
+                if opcode == WS_OP_CLOSE:
+                    return opcode, payload
+                continue  # Pong (or a reserved control opcode)
+            if opcode:
+                message_op = opcode
+            chunks.append(payload)
+            if b0 & 0x80:
+                return message_op, b"".join(chunks)
+
+    def _ws_send(self, opcode, payload):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack(">BB", 0x80 | opcode, n)
+        elif n < 1 << 16:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+        with self._ws_lock:
+            self.wfile.write(header + payload)
+
     def _send(self, code, content_type, body):
         self.send_response(code)
         self.send_header("Content-Type", content_type)
@@ -684,11 +2293,16 @@ class Handler(http.server.BaseHTTPRequestHandler):
 
 
 if __name__ == "__main__":
-    server = http.server.HTTPServer(("localhost", PORT), Handler)
+    server_cls = http.server.ThreadingHTTPServer if SERVER_THREADED else http.server.HTTPServer
+    server = server_cls(("localhost", PORT), Handler)
+    threading.Thread(target=load_and_warmup, name="startup", daemon=True).start()
+    if VL_ENABLED or STATS_READER_ENABLED:
+        stats_worker.start()
     url = f"http://localhost:{PORT}"
     print(f"\n  Arras.io YOLO Overlay")
     print(f"  {url}")
-    print(f"  Model: {MODEL_PATH}  |  Classes: {class_names}")
+    print(f"  Model: {MODEL_PATH} ({MODEL_BACKEND})  |  Classes: {class_names}")
+    print(f"  Inference workers: {INFER_WORKERS}  |  Queue size: {INFER_QUEUE_SIZE}")
     print(f"  Press Ctrl+C to stop\n")
 
     # Auto-open in default browser after a short delay
@@ -704,5 +2318,8 @@ if __name__ == "__main__":
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nServer stopped.")
+        if recorder is not None:
+            recorder.close()
+            print(f"Recorded {recorder.records} frame(s) to {RECORD_PATH}")
         server.server_close()
         sys.exit(0)
@@ -1,14 +1,48 @@
+#!/usr/bin/env python3
+"""Write augmented copies of every labeled image in dataset/ with a process pool.
+
+Originals are read from dataset/images and dataset/labels (through the dataset
+index, see dataset.py) and the copies go to dataset/augmented/images and
+dataset/augmented/labels, so a second run never augments its own output. Each
+finished source image is appended to a manifest; an interrupted or repeated
+run skips the images already in it (unless the image or its labels changed) and output
+names are deterministic, so nothing is duplicated. Near-duplicate sources
+(see dedupe.py) are skipped, only the image each cluster keeps is augmented.
+
+train.py applies the same pipeline on the fly while training, so these copies
+are only needed to inspect the augmentations or to train with another tool (add
+the augmented images directory to train: in arras_data.yaml).
+
+Usage:
+    python augment.py [--workers 8] [--format jpg --quality 95] [--per-image 5] [--restart]
+"""
+
+import argparse
+import hashlib
+import json
 import os
+import time
+from multiprocessing import Pool
+
 import cv2
-import glob
-import uuid
-import albumentations as A
+
+import dedupe
+from dataset import DatasetIndex
 
 # --------- CONFIG ----------
 DATA_DIR = "dataset"        # parent folder containing 'images/' and 'labels/'
 AUG_PER_IMAGE = 5           # how many augmentations per original image
 IMG_DIR = os.path.join(DATA_DIR, "images")
 LBL_DIR = os.path.join(DATA_DIR, "labels")
+OUT_DIR = os.path.join(DATA_DIR, "augmented")  # gets its own 'images/' and 'labels/'
+WORKERS = os.cpu_count() or 1  # augmentation processes
+CHUNKSIZE = 4               # source images handed to a worker at a time
+OUTPUT_FORMAT = "png"       # png (lossless), jpg or webp
+PNG_COMPRESSION = 1         # 0-9; 1 is several times faster to write than 9 and only slightly larger
+JPEG_QUALITY = 95           # jpg/webp quality, 0-100
+SKIP_DUPLICATES = True      # augment only one image of each near-duplicate cluster (dedupe.RADIUS)
+PROGRESS_SECONDS = 2.0      # how often the progress line is printed
+MANIFEST_NAME = "manifest.jsonl"
 
 # --------- HELPER FUNCTIONS ----------
 def read_label_file(path):
@@ -37,46 +71,161 @@ def clip_bbox(bbox):
     """Clip bounding box coordinates to [0,1]"""
     return [max(0.0, min(1.0, v)) for v in bbox]
 
+def encode_params(fmt, png_compression=PNG_COMPRESSION, quality=JPEG_QUALITY):
+    """File extension and cv2.imwrite flags for an output format."""
+    if fmt == "png":
+        return ".png", [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    if fmt == "jpg":
+        return ".jpg", [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if fmt == "webp":
+        return ".webp", [cv2.IMWRITE_WEBP_QUALITY, quality]
+    raise ValueError(f"unknown output format: {fmt}")
+
+def label_digest(labels):
+    """Hash of an image's label rows, so fixed annotations are augmented again."""
+    return hashlib.blake2b(labels.tobytes(), digest_size=16).hexdigest()
+
+def read_manifest(path):
+    """Source image name -> (content hash, label digest) for every image a previous run finished."""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interrupted run
+                done[entry["source"]] = (entry["hash"], entry.get("labels"))
+    return done
+
 # --------- DEFINE AUGMENTATIONS ----------
-transform = A.Compose([
-    A.HorizontalFlip(p=0.5),
-    A.VerticalFlip(p=0.2),
-    A.RandomBrightnessContrast(p=0.5),
-    A.ShiftScaleRotate(shift_limit=0.1, scale_limit=0.1, rotate_limit=15, p=0.7),
-    A.HueSaturationValue(p=0.5),
-], bbox_params=A.BboxParams(format='yolo', label_fields=['category_ids']))
-
-# --------- PROCESS ALL IMAGES ----------
-image_paths = glob.glob(os.path.join(IMG_DIR, "*.*"))
-
-for img_path in image_paths:
-    filename = os.path.basename(img_path).split(".")[0]
-    label_path = os.path.join(LBL_DIR, f"{filename}.txt")
-    if not os.path.exists(label_path):
-        continue
-
-    bboxes = read_label_file(label_path)
-    if not bboxes:
-        continue
-
-    # Separate class IDs and bbox coords
-    category_ids = [b[0] for b in bboxes]
-    bboxes_only = [[max(0.0, min(1.0, b[1])), max(0.0, min(1.0, b[2])), max(0.0, min(1.0, b[3])), max(0.0, min(1.0, b[4]))] for b in bboxes]  # Ensure all values are [0, 1]
-
-    # Validate bboxes before augmentation
+def augmentations():
+    """The albumentations pipeline, shared with train.py (albumentations is imported only when needed)."""
+    import albumentations as A
+    return [
+        A.HorizontalFlip(p=0.5),
+        A.VerticalFlip(p=0.2),
+        A.RandomBrightnessContrast(p=0.5),
+        A.ShiftScaleRotate(shift_limit=0.1, scale_limit=0.1, rotate_limit=15, p=0.7),
+        A.HueSaturationValue(p=0.5),
+    ]
+
+# --------- WORKER ----------
+transform = None
+settings = None
+
+def init_worker(out_dir, per_image, ext, params):
+    """Build the pipeline once per process."""
+    global transform, settings
+    import albumentations as A
+    cv2.setNumThreads(1)  # One process per core already; OpenCV's own threads would oversubscribe
+    transform = A.Compose(augmentations(), bbox_params=A.BboxParams(format='yolo', label_fields=['category_ids']))
+    settings = (os.path.join(out_dir, "images"), os.path.join(out_dir, "labels"), per_image, ext, params)
+
+def augment_one(task):
+    """Augment one source image; returns (name, (hash, label digest), outputs written, error or None)."""
+    name, digest, img_path, labels = task
+    out_img_dir, out_lbl_dir, per_image, ext, params = settings
+    filename = name.split(".")[0]
+    category_ids = labels[:, 0].astype(int).tolist()
+    bboxes_only = labels[:, 1:].tolist()  # Already clipped to [0, 1] by the index
+    written = 0
     try:
         img = cv2.imread(img_path)
-        
-        for i in range(AUG_PER_IMAGE):
+        if img is None:
+            return name, digest, 0, "unreadable image"
+        for i in range(per_image):
             augmented = transform(image=img, bboxes=bboxes_only, category_ids=category_ids)
-            aug_img = augmented["image"]
             aug_bboxes = [[cls, *clip_bbox(b)] for cls, b in zip(augmented["category_ids"], augmented["bboxes"])]
 
-            # Unique filenames
-            aug_filename = f"{filename}_aug{i+1}_{uuid.uuid4().hex[:6]}"
-            cv2.imwrite(os.path.join(IMG_DIR, f"{aug_filename}.png"), aug_img)
-            write_label_file(os.path.join(LBL_DIR, f"{aug_filename}.txt"), aug_bboxes)
-
-        print(f"Augmented {filename} x{AUG_PER_IMAGE}")
+            # Deterministic names: a resumed run overwrites a half-written image instead of duplicating it
+            aug_filename = f"{filename}_aug{i+1}"
+            if not cv2.imwrite(os.path.join(out_img_dir, aug_filename + ext), augmented["image"], params):
+                return name, digest, written, f"could not write {aug_filename}{ext}"
+            write_label_file(os.path.join(out_lbl_dir, f"{aug_filename}.txt"), aug_bboxes)
+            written += 1
     except ValueError as e:
-        print(f"Skipping {filename}: {e}")
+        return name, digest, written, str(e)
+    return name, digest, written, None
+
+# --------- MAIN ----------
+def run(img_dir=IMG_DIR, lbl_dir=LBL_DIR, out_dir=OUT_DIR, per_image=AUG_PER_IMAGE, workers=WORKERS,
+        chunksize=CHUNKSIZE, fmt=OUTPUT_FORMAT, png_compression=PNG_COMPRESSION, quality=JPEG_QUALITY,
+        restart=False, skip_duplicates=SKIP_DUPLICATES):
+    if os.path.abspath(os.path.join(out_dir, "images")) == os.path.abspath(img_dir):
+        raise ValueError("output images would land in the source directory and be augmented again")
+    os.makedirs(os.path.join(out_dir, "images"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "labels"), exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if restart and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    done = read_manifest(manifest_path)
+
+    index = DatasetIndex.build(img_dir, lbl_dir, verbose=True)
+    dupes = dedupe.duplicates(index, img_dir) if skip_duplicates else set()
+    tasks, skipped = [], 0
+    for i, name in enumerate(index.names.tolist()):
+        labels = index.labels_of(i)
+        if not len(labels) or name in dupes:
+            continue
+        digest = (str(index.hashes[i]), label_digest(labels))
+        if done.get(name) == digest:
+            skipped += 1
+            continue
+        tasks.append((name, digest, os.path.join(img_dir, name), labels))
+    print(f"[augment] {len(tasks)} image(s) to augment x{per_image}, {skipped} already done, "
+          f"{len(dupes)} near-duplicate(s) skipped "
+          f"({workers} worker(s), {fmt})")
+    if not tasks:
+        return
+
+    ext, params = encode_params(fmt, png_compression, quality)
+    images = outputs = errors = 0
+    t0 = last_report = time.perf_counter()
+    with open(manifest_path, "a") as manifest, \
+            Pool(workers, init_worker, (out_dir, per_image, ext, params)) as pool:
+        for name, digest, written, error in pool.imap_unordered(augment_one, tasks, chunksize):
+            images += 1
+            outputs += written
+            if error:
+                errors += 1
+                print(f"Skipping {name}: {error}")
+            else:
+                manifest.write(json.dumps({"source": name, "hash": digest[0], "labels": digest[1],
+                                           "outputs": written}) + "\n")
+                manifest.flush()
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_SECONDS or images == len(tasks):
+                last_report = now
+                rate = images / (now - t0)
+                print(f"[augment] {images}/{len(tasks)} ({images / len(tasks):.0%})  {rate:.1f} img/s  "
+                      f"{outputs / (now - t0):.1f} out/s  ETA {(len(tasks) - images) / rate:.0f}s  "
+                      f"errors {errors}")
+    seconds = time.perf_counter() - t0
+    print(f"[augment] Wrote {outputs} image(s) from {images - errors} source(s) in {seconds:.1f}s "
+          f"-> {os.path.join(out_dir, 'images')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write augmented copies of the labeled dataset images")
+    parser.add_argument("--images", default=IMG_DIR, help=f"Source images (default: {IMG_DIR})")
+    parser.add_argument("--labels", default=LBL_DIR, help=f"Source labels (default: {LBL_DIR})")
+    parser.add_argument("--out", default=OUT_DIR, help=f"Output directory (default: {OUT_DIR})")
+    parser.add_argument("--per-image", type=int, default=AUG_PER_IMAGE,
+                        help=f"Augmented copies per image (default: {AUG_PER_IMAGE})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"Processes (default: {WORKERS})")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help=f"Images per work item handed to a process (default: {CHUNKSIZE})")
+    parser.add_argument("--format", choices=["png", "jpg", "webp"], default=OUTPUT_FORMAT,
+                        help=f"Output encoding (default: {OUTPUT_FORMAT})")
+    parser.add_argument("--png-compression", type=int, default=PNG_COMPRESSION,
+                        help=f"PNG compression level 0-9 (default: {PNG_COMPRESSION})")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY,
+                        help=f"jpg/webp quality (default: {JPEG_QUALITY})")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="Also augment near-duplicates of other images (see dedupe.py)")
+    parser.add_argument("--restart", action="store_true", help="Forget the manifest and augment everything again")
+    args = parser.parse_args()
+
+    run(args.images, args.labels, args.out, args.per_image, args.workers, args.chunksize, args.format,
+        args.png_compression, args.quality, args.restart, not args.keep_duplicates)
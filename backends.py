@@ -0,0 +1,133 @@
+"""Inference backends for YOLO weights: PyTorch, ONNX Runtime and OpenVINO.
+
+Exporting is slow, so each exported artifact is cached under CACHE_DIR in a
+folder named after the weights file, a hash of its contents, the backend and the
+input size. Retraining best_v2.pt changes the hash and triggers a fresh export;
+otherwise the cached artifact is loaded straight away.
+
+openvino-int8 quantizes with post-training calibration, which needs images:
+it calibrates on the dataset YAML passed as data (CALIBRATION_DATA by default)
+and refuses to export without one.
+
+Ultralytics (and with it torch) is only imported when a model is loaded.
+
+Usage:
+    from backends import load_model
+    model = load_model("best_v2.pt", backend="onnx", threads=4)
+    results = model(img, verbose=False, conf=0.2)
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+CACHE_DIR = ".model_cache"
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+CALIBRATION_DATA = "arras_data.yaml"  # Dataset YAML openvino-int8 calibrates on
+
+
+def weights_hash(path, chunk_size=1 << 20):
+    """Short SHA-1 of a weights file's contents."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def export_artifact(weights, backend, imgsz=None, cache_dir=CACHE_DIR, data=CALIBRATION_DATA):
+    """Export weights for backend (once) and return the cached artifact path.
+
+    data: dataset YAML whose images calibrate openvino-int8 (unused otherwise).
+    """
+    if backend not in BACKENDS or backend == "torch":
+        raise ValueError(f"Unknown export backend: {backend} (choose from {', '.join(BACKENDS[1:])})")
+    int8 = backend == "openvino-int8"
+    if int8 and not (data and os.path.isfile(data)):
+        raise ValueError(f"openvino-int8 needs a dataset YAML to calibrate on, got data={data!r}")
+
+    from ultralytics import YOLO
+
+    yolo = YOLO(weights)
+    imgsz = imgsz or yolo.overrides.get("imgsz", 640)
+    stem = Path(weights).stem
+    out_dir = Path(cache_dir) / f"{stem}-{weights_hash(weights)}-{backend}-{imgsz}"
+    if int8:
+        out_dir = out_dir.with_name(f"{out_dir.name}-{Path(data).stem}")  # Another calibration set, another model
+    fmt = backend.split("-")[0]
+    artifact = out_dir / (f"{stem}.onnx" if fmt == "onnx" else f"{stem}_openvino_model")
+    if artifact.exists():
+        return str(artifact)
+
+    print(f"[backend] Exporting {weights} to {backend} (imgsz={imgsz})...")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Ultralytics writes the export next to the weights; move it into the cache
+    if int8:
+        exported = Path(yolo.export(format=fmt, imgsz=imgsz, int8=True, data=data, verbose=False))
+    else:
+        exported = Path(yolo.export(format=fmt, imgsz=imgsz, verbose=False))
+    if backend == "onnx-int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(exported), str(artifact), weight_type=QuantType.QUInt8)
+        exported.unlink()
+    else:
+        shutil.move(str(exported), str(artifact))
+    print(f"[backend] Cached {artifact}")
+    return str(artifact)
+
+
+def _set_onnx_threads(yolo, path, threads):
+    """Rebuild the ONNX Runtime session for the model at path with a fixed intra-op thread count.
+
+    Ultralytics creates its session with default options, so this runs one
+    prediction to build it and then swaps it for one with our options.
+    """
+    import numpy as np
+    import onnxruntime as ort
+
+    yolo(np.zeros((64, 64, 3), np.uint8), verbose=False)
+    backend = yolo.predictor.model
+    session = getattr(backend, "session", None)
+    if session is None:
+        return
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = threads
+    backend.session = ort.InferenceSession(str(path), opts, providers=session.get_providers())
+
+
+def load_model(weights, backend="torch", imgsz=None, threads=0, cache_dir=CACHE_DIR, data=CALIBRATION_DATA):
+    """Load weights on the chosen backend, exporting and caching if needed.
+
+    threads: CPU threads for inference (0 = runtime default). Applies to torch
+    and ONNX Runtime; OpenVINO picks its own thread count.
+    data: dataset YAML to calibrate openvino-int8 on when it is exported.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+    # Imported here so importing this module (and arras.py) stays fast
+    from ultralytics import YOLO
+
+    if backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return YOLO(weights)
+
+    # Already-exported artifacts are loaded as-is
+    if not str(weights).endswith(".pt"):
+        artifact = weights
+    else:
+        artifact = export_artifact(weights, backend, imgsz, cache_dir, data)
+    yolo = YOLO(artifact, task="detect")
+    if threads and backend.startswith("onnx"):
+        _set_onnx_threads(yolo, artifact, threads)
+    elif threads:
+        print(f"[backend] {backend} ignores threads={threads}; using OpenVINO's default")
+    return yolo
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Delete all cached exports."""
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark the /detect frame decode: base64 and cv2.imdecode per size and encoding.
+
+Frames are synthetic but game-like (flat background, grid lines and a few
+hundred filled shapes), so encoded sizes are close to real captures.
+
+Usage:
+    python bench/bench_decode.py --widths 320,640,1280 --repeat 50 [--json out.json]
+"""
+
+import argparse
+import base64
+
+import cv2
+import numpy as np
+
+from common import int_list, result, timeit, write_json
+
+# name -> (cv2 extension, encode params); quality mirrors the page's toDataURL values
+ENCODINGS = {
+    "jpeg50": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 50]),
+    "jpeg70": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 70]),
+    "jpeg90": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 90]),
+    "webp70": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 70]),
+    "png": (".png", []),
+}
+
+
+def game_frame(width, seed=0):
+    """A 16:9 frame that looks roughly like arras: grid, polygons and bullets."""
+    height = width * 9 // 16
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), (205, 205, 205), np.uint8)
+    step = max(8, width // 40)
+    img[::step] = (190, 190, 190)
+    img[:, ::step] = (190, 190, 190)
+    for _ in range(300):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        r = int(rng.integers(2, max(3, width // 60)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(img, (x, y), r, color, -1)
+        cv2.circle(img, (x, y), r, (80, 80, 80), 1)
+    return img
+
+
+def run(widths=(320, 640, 1280), encodings=tuple(ENCODINGS), repeat=50):
+    results = []
+    for width in widths:
+        frame = game_frame(width)
+        for name in encodings:
+            ext, params = ENCODINGS[name]
+            ok, encoded = cv2.imencode(ext, frame, params)
+            if not ok:
+                print(f"  {name}: encoder not available, skipped")
+                continue
+            data = encoded.tobytes()
+            b64 = base64.b64encode(data).decode()
+            b64_stats = timeit(lambda: base64.b64decode(b64), repeat)
+            decode_stats = timeit(lambda: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), repeat)
+            params_out = {"width": width, "height": frame.shape[0], "encoding": name}
+            results.append(result("decode.b64", params_out, dict(b64_stats, bytes=len(b64))))
+            results.append(result("decode.imdecode", params_out, dict(decode_stats, bytes=len(data))))
+            print(f"{width:>5} {name:>7} {len(data) / 1024:>7.1f} KiB  b64 {b64_stats['median_ms']:>7.3f} ms  "
+                  f"imdecode {decode_stats['median_ms']:>7.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="base64 + cv2.imdecode cost per frame size and encoding")
+    parser.add_argument("--widths", default="320,640,1280", help="Comma-separated frame widths (16:9)")
+    parser.add_argument("--encodings", default=",".join(ENCODINGS), help=f"Any of {', '.join(ENCODINGS)}")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measurement (default: 50)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(int_list(args.widths), args.encodings.split(","), args.repeat)
+    if args.json:
+        write_json(args.json, results)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""HTTP load generator for POST /detect: round-trip throughput and latency.
+
+Each simulated client is a thread with its own session id that posts frames
+back to back (one in flight, like the page's fallback path). Frames differ from
+request to request so the frame gate does not answer from its cache, unless
+--static is given. Without --url an arras.py server is started in-process on a
+free port and its model loaded first.
+
+Usage:
+    python bench/bench_http.py --clients 1,2,4 --seconds 10 [--url http://localhost:7280]
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+
+import cv2
+import numpy as np
+
+from bench_decode import game_frame
+from common import int_list, result, summarize, write_json
+
+
+def start_server(model=None, backend=None):
+    """Run arras.py's handler on a free local port; returns its base URL once the model is ready."""
+    import http.server
+    import arras
+    if model:
+        arras.MODEL_PATH = model
+    if backend:
+        arras.MODEL_BACKEND = backend
+    server = http.server.ThreadingHTTPServer(("localhost", 0), arras.Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    arras.load_and_warmup()
+    if not arras.startup["ready"]:
+        raise RuntimeError(f"model failed to load: {arras.startup['error']}")
+    return f"http://localhost:{server.server_address[1]}"
+
+
+def make_bodies(width, count, fmt, quality=70):
+    """Pre-encoded request bodies so the generator itself costs next to nothing."""
+    bodies = []
+    base = game_frame(width)
+    for i in range(count):
+        frame = np.roll(base, i * 7, axis=1)  # A panning camera; each frame differs
+        jpg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+        data_url = "data:image/jpeg;base64," + base64.b64encode(jpg).decode()
+        bodies.append({"image": data_url, "conf": 0.2, "format": fmt})
+    return bodies
+
+
+def client(url, bodies, session, deadline, out):
+    parts = urllib.parse.urlsplit(url)
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps(dict(bodies[i % len(bodies)], session=session)).encode()
+        i += 1
+        t0 = time.perf_counter()
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        try:
+            conn.request("POST", "/detect", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            payload = response.read()
+        except OSError:
+            out["errors"] += 1
+            continue
+        finally:
+            conn.close()
+        out["latencies"].append((time.perf_counter() - t0) * 1000)
+        if response.status != 200:
+            out["errors"] += 1
+        elif payload[:1] == b"{":
+            meta = json.loads(payload)
+            out["busy"] += bool(meta.get("busy"))
+            out["cached"] += bool(meta.get("cached"))
+        else:
+            flags = payload[10]  # See arras.BINARY_HEADER
+            out["busy"] += bool(flags & 0x01)
+            out["cached"] += bool(flags & 0x02)
+
+
+def run(url=None, clients=(1, 2, 4), seconds=10.0, width=640, fmt="binary", static=False, model=None, backend=None):
+    url = url or start_server(model, backend)
+    bodies = make_bodies(width, 1 if static else 60, fmt)
+    results = []
+    for n in clients:
+        outs = [{"latencies": [], "busy": 0, "cached": 0, "errors": 0} for _ in range(n)]
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=client, args=(url, bodies, f"bench-{n}-{i}", deadline, outs[i]))
+                   for i in range(n)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        latencies = [ms for out in outs for ms in out["latencies"]]
+        metrics = summarize(latencies)
+        metrics.update(rps=round(len(latencies) / elapsed, 2),
+                       **{key: sum(out[key] for out in outs) for key in ("busy", "cached", "errors")})
+        results.append(result("http", {"clients": n, "width": width, "format": fmt, "static": static}, metrics))
+        print(f"{n:>3} client(s)  {metrics['rps']:>7.1f} req/s  p50 {metrics['median_ms']:>7.1f} ms  "
+              f"p95 {metrics['p95_ms']:>7.1f} ms  p99 {metrics['p99_ms']:>7.1f} ms  busy {metrics['busy']}  "
+              f"cached {metrics['cached']}  errors {metrics['errors']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Round-trip throughput of POST /detect under load")
+    parser.add_argument("--url", help="Server to load (default: start arras.py in-process)")
+    parser.add_argument("--clients", default="1,2,4", help="Comma-separated concurrent client counts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration per client count (default: 10)")
+    parser.add_argument("--width", type=int, default=640, help="Frame width sent (default: 640)")
+    parser.add_argument("--format", choices=["binary", "json"], default="binary", help="Response format")
+    parser.add_argument("--static", action="store_true", help="Send one frame over and over (frame gate hits)")
+    parser.add_argument("--model", help="Weights for the in-process server (default: arras.py's MODEL_PATH)")
+    parser.add_argument("--backend", help="Backend for the in-process server (default: arras.py's MODEL_BACKEND)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.url, int_list(args.clients), args.seconds, args.width, args.format, args.static,
+                  args.model, args.backend)
+    if args.json:
+        write_json(args.json, results)
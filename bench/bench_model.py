@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark model calls per weights file, input size and batch size.
+
+Each call is timed end to end, and Ultralytics' own speed dict splits it into
+preprocess / forward / NMS (see metrics.SpeedProbe). Weights that cannot be
+loaded (e.g. not downloaded yet on an offline box) are skipped with a note.
+
+Usage:
+    python bench/bench_model.py --models yolo26n.pt,best_v2.pt --imgsz 160,256,640 --batch 1,4
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from bench_decode import game_frame
+from common import int_list, result, summarize, write_json
+
+from backends import BACKENDS, load_model  # noqa: E402  (common.py puts the repo root on sys.path)
+from metrics import SpeedProbe  # noqa: E402
+
+MODELS = "yolo26n.pt,yolo26s.pt,yolo26m.pt,best_v2.pt"
+
+
+def time_calls(yolo, frames, imgsz, repeat, warmup=2):
+    """Per-call wall time plus the median Ultralytics stage split for one configuration."""
+    for _ in range(warmup):
+        yolo(frames, verbose=False, imgsz=imgsz)
+    walls, stages = [], {}
+    for _ in range(repeat):
+        probe = SpeedProbe(yolo)
+        t0 = time.perf_counter()
+        probe(frames, verbose=False, imgsz=imgsz)
+        walls.append((time.perf_counter() - t0) * 1000)
+        for stage, ms in probe.stages.items():
+            stages.setdefault(stage, []).append(ms)
+    metrics = summarize(walls)
+    metrics.update({f"{stage}_ms": round(float(np.median(ms)), 4) for stage, ms in stages.items()})
+    metrics["frame_ms"] = round(metrics["median_ms"] / len(frames), 4)
+    metrics["fps"] = round(1000 * len(frames) / metrics["median_ms"], 2) if metrics["median_ms"] else 0.0
+    return metrics
+
+
+def run(models=MODELS.split(","), imgsizes=(160, 256, 320, 640), batches=(1, 2, 4, 8), backend="torch",
+        threads=0, repeat=10, width=640):
+    frame = game_frame(width)
+    results = []
+    for weights in models:
+        if weights.endswith(".pt") and not os.path.exists(weights) and not weights.startswith("yolo"):
+            print(f"{weights}: not found, skipped")
+            continue
+        try:
+            # One torch model runs every input size, so it is loaded once per weights file
+            yolo = load_model(weights, backend, threads=threads) if backend == "torch" else None
+        except Exception as e:
+            print(f"{weights}: could not load ({e}), skipped")
+            continue
+        for imgsz in imgsizes:
+            if backend != "torch":
+                try:
+                    # Exported backends have a fixed input size, so each size is its own (cached) export
+                    yolo = load_model(weights, backend, imgsz=imgsz, threads=threads)
+                except Exception as e:
+                    print(f"{weights}: could not load ({e}), skipped")
+                    break
+            for batch in batches:
+                params = {"model": os.path.basename(weights), "backend": backend, "imgsz": imgsz, "batch": batch,
+                          "threads": threads, "width": width}
+                try:
+                    metrics = time_calls(yolo, [frame] * batch, imgsz, repeat)
+                except Exception as e:
+                    print(f"{weights} imgsz={imgsz} batch={batch}: failed ({e})")
+                    results.append(result("model", params, {"error": str(e)}))
+                    continue
+                results.append(result("model", params, metrics))
+                print(f"{params['model']:>14} {backend:>8} imgsz {imgsz:>4} batch {batch:>2}  "
+                      f"{metrics['median_ms']:>8.1f} ms/call  {metrics['frame_ms']:>7.1f} ms/frame  "
+                      f"forward {metrics.get('forward_ms', 0.0):>7.1f} ms  {metrics['fps']:>6.1f} fps")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model call time per weights, imgsz and batch size")
+    parser.add_argument("--models", default=MODELS, help=f"Comma-separated weights (default: {MODELS})")
+    parser.add_argument("--imgsz", default="160,256,320,640", help="Comma-separated input sizes")
+    parser.add_argument("--batch", default="1,2,4,8", help="Comma-separated batch sizes")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch", help="Inference backend (default: torch)")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for inference (default: backend default)")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per configuration (default: 10)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.models.split(","), int_list(args.imgsz), int_list(args.batch), args.backend,
+                  args.threads, args.repeat)
+    if args.json:
+        write_json(args.json, results)
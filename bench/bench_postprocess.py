@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark the old per-box /detect loop against postprocess.py, and serialization.
+
+Builds real Ultralytics Boxes from random detections (no model or image needed),
+checks that both paths produce the same detections and prints timings per box
+count, along with the cost of arras.py's JSON and binary response encoders.
+
+Usage:
+    python bench/bench_postprocess.py --boxes 10,100,300,1000 --repeat 50 [--json out.json]
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+from common import int_list, result, timeit, write_json
+
+from postprocess import NameTable, result_rows  # noqa: E402  (common.py puts the repo root on sys.path)
+
+CLASS_NAMES = [f"class_{i}" for i in range(26)]
+
+
+class FakeResult:
+    """Just enough of an Ultralytics Results object for post-processing."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_results(n, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, (n, 2))
+    wh = rng.uniform(4, 40, (n, 2))
+    data = np.column_stack([xy, xy + wh, rng.uniform(0.2, 1.0, n), rng.integers(0, 26, n)])
+    return [FakeResult(Boxes(torch.tensor(data, dtype=torch.float32), (480, 640)))]
+
+
+def loop_postprocess(results):
+    """The original per-box loop from Handler.do_POST."""
+    detections = []
+    for r in results:
+        for box in r.boxes:
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            c = float(box.conf[0])
+            cls = int(box.cls[0])
+            name = CLASS_NAMES[cls] if cls < len(CLASS_NAMES) else str(cls)
+            detections.append({
+                "x1": round(x1, 1), "y1": round(y1, 1),
+                "x2": round(x2, 1), "y2": round(y2, 1),
+                "conf": round(c, 3), "cls": cls, "name": name
+            })
+    return json.dumps(detections)
+
+
+def vector_postprocess(results, table):
+    return table.detections_json(result_rows(results))
+
+
+def same_detections(a, b):
+    a, b = json.loads(a), json.loads(b)
+    return len(a) == len(b) and all(
+        x["cls"] == y["cls"] and x["name"] == y["name"]
+        and all(abs(x[k] - y[k]) < 1e-3 for k in ("x1", "y1", "x2", "y2", "conf"))
+        for x, y in zip(a, b)
+    )
+
+
+def run(boxes=(10, 100, 300, 1000), repeat=50):
+    import arras  # For the real response encoders; importing it does not load a model
+
+    table = NameTable(CLASS_NAMES)
+    out = []
+    print(f"{'boxes':>6}  {'loop ms (min/med)':>18}  {'vector ms (min/med)':>20}  {'speedup':>8}  "
+          f"{'json ms':>8}  {'binary ms':>9}")
+    for n in boxes:
+        results = make_results(n)
+        if not same_detections(loop_postprocess(results), vector_postprocess(results, table)):
+            sys.exit(f"Mismatch between loop and vectorized output at {n} boxes")
+        loop_stats = timeit(lambda: loop_postprocess(results), repeat)
+        vec_stats = timeit(lambda: vector_postprocess(results, table), repeat)
+
+        response = {"rows": result_rows(results), "imgW": 640, "imgH": 480}
+        json_stats = timeit(lambda: arras.encode_json(response), repeat)
+        binary_stats = timeit(lambda: arras.encode_binary(response), repeat)
+        out.append(result("postprocess.loop", {"boxes": n}, loop_stats))
+        out.append(result("postprocess.vector", {"boxes": n}, vec_stats))
+        out.append(result("serialize.json", {"boxes": n},
+                          dict(json_stats, bytes=len(arras.encode_json(response)))))
+        out.append(result("serialize.binary", {"boxes": n},
+                          dict(binary_stats, bytes=len(arras.encode_binary(response)))))
+        print(f"{n:>6}  {loop_stats['min_ms']:>8.3f}/{loop_stats['median_ms']:<9.3f}  "
+              f"{vec_stats['min_ms']:>9.3f}/{vec_stats['median_ms']:<10.3f}  "
+              f"{loop_stats['median_ms'] / vec_stats['median_ms']:>7.1f}x  {json_stats['median_ms']:>8.3f}  "
+              f"{binary_stats['median_ms']:>9.3f}")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-box loop vs vectorized post-processing, plus serialization")
+    parser.add_argument("--boxes", default="10,100,300,1000", help="Comma-separated box counts")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measurement (default: 50)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(int_list(args.boxes), args.repeat)
+    if args.json:
+        write_json(args.json, results)
@@ -0,0 +1,91 @@
+"""Shared helpers for the bench/ scripts: timing, environment info and result files.
+
+Every benchmark produces a list of result dicts
+    {"bench": "decode", "params": {...}, "metrics": {"median_ms": ..., ...}}
+which run_all.py collects into one JSON file per run, so runs on different
+commits can be compared with run_all.py --compare.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def timeit(fn, repeat=20, warmup=2):
+    """Time fn() repeat times after warmup calls; returns min/median/p95/mean in ms."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return summarize(times)
+
+
+def summarize(times_ms):
+    times = np.asarray(times_ms, np.float64)
+    if not len(times):
+        return {"min_ms": 0.0, "median_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "n": 0}
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {"min_ms": round(float(times.min()), 4), "median_ms": round(float(p50), 4),
+            "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4),
+            "mean_ms": round(float(times.mean()), 4), "n": len(times)}
+
+
+def result(bench, params, metrics):
+    return {"bench": bench, "params": params, "metrics": metrics}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        commit = out.stdout.strip() or "unknown"
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except OSError:
+        return "unknown"
+
+
+def environment():
+    """Where the numbers came from: commit, machine and library versions."""
+    import cv2
+    env = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+    try:
+        import torch
+        import ultralytics
+        env.update(torch=torch.__version__, torch_threads=torch.get_num_threads(), ultralytics=ultralytics.__version__)
+    except ImportError:
+        pass
+    return env
+
+
+def write_json(path, results, env=None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": env or environment(), "results": results}, f, indent=2)
+    print(f"Results written to {path}")
+
+
+def int_list(text):
+    return [int(x) for x in text.split(",") if x]
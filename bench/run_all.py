@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Run the bench/ suite and write every result to one JSON file per run.
+
+Results land in bench/results/<commit>.json by default, so runs on two commits
+(on the same machine) can be compared:
+
+Usage:
+    python bench/run_all.py                          # decode, postprocess, model, http
+    python bench/run_all.py --only decode,postprocess --quick
+    python bench/run_all.py --compare bench/results/abc1234.json
+"""
+
+import argparse
+import json
+import os
+
+from common import ROOT, environment, write_json
+
+import bench_decode
+import bench_http
+import bench_model
+import bench_postprocess
+
+BENCHES = ("decode", "postprocess", "model", "http")
+
+
+def key(entry):
+    return entry["bench"] + " " + " ".join(f"{k}={v}" for k, v in sorted(entry["params"].items()))
+
+
+def compare(old_path, new_results, threshold=0.1):
+    """Print every result whose headline number moved by more than threshold."""
+    with open(old_path) as f:
+        old = json.load(f)
+    old_results = {key(entry): entry["metrics"] for entry in old["results"]}
+    print(f"\nCompared with {old_path} ({old['environment'].get('commit', '?')}):")
+    changed = 0
+    for entry in new_results:
+        before = old_results.get(key(entry))
+        if not before:
+            continue
+        # Throughput: higher is better; everything else is a time
+        metric = "rps" if "rps" in entry["metrics"] else "median_ms"
+        a, b = before.get(metric), entry["metrics"].get(metric)
+        if not a or b is None:
+            continue
+        delta = (b - a) / a
+        if abs(delta) >= threshold:
+            better = delta > 0 if metric == "rps" else delta < 0
+            print(f"  {'faster' if better else 'SLOWER':>6} {delta:+7.1%}  {metric} {a:.3f} -> {b:.3f}  {key(entry)}")
+            changed += 1
+    if not changed:
+        print(f"  no change beyond {threshold:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and save machine-readable results")
+    parser.add_argument("--only", default=",".join(BENCHES), help=f"Comma-separated subset of {', '.join(BENCHES)}")
+    parser.add_argument("--quick", action="store_true", help="Fewer sizes and repeats, for a fast sanity run")
+    parser.add_argument("--models", default=bench_model.MODELS, help="Weights for the model benchmark")
+    parser.add_argument("--backend", default="torch", help="Backend for the model and http benchmarks")
+    parser.add_argument("--out", help="Result file (default: bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Smallest relative change --compare reports (default: 0.1 = 10%%)")
+    args = parser.parse_args()
+
+    only = args.only.split(",")
+    env = environment()
+    results = []
+    if "decode" in only:
+        print("\n== decode ==")
+        results += bench_decode.run((640,) if args.quick else (320, 640, 1280), repeat=10 if args.quick else 50)
+    if "postprocess" in only:
+        print("\n== postprocess / serialize ==")
+        results += bench_postprocess.run((10, 300) if args.quick else (10, 100, 300, 1000),
+                                         repeat=10 if args.quick else 50)
+    if "model" in only:
+        print("\n== model ==")
+        results += bench_model.run(args.models.split(","), (256,) if args.quick else (160, 256, 320, 640),
+                                   (1, 4) if args.quick else (1, 2, 4, 8), args.backend,
+                                   repeat=3 if args.quick else 10)
+    if "http" in only:
+        print("\n== http ==")
+        results += bench_http.run(clients=(1, 2) if args.quick else (1, 2, 4),
+                                  seconds=3 if args.quick else 10, backend=args.backend)
+
+    out = args.out or os.path.join(ROOT, "bench", "results", f"{env['commit']}.json")
+    write_json(out, results, env)
+    if args.compare:
+        compare(args.compare, results, args.threshold)
@@ -0,0 +1,226 @@
+"""YOLO dataset layout helpers shared by the evaluation and dataset tools.
+
+The dataset is dataset/images/<name>.<ext> with labels in
+dataset/labels/<name>.txt, one "class x_center y_center w h" line per box in
+normalized coordinates (the format augment.py reads and writes).
+
+DatasetIndex keeps all of it in one .npz next to the image directory (file
+names, image sizes, content hashes and every label row, concatenated with
+per-image offsets), so tools load thousands of labels in milliseconds instead
+of re-parsing the text files. Rebuilding only re-reads images and labels whose
+mtime or size changed. `python dataset.py` refreshes the index and prints
+per-class statistics.
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+DATA_DIR = "dataset"
+IMG_DIR = os.path.join(DATA_DIR, "images")
+LBL_DIR = os.path.join(DATA_DIR, "labels")
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
+INDEX_WORKERS = 8  # Threads hashing and reading new or changed files during a rebuild
+
+
+def list_images(img_dir=IMG_DIR):
+    """Image paths in img_dir, sorted by name."""
+    return sorted(os.path.join(img_dir, name) for name in os.listdir(img_dir)
+                  if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def label_path(image_path, lbl_dir=LBL_DIR):
+    """The label file belonging to an image (it may not exist)."""
+    return os.path.join(lbl_dir, os.path.basename(image_path).split(".")[0] + ".txt")
+
+
+def read_labels(path):
+    """(N, 5) float32 [cls, x_center, y_center, w, h]; coordinates clipped to [0, 1].
+
+    Same rules as augment.read_label_file: short lines are skipped, extra
+    values ignored. A missing file means no boxes.
+    """
+    rows = []
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 5:
+                    rows.append([float(v) for v in parts[:5]])
+    except FileNotFoundError:
+        pass
+    if not rows:
+        return np.zeros((0, 5), np.float32)
+    labels = np.array(rows, np.float32)
+    labels[:, 0] = np.trunc(labels[:, 0])
+    labels[:, 1:] = np.clip(labels[:, 1:], 0.0, 1.0)
+    return labels
+
+
+def labels_to_xyxy(labels, width, height):
+    """Normalized [cls, cx, cy, w, h] labels -> pixel [x1, y1, x2, y2] boxes and class ids."""
+    cx, cy = labels[:, 1] * width, labels[:, 2] * height
+    half_w, half_h = labels[:, 3] * width / 2, labels[:, 4] * height / 2
+    boxes = np.stack([cx - half_w, cy - half_h, cx + half_w, cy + half_h], axis=1).astype(np.float32)
+    return boxes, labels[:, 0].astype(np.int64)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of an image file, so renamed or copied images are still recognized."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def index_path(img_dir=IMG_DIR):
+    """Where the index of img_dir lives: dataset/images -> dataset/.images.index.npz."""
+    img_dir = os.path.normpath(img_dir)
+    return os.path.join(os.path.dirname(img_dir), f".{os.path.basename(img_dir)}.index.npz")
+
+
+class DatasetIndex:
+    """Names, sizes, hashes and labels of every image in a directory, as flat NumPy arrays.
+
+    Labels of image i are labels[offsets[i]:offsets[i + 1]] (see labels_of);
+    sizes are (w, h) pixels, (0, 0) for files PIL cannot open.
+    """
+
+    FIELDS = ("names", "sizes", "hashes", "image_stat", "label_mtime", "offsets", "labels")
+
+    def __init__(self, arrays=None, lbl_dir=LBL_DIR):
+        arrays = arrays or {"names": np.zeros(0, "<U1"), "sizes": np.zeros((0, 2), np.int32),
+                            "hashes": np.zeros(0, "<U32"), "image_stat": np.zeros((0, 2), np.int64),
+                            "label_mtime": np.zeros(0, np.int64), "offsets": np.zeros(1, np.int64),
+                            "labels": np.zeros((0, 5), np.float32)}
+        for field in self.FIELDS:
+            setattr(self, field, arrays[field])
+        self.lbl_dir = lbl_dir
+        self._positions = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def labels_of(self, i):
+        """(N, 5) [cls, cx, cy, w, h] rows of image i (a view into labels)."""
+        return self.labels[self.offsets[i]:self.offsets[i + 1]]
+
+    def find(self, name):
+        """Position of an image file name, or None."""
+        if self._positions is None:
+            self._positions = {n: i for i, n in enumerate(self.names.tolist())}
+        return self._positions.get(name)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({field: data[field] for field in cls.FIELDS}, str(data["lbl_dir"]))
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, lbl_dir=np.array(self.lbl_dir), **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(tmp, path)
+
+    @classmethod
+    def build(cls, img_dir=IMG_DIR, lbl_dir=LBL_DIR, path=None, workers=INDEX_WORKERS, verbose=False):
+        """Load the index of img_dir, re-reading only files added or changed since it was saved."""
+        path = path or index_path(img_dir)
+        old = cls(lbl_dir=lbl_dir)
+        if os.path.exists(path):
+            try:
+                old = cls.load(path)
+            except (OSError, KeyError, ValueError) as e:
+                print(f"[index] Ignoring unreadable {path}: {e}")
+        same_labels = os.path.abspath(old.lbl_dir) == os.path.abspath(lbl_dir)
+
+        with os.scandir(img_dir) as it:
+            images = sorted((e.name, e.stat()) for e in it
+                            if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS)
+        label_mtimes = {}
+        if os.path.isdir(lbl_dir):
+            with os.scandir(lbl_dir) as it:
+                label_mtimes = {e.name[:-4]: e.stat().st_mtime_ns for e in it if e.name.endswith(".txt")}
+
+        entries, changed = [], []
+        for name, st in images:
+            stat, lbl_mtime = (st.st_mtime_ns, st.st_size), label_mtimes.get(name.split(".")[0], 0)
+            i = old.find(name) if same_labels else None
+            if (i is not None and tuple(old.image_stat[i].tolist()) == stat
+                    and int(old.label_mtime[i]) == lbl_mtime):
+                entries.append((name, tuple(old.sizes[i].tolist()), str(old.hashes[i]), stat, lbl_mtime,
+                                old.labels_of(i)))
+            else:
+                entries.append((name, None, None, stat, lbl_mtime, None))
+                changed.append(len(entries) - 1)
+
+        def read(j):
+            name = entries[j][0]
+            image_path = os.path.join(img_dir, name)
+            try:
+                with Image.open(image_path) as im:
+                    size = im.size  # Header only; nothing is decoded
+            except OSError:
+                size = (0, 0)
+            return size, file_hash(image_path), read_labels(label_path(image_path, lbl_dir))
+
+        with ThreadPoolExecutor(workers, thread_name_prefix="index") as pool:
+            for j, (size, digest, labels) in zip(changed, pool.map(read, changed)):
+                name, _, _, stat, lbl_mtime, _ = entries[j]
+                entries[j] = (name, size, digest, stat, lbl_mtime, labels)
+
+        label_rows = [e[5] for e in entries]
+        index = cls({"names": np.array([e[0] for e in entries], dtype=str),
+                     "sizes": np.array([e[1] for e in entries], np.int32).reshape(-1, 2),
+                     "hashes": np.array([e[2] for e in entries], "<U32"),
+                     "image_stat": np.array([e[3] for e in entries], np.int64).reshape(-1, 2),
+                     "label_mtime": np.array([e[4] for e in entries], np.int64),
+                     "offsets": np.concatenate([[0], np.cumsum([len(r) for r in label_rows])]).astype(np.int64),
+                     "labels": np.concatenate(label_rows) if label_rows else np.zeros((0, 5), np.float32)},
+                    lbl_dir)
+        dropped = len(set(old.names.tolist()) - set(index.names.tolist()))
+        if changed or dropped or not same_labels:
+            index.save(path)
+        if verbose:
+            print(f"[index] {len(index)} image(s), {len(changed)} re-read, {dropped} dropped -> {path}")
+        return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the dataset index and print label statistics")
+    parser.add_argument("--images", default=IMG_DIR, help=f"Image directory (default: {IMG_DIR})")
+    parser.add_argument("--labels", default=LBL_DIR, help=f"Label directory (default: {LBL_DIR})")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the existing index and read everything")
+    parser.add_argument("--names", default=os.path.join(DATA_DIR, "classes.txt"),
+                        help="Class names, one per line (default: dataset/classes.txt)")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(index_path(args.images)):
+        os.remove(index_path(args.images))
+    t0 = time.perf_counter()
+    index = DatasetIndex.build(args.images, args.labels, verbose=True)
+    print(f"[index] Built in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    t0 = time.perf_counter()
+    DatasetIndex.load(index_path(args.images))
+    print(f"[index] Loads in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    names = {}
+    if os.path.exists(args.names):
+        with open(args.names) as f:
+            names = dict(enumerate(line.strip() for line in f if line.strip()))
+    counts = np.diff(index.offsets)
+    print(f"\n{len(index)} image(s), {len(index.labels)} box(es), {int((counts == 0).sum())} without labels, "
+          f"{len(index) - len(set(index.hashes.tolist()))} exact duplicate(s), "
+          f"{int((index.sizes[:, 0] == 0).sum())} unreadable")
+    classes = index.labels[:, 0].astype(np.int64)
+    areas = index.labels[:, 3] * index.labels[:, 4]
+    print(f"  {'class':<16} {'boxes':>7} {'images':>7} {'mean area':>10}")
+    for c in np.unique(classes).tolist():
+        mask = classes == c
+        images_with = len(np.unique(np.repeat(np.arange(len(index)), counts)[mask]))
+        print(f"  {names.get(c, str(c)):<16} {int(mask.sum()):>7} {images_with:>7} {float(areas[mask].mean()):>10.4f}")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Find near-duplicate images in the dataset with perceptual hashes.
+
+Every image gets a 64-bit DCT perceptual hash (pHash), computed in parallel
+and cached by content hash next to the dataset index, so only new or changed
+images are decoded on later runs. Hashes go into a BK-tree, which answers
+"everything within Hamming distance r" without comparing all pairs; images
+linked by such matches form a cluster. Each cluster keeps one image (most
+boxes, then largest, then first by name) and the rest are reported, or with
+--quarantine moved together with their labels to dataset/quarantine/.
+augment.py skips the duplicates of a cluster as well (see duplicates()).
+
+Usage:
+    python dedupe.py [--radius 6]                 # report clusters
+    python dedupe.py --quarantine                 # move duplicates out of the dataset
+    python dedupe.py --restore                    # move them back
+"""
+
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from dataset import DATA_DIR, IMG_DIR, INDEX_WORKERS, LBL_DIR, DatasetIndex, index_path, label_path
+
+RADIUS = 6  # Max Hamming distance (of 64 bits) between two near-duplicates
+QUARANTINE_DIR = os.path.join(DATA_DIR, "quarantine")  # gets its own 'images/' and 'labels/'
+
+
+def phash(path):
+    """64-bit DCT perceptual hash of an image file, or None if it cannot be read."""
+    img = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)  # Decoding at 1/4 size is plenty for 32x32
+    if img is None:
+        return None
+    small = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # The DC term would dominate the median
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Metric tree over integer hashes for Hamming-radius queries."""
+
+    def __init__(self):
+        self.root = None  # [hash, item, {distance: child}]
+
+    def add(self, h, item):
+        if self.root is None:
+            self.root = [h, item, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, item, {}]
+                return
+            node = child
+
+    def query(self, h, radius):
+        """Items whose hash is within radius of h (the triangle inequality prunes the rest)."""
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                found.append(node[1])
+            stack.extend(child for dist, child in node[2].items() if d - radius <= dist <= d + radius)
+        return found
+
+
+def phash_path(img_dir=IMG_DIR):
+    return index_path(img_dir).replace(".index.npz", ".phash.npz")
+
+
+def load_phashes(index, img_dir=IMG_DIR, workers=INDEX_WORKERS):
+    """pHash per image of index (None if unreadable), reusing the on-disk cache keyed by content hash."""
+    path = phash_path(img_dir)
+    cache = {}
+    if os.path.exists(path):
+        with np.load(path) as data:
+            cache = dict(zip(data["hashes"].tolist(), data["phashes"].tolist()))
+    digests = index.hashes.tolist()
+    missing = [i for i, digest in enumerate(digests) if digest not in cache]
+    if missing:
+        with ThreadPoolExecutor(workers, thread_name_prefix="phash") as pool:
+            for i, h in zip(missing, pool.map(phash, [os.path.join(img_dir, index.names[i]) for i in missing])):
+                if h is not None:
+                    cache[digests[i]] = h
+        live = {digest: cache[digest] for digest in digests if digest in cache}  # Forget deleted images
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, hashes=np.array(list(live), "<U32"), phashes=np.array(list(live.values()), np.uint64))
+        os.replace(tmp, path)
+    return [cache.get(digest) for digest in digests]
+
+
+def clusters(index, hashes, radius=RADIUS):
+    """Lists of index positions that are near-duplicates of each other, the one to keep first."""
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        if h is None:
+            continue
+        for j in tree.query(h, radius):
+            parent[find(i)] = find(j)
+        tree.add(h, i)
+
+    groups = {}
+    for i, h in enumerate(hashes):
+        if h is not None:
+            groups.setdefault(find(i), []).append(i)
+    boxes = np.diff(index.offsets)
+    area = index.sizes[:, 0].astype(np.int64) * index.sizes[:, 1]
+    return sorted((sorted(group, key=lambda i: (-boxes[i], -area[i], index.names[i]))
+                   for group in groups.values() if len(group) > 1),
+                  key=lambda group: index.names[group[0]])
+
+
+def duplicates(index, img_dir=IMG_DIR, radius=RADIUS):
+    """Names of every image that is a near-duplicate of one kept in its cluster."""
+    return {index.names[i] for group in clusters(index, load_phashes(index, img_dir), radius) for i in group[1:]}
+
+
+def move(names, src_img, src_lbl, dst_img, dst_lbl):
+    """Move images and their label files (where present) between two dataset directories."""
+    os.makedirs(dst_img, exist_ok=True)
+    os.makedirs(dst_lbl, exist_ok=True)
+    for name in names:
+        shutil.move(os.path.join(src_img, name), os.path.join(dst_img, name))
+        label = label_path(name, src_lbl)
+        if os.path.exists(label):
+            shutil.move(label, label_path(name, dst_lbl))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report or quarantine near-duplicate dataset images")
+    parser.add_argument("--images", default=IMG_DIR, help=f"Image directory (default: {IMG_DIR})")
+    parser.add_argument("--labels", default=LBL_DIR, help=f"Label directory (default: {LBL_DIR})")
+    parser.add_argument("--radius", type=int, default=RADIUS,
+                        help=f"Max Hamming distance between duplicates, 0-64 (default: {RADIUS})")
+    parser.add_argument("--quarantine", action="store_true",
+                        help=f"Move duplicates and their labels to {QUARANTINE_DIR}/")
+    parser.add_argument("--restore", action="store_true", help="Move quarantined images back")
+    parser.add_argument("--quarantine-dir", default=QUARANTINE_DIR, help="Quarantine directory")
+    parser.add_argument("--json", help="Write the clusters to this file")
+    args = parser.parse_args()
+
+    q_img, q_lbl = os.path.join(args.quarantine_dir, "images"), os.path.join(args.quarantine_dir, "labels")
+    if args.restore:
+        names = sorted(os.listdir(q_img)) if os.path.isdir(q_img) else []
+        move(names, q_img, q_lbl, args.images, args.labels)
+        print(f"[dedupe] Restored {len(names)} image(s) to {args.images}")
+        raise SystemExit(0)
+
+    index = DatasetIndex.build(args.images, args.labels, verbose=True)
+    groups = clusters(index, load_phashes(index, args.images), args.radius)
+    for group in groups:
+        print(f"keep {index.names[group[0]]}: " + ", ".join(index.names[i] for i in group[1:]))
+    dupes = [index.names[i] for group in groups for i in group[1:]]
+    print(f"\n[dedupe] {len(index)} image(s), {len(groups)} cluster(s), {len(dupes)} near-duplicate(s) "
+          f"within {args.radius} bit(s)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([[index.names[i] for i in group] for group in groups], f, indent=2)
+    if args.quarantine and dupes:
+        move(dupes, args.images, args.labels, q_img, q_lbl)
+        print(f"[dedupe] Moved {len(dupes)} image(s) and their labels to {args.quarantine_dir}")
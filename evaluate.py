@@ -0,0 +1,136 @@
+"""Detection accuracy metrics and an on-disk prediction cache for yolo_test.py --eval.
+
+Predictions are stored per model at a very low confidence (PRED_CONF) and with
+a permissive NMS (PRED_IOU), keyed by the weights hash, backend and input size
+(the cache file) and by a hash of each image's bytes (inside it; see
+dataset.DatasetIndex). Confidence
+thresholds and stricter NMS are applied afterwards, so trying other settings,
+renaming images or adding a few new ones never re-runs inference on the rest.
+
+Metrics follow the COCO/Ultralytics conventions: a prediction is a true
+positive at IoU threshold t if it overlaps an unmatched ground-truth box of
+the same class by at least t (best IoU first), AP is the 101-point interpolated
+area under the precision/recall curve, and mAP@0.5:0.95 averages AP over the
+ten thresholds 0.50, 0.55, ..., 0.95.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from backends import weights_hash
+from tracker import greedy_match, iou_matrix
+
+CACHE_DIR = ".eval_cache"
+PRED_CONF = 0.001  # Confidence predictions are cached at (the usual mAP setting)
+PRED_IOU = 0.9  # NMS IoU predictions are cached at; stricter values are applied on read
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+class PredictionCache:
+    """Cached (N, 6) prediction rows, image size and latency per image hash, for one model."""
+
+    def __init__(self, weights, backend="torch", imgsz=None, cache_dir=CACHE_DIR):
+        key = weights_hash(weights) if os.path.isfile(weights) else hashlib.sha1(str(weights).encode()).hexdigest()[:12]
+        name = f"{Path(weights).stem}-{key}-{backend}-{imgsz or 'default'}-{PRED_CONF}-{PRED_IOU}.npz"
+        self.path = os.path.join(cache_dir, name)
+        self.entries = {}  # image hash -> (rows, (w, h), latency ms)
+        self.names = {}
+        self.dirty = False
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                offsets = data["offsets"]
+                for i, h in enumerate(data["hashes"].tolist()):
+                    rows = data["rows"][offsets[i]:offsets[i + 1]]
+                    self.entries[h] = (rows, tuple(data["sizes"][i].tolist()), float(data["latency"][i]))
+                self.names = {int(k): v for k, v in json.loads(str(data["names"])).items()}
+
+    def __contains__(self, image_hash):
+        return image_hash in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, image_hash):
+        return self.entries[image_hash]
+
+    def put(self, image_hash, rows, size, latency_ms):
+        self.entries[image_hash] = (np.asarray(rows, np.float32)[:, :6], tuple(size), float(latency_ms))
+        self.dirty = True
+
+    def save(self):
+        """Write the whole cache back as one .npz (rows concatenated, with per-image offsets)."""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        hashes = list(self.entries)
+        rows = [self.entries[h][0] for h in hashes]
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp,
+                 hashes=np.array(hashes),
+                 offsets=np.concatenate([[0], np.cumsum([len(r) for r in rows])]).astype(np.int64),
+                 rows=np.concatenate(rows) if rows else np.zeros((0, 6), np.float32),
+                 sizes=np.array([self.entries[h][1] for h in hashes], np.int32).reshape(-1, 2),
+                 latency=np.array([self.entries[h][2] for h in hashes], np.float32),
+                 names=np.array(json.dumps(self.names)))
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def match_predictions(pred, gt_boxes, gt_cls, iouv=IOU_THRESHOLDS):
+    """(N, len(iouv)) bool: is each prediction a true positive at each IoU threshold."""
+    tp = np.zeros((len(pred), len(iouv)), bool)
+    if not len(pred) or not len(gt_boxes):
+        return tp
+    iou = iou_matrix(gt_boxes, pred[:, :4])
+    iou[gt_cls[:, None] != pred[None, :, 5].astype(np.int64)] = 0
+    for j, threshold in enumerate(iouv):
+        for _, col in greedy_match(iou, threshold):
+            tp[col, j] = True
+    return tp
+
+
+def compute_ap(recall, precision):
+    """101-point interpolated average precision of one precision/recall curve."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))  # Precision envelope
+    x = np.linspace(0, 1, 101)
+    return float(np.trapezoid(np.interp(x, mrec, mpre), x))
+
+
+def ap_per_class(tp, conf, pred_cls, gt_cls, conf_threshold=0.25):
+    """Per-class AP at every IoU threshold, plus precision/recall (IoU 0.5) at conf_threshold.
+
+    AP uses every prediction; precision and recall only those at or above
+    conf_threshold, i.e. what the overlay would show.
+    """
+    order = np.argsort(-conf, kind="stable")
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+    stats = {}
+    for c in np.unique(np.concatenate([gt_cls, pred_cls])).astype(int).tolist():
+        mask = pred_cls == c
+        n_gt, shown = int((gt_cls == c).sum()), int((conf[mask] >= conf_threshold).sum())
+        ap, precision_at, recall_at = np.zeros(tp.shape[1]), 0.0, 0.0
+        if mask.any() and n_gt:
+            tpc = tp[mask].cumsum(0)
+            fpc = (~tp[mask]).cumsum(0)
+            recall = tpc / n_gt
+            precision = tpc / (tpc + fpc)
+            ap = np.array([compute_ap(recall[:, j], precision[:, j]) for j in range(tp.shape[1])])
+            if shown:
+                precision_at, recall_at = float(precision[shown - 1, 0]), float(recall[shown - 1, 0])
+        stats[c] = {"instances": n_gt, "predictions": shown, "precision": precision_at, "recall": recall_at,
+                    "map50": float(ap[0]), "map50_95": float(ap.mean())}
+    return stats
+
+
+def summarize(per_class):
+    """Means over the classes that have ground truth (classes only ever predicted count as FP already)."""
+    present = [s for s in per_class.values() if s["instances"]]
+    if not present:
+        return {"precision": 0.0, "recall": 0.0, "map50": 0.0, "map50_95": 0.0}
+    return {key: float(np.mean([s[key] for s in present])) for key in ("precision", "recall", "map50", "map50_95")}
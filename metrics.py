@@ -0,0 +1,138 @@
+"""Per-stage latency metrics for the overlay server.
+
+Every request records how long each stage took (body read, decode, queue wait,
+Ultralytics preprocess/forward/NMS, our postprocess, serialization, ...). The
+last WINDOW samples per stage are kept, so percentiles follow current behaviour
+rather than the whole run. Snapshots are available as JSON and in the Prometheus
+text exposition format.
+
+Usage:
+    timer = StageTimer()
+    body = read()
+    timer.mark("read")
+    ...
+    metrics.record(timer.stages)
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+WINDOW = 1000  # Samples kept per stage
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Ultralytics Results.speed keys -> our stage names
+SPEED_STAGES = {"preprocess": "preprocess", "inference": "forward", "postprocess": "nms"}
+
+
+class StageTimer:
+    """Collects stage durations (ms) for one request, one mark() per stage."""
+
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage):
+        """Record the time since the previous mark as stage."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def skip(self):
+        """Reset the reference point without recording anything."""
+        self._last = time.perf_counter()
+
+    def add(self, stages):
+        for stage, ms in stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + ms
+
+    def total(self):
+        self.stages["total"] = (time.perf_counter() - self.start) * 1000
+        return self.stages
+
+
+class SpeedProbe:
+    """Wraps a model and sums the Ultralytics speed dicts of every call.
+
+    Batched calls report per-image averages, so summing over the results gives
+    the time of the whole batch.
+    """
+
+    def __init__(self, yolo):
+        self.yolo = yolo
+        self.stages = {}
+
+    def __call__(self, *args, **kwargs):
+        results = self.yolo(*args, **kwargs)
+        for r in results:
+            for key, ms in (getattr(r, "speed", None) or {}).items():
+                stage = SPEED_STAGES.get(key, key)
+                self.stages[stage] = self.stages.get(stage, 0.0) + (ms or 0.0)
+        return results
+
+
+class Metrics:
+    """Thread-safe rolling stage histograms plus plain counters."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._sums = {}
+        self.counters = {}
+
+    def record(self, stages):
+        with self._lock:
+            for stage, ms in stages.items():
+                if stage not in self._samples:
+                    self._samples[stage] = deque(maxlen=self.window)
+                    self._counts[stage] = 0
+                    self._sums[stage] = 0.0
+                self._samples[stage].append(ms)
+                self._counts[stage] += 1
+                self._sums[stage] += ms
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """{"stages": {stage: {p50, p95, p99, mean, count, sum}}, "counters": {...}} in ms."""
+        with self._lock:
+            samples = {stage: np.array(s) for stage, s in self._samples.items()}
+            counts, sums, counters = dict(self._counts), dict(self._sums), dict(self.counters)
+        stages = {}
+        for stage, values in samples.items():
+            pct = np.percentile(values, [q * 100 for q in QUANTILES]) if len(values) else [0.0] * len(QUANTILES)
+            stages[stage] = {f"p{int(q * 100)}": round(float(p), 3) for q, p in zip(QUANTILES, pct)}
+            stages[stage].update(mean=round(float(values.mean()), 3) if len(values) else 0.0,
+                                 count=counts[stage], sum=round(sums[stage], 3))
+        return {"stages": stages, "counters": counters}
+
+    def prometheus(self, prefix="arras", extra_counters=None, gauges=None):
+        """Snapshot in the Prometheus text format (stages as summaries, in seconds).
+
+        extra_counters are cumulative totals; gauges are point-in-time values
+        (queue depth, session count) that may go down.
+        """
+        snap = self.snapshot()
+        name = f"{prefix}_stage_seconds"
+        lines = [f"# HELP {name} Per-stage request latency over the last {self.window} samples.",
+                 f"# TYPE {name} summary"]
+        for stage, s in sorted(snap["stages"].items()):
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {s[f"p{int(q * 100)}"] / 1000:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {s["sum"] / 1000:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {s["count"]}')
+
+        counters = dict(snap["counters"], **(extra_counters or {}))
+        for key, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{key} counter")
+            lines.append(f"{prefix}_{key} {value}")
+        for key, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,82 @@
+"""Compact on-disk log of /detect traffic, for offline replay (see replay.py).
+
+A log is a magic line followed by one record per frame: a fixed header, the
+session id, the frame exactly as the client sent it (JPEG/WebP bytes, never
+re-encoded) and the response rows as little-endian float32, the same layout
+the binary /detect format uses.
+
+Usage:
+    recorder = Recorder("session.arrasrec")
+    recorder.write(session_id, jpeg_bytes, conf, imgsz, result, latency_ms)
+
+    for record in read_log("session.arrasrec"):
+        ...
+"""
+
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = b"ARRASREC1\n"
+
+# Seconds since recording start, server latency (ms), conf, imgsz, image width, image height,
+# flags, columns per row, row count, session id length, frame length
+RECORD_HEADER = struct.Struct("<dffHHHBBIBI")
+FLAG_BUSY = 0x01
+FLAG_CACHED = 0x02
+
+Record = namedtuple("Record", "t session conf imgsz busy cached latency_ms frame rows imgW imgH")
+
+
+class Recorder:
+    """Appends /detect frames and their responses to a log; safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self.records = 0
+
+    def write(self, session, frame, conf, imgsz, result, latency_ms, t=None):
+        """Log one frame; result is the dict /detect answered with."""
+        rows = result["rows"]
+        flags = (FLAG_BUSY if result.get("busy") else 0) | (FLAG_CACHED if result.get("cached") else 0)
+        session = session.encode()[:255]
+        t = (t if t is not None else time.time()) - self._start
+        header = RECORD_HEADER.pack(t, latency_ms, conf, imgsz, result["imgW"], result["imgH"], flags,
+                                    rows.shape[1], len(rows), len(session), len(frame))
+        with self._lock:
+            self._file.write(header + session)
+            self._file.write(frame)
+            self._file.write(rows.astype("<f4", copy=False).tobytes())
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path):
+    """Yield the Records of a log in the order they were written."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an arras recording")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # End of log (or a record cut short by a crash)
+            (t, latency_ms, conf, imgsz, img_w, img_h, flags,
+             columns, count, session_len, frame_len) = RECORD_HEADER.unpack(header)
+            session = f.read(session_len).decode(errors="replace")
+            frame = f.read(frame_len)
+            data = f.read(count * columns * 4)
+            if len(data) < count * columns * 4:
+                return
+            rows = np.frombuffer(data, "<f4").reshape(count, columns)
+            yield Record(t, session, conf, imgsz, bool(flags & FLAG_BUSY), bool(flags & FLAG_CACHED),
+                         latency_ms, frame, rows, img_w, img_h)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Replay a recorded overlay session through the detection pipeline, headless.
+
+Frames from a log written with RECORD_PATH in arras.py (see recorder.py) are fed
+through the server's own inference queue (frame gate, batcher, tracker and all),
+one thread per recorded session, either at the recorded pace or as fast as the
+pipeline allows. Reports throughput, latency percentiles and how the detections
+differ from a reference: the responses stored in the log itself, or those of
+another log, e.g. a replay saved with --out on a different model or backend.
+
+Usage:
+    python replay.py session.arrasrec --speed 0                       # as fast as possible
+    python replay.py session.arrasrec --backend onnx --out onnx.arrasrec
+    python replay.py session.arrasrec --against onnx.arrasrec --no-gate
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS
+from recorder import Recorder, read_log
+from tracker import greedy_match, iou_matrix
+
+# Logged by --out in place of a response for frames that do not decode
+UNDECODABLE = {"rows": np.zeros((0, 6), np.float32), "imgW": 0, "imgH": 0, "busy": True}
+
+
+def play(arras, items, speed, start, out, stamps):
+    """Feed one session's records through the queue, one frame in flight like the page.
+
+    Frames that do not decode (a truncated or corrupt record) are skipped and
+    leave None in out; --out still logs them, as busy, so logs stay aligned.
+    stamps gets the wall time each record was answered (or skipped) at.
+    """
+    session = arras.infer_queue.session(f"replay-{items[0][1].session}")
+    for index, record in items:
+        if speed:
+            delay = start + record.t / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        t0 = time.perf_counter()
+        img = cv2.imdecode(np.frombuffer(record.frame, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            stamps[index] = time.time()
+            continue
+        job = arras.infer_queue.submit(img, record.conf, record.imgsz, session)
+        result = arras.infer_queue.wait(job)
+        latency = (time.perf_counter() - t0) * 1000
+        out[index] = (result, latency)
+        stamps[index] = time.time()
+
+
+def diff_rows(ref, new, iou_threshold):
+    """Compare two frames' [x1, y1, x2, y2, conf, cls] rows with class-agnostic IoU matching."""
+    pairs = greedy_match(iou_matrix(ref[:, :4], new[:, :4]), iou_threshold)
+    rows, cols = (np.array(idx, np.intp) for idx in zip(*pairs)) if pairs else (np.zeros(0, np.intp),) * 2
+    iou = iou_matrix(ref[rows, :4], new[cols, :4]).diagonal() if len(rows) else np.zeros(0)
+    return {
+        "reference": len(ref),
+        "matched": len(pairs),
+        "missed": len(ref) - len(pairs),
+        "extra": len(new) - len(pairs),
+        "class_changes": int((ref[rows, 5] != new[cols, 5]).sum()),
+        "iou_sum": float(iou.sum()),
+        "conf_delta_sum": float(np.abs(ref[rows, 4] - new[cols, 4]).sum()),
+    }
+
+
+def percentiles(values):
+    if not len(values):
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+            "mean": round(float(np.mean(values)), 2)}
+
+
+def replay(log, model, backend, threads, speed, gate, tracker, out_path=None):
+    """Run every record of log through arras.py's pipeline; returns (records, [(result, latency_ms) or None], seconds)."""
+    records = list(read_log(log))
+    if not records:
+        sys.exit(f"Error: {log} holds no frames")
+
+    import arras
+    arras.MODEL_PATH, arras.MODEL_BACKEND, arras.MODEL_THREADS = model, backend, threads
+    arras.GATE_ENABLED, arras.TRACKER_ENABLED = gate, tracker
+    arras.load_and_warmup()
+    if not arras.startup["ready"]:
+        sys.exit(f"Error: model failed to load: {arras.startup['error']}")
+
+    sessions = OrderedDict()
+    for index, record in enumerate(records):
+        sessions.setdefault(record.session, []).append((index, record))
+    recorder = Recorder(out_path) if out_path else None
+    out, stamps = [None] * len(records), [None] * len(records)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=play, args=(arras, items, speed, start, out, stamps))
+               for items in sessions.values()]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+    if recorder is not None:
+        # Sessions finish in any order; written afterwards, the log keeps the original record
+        # order, so --against pairs the same frames by position
+        for record, entry, t in zip(records, out, stamps):
+            result, latency = entry or (UNDECODABLE, 0.0)
+            recorder.write(record.session, record.frame, record.conf, record.imgsz, result, latency, t)
+        recorder.close()
+    return records, out, seconds
+
+
+def summarize(records, out, seconds, reference, iou_threshold):
+    results = [entry[0] if entry else None for entry in out]
+    summary = {
+        "frames": len(records),
+        "undecodable": results.count(None),
+        "sessions": len({r.session for r in records}),
+        "seconds": round(seconds, 3),
+        "fps": round(len(records) / seconds, 2) if seconds else 0.0,
+        "inferred": sum(not r.get("busy") and not r.get("cached") for r in results if r),
+        "cached": sum(bool(r.get("cached")) for r in results if r),
+        "busy": sum(bool(r.get("busy")) for r in results if r),
+        "latency_ms": percentiles([entry[1] for entry in out if entry]),
+        "recorded_latency_ms": percentiles([r.latency_ms for r in records]),
+    }
+
+    # Busy responses carry some other frame's detections, so they are not compared (nor undecodable frames)
+    totals = {"frames": 0, "reference": 0, "matched": 0, "missed": 0, "extra": 0,
+              "class_changes": 0, "iou_sum": 0.0, "conf_delta_sum": 0.0}
+    for ref, result in zip(reference, results):
+        if result is None or ref.busy or result.get("busy"):
+            continue
+        totals["frames"] += 1
+        for key, value in diff_rows(ref.rows[:, :6], result["rows"][:, :6], iou_threshold).items():
+            totals[key] += value
+    matched = totals["matched"]
+    summary["diff"] = {
+        "frames": totals["frames"],
+        "reference_boxes": totals["reference"],
+        "matched": matched,
+        "missed": totals["missed"],
+        "extra": totals["extra"],
+        "class_changes": totals["class_changes"],
+        "recall": round(matched / totals["reference"], 4) if totals["reference"] else 1.0,
+        "mean_iou": round(totals["iou_sum"] / matched, 4) if matched else 0.0,
+        "mean_conf_delta": round(totals["conf_delta_sum"] / matched, 4) if matched else 0.0,
+    }
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded overlay session and report speed and detection diffs")
+    parser.add_argument("log", help="Recording written with RECORD_PATH (or a previous --out)")
+    parser.add_argument("--model", default="best_v2.pt", help="Weights to replay with (default: best_v2.pt)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch", help="Inference backend (default: torch)")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for inference (default: backend default)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Playback speed relative to the recording; 0 = as fast as possible (default: 1)")
+    parser.add_argument("--no-gate", action="store_true", help="Infer every frame instead of reusing unchanged ones")
+    parser.add_argument("--no-tracker", action="store_true", help="Disable the tracker")
+    parser.add_argument("--against", help="Compare with the responses in this log instead of the replayed log's own")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for two boxes to count as the same (default: 0.5)")
+    parser.add_argument("--out", help="Save the replayed responses as a new log (for a later --against)")
+    parser.add_argument("--json", help="Also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    records, out, seconds = replay(args.log, args.model, args.backend, args.threads, args.speed,
+                                   not args.no_gate, not args.no_tracker, args.out)
+    reference = records
+    if args.against:
+        reference = list(read_log(args.against))
+        if len(reference) != len(records):
+            print(f"Warning: {args.against} has {len(reference)} frames, {args.log} has {len(records)}; "
+                  f"comparing the first {min(len(reference), len(records))}")
+    summary = summarize(records, out, seconds, reference, args.iou)
+    summary.update(log=args.log, model=args.model, backend=args.backend, against=args.against or args.log)
+
+    lat, rec, diff = summary["latency_ms"], summary["recorded_latency_ms"], summary["diff"]
+    print(f"\nReplayed {summary['frames']} frame(s) from {summary['sessions']} session(s) in {seconds:.2f}s: "
+          f"{summary['fps']:.1f} frames/s (inferred {summary['inferred']}, cached {summary['cached']}, "
+          f"busy {summary['busy']}, undecodable {summary['undecodable']})")
+    print(f"Latency ms  p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  p99 {lat['p99']:.1f}  "
+          f"(recorded p50 {rec['p50']:.1f}  p95 {rec['p95']:.1f}  p99 {rec['p99']:.1f})")
+    print(f"Detections vs {summary['against']}: {diff['frames']} frame(s), recall {diff['recall']:.1%} "
+          f"of {diff['reference_boxes']} box(es), mean IoU {diff['mean_iou']:.3f}, missed {diff['missed']}, "
+          f"extra {diff['extra']}, class changes {diff['class_changes']}, "
+          f"mean conf delta {diff['mean_conf_delta']:.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.json}")
@@ -0,0 +1,162 @@
+"""Region-of-interest scheduling for /detect.
+
+The arras HUD (minimap, leaderboard, upgrade tree, score/level bar) covers a good
+part of every frame and never contains anything worth detecting. Regions let the
+model look only at the playfield: the regions due this frame are cropped out, run
+as one batched model call, and their boxes shifted back to full-frame
+coordinates. Each region has its own rate, so the area around the player can run
+every frame while the periphery runs every Nth frame and reuses its last boxes in
+between. Boxes whose centre lies in a HUD mask are dropped.
+
+Crops reach margin past their region (though never into a mask), so an object
+on a region's border is seen whole by at least one crop. A box touching a crop
+edge inside the frame is a cut-off view of an object and is dropped.
+
+Regions are dicts:
+    {"name": "self", "rect": (0.3, 0.3, 0.7, 0.7), "every": 1, "anchor": "self"}
+rect is (x1, y1, x2, y2) as fractions of the frame. With anchor "self", only the
+rect's size is used and it is centred on the last detected player ("self").
+Every box belongs to exactly one of the regions whose crop holds it whole: the
+first containing its centre, or if none does, the first at all. So overlapping
+regions never report the same object twice, and a region whose crop cuts an
+object leaves it to a neighbour that sees it whole.
+"""
+
+import threading
+
+import numpy as np
+
+from postprocess import empty_rows, result_rows
+
+MIN_CROP = 32  # Smallest crop side in pixels worth sending to the model
+EDGE_TOL = 2  # Boxes within this many pixels of an inner crop edge were cut by it
+
+
+def _in_rect(rows, rect):
+    cx = (rows[:, 0] + rows[:, 2]) / 2
+    cy = (rows[:, 1] + rows[:, 3]) / 2
+    x1, y1, x2, y2 = rect
+    return (cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2)
+
+
+def _whole(rows, crop, w, h):
+    """Boxes inside crop that stay clear of its edges within the frame (boxes cut by the crop touch them)."""
+    x1, y1, x2, y2 = crop
+    return (((rows[:, 0] > x1 + EDGE_TOL) | (x1 <= 0)) & ((rows[:, 1] > y1 + EDGE_TOL) | (y1 <= 0))
+            & ((rows[:, 2] < x2 - EDGE_TOL) | (x2 >= w)) & ((rows[:, 3] < y2 - EDGE_TOL) | (y2 >= h)))
+
+
+def _pad(rect, margin, masks, w, h):
+    """rect grown by margin pixels on every side, stopping at the frame and short of every mask."""
+    x1, y1, x2, y2 = rect
+    px1, py1, px2, py2 = max(0, x1 - margin), max(0, y1 - margin), min(w, x2 + margin), min(h, y2 + margin)
+    for mx1, my1, mx2, my2 in masks:
+        if not (mx1 < px2 and px1 < mx2 and my1 < py2 and py1 < my2) or (mx1 < x2 and x1 < mx2 and my1 < y2 and y1 < my2):
+            continue  # Clear of the grown rect, or overlapping the region itself
+        # Give up the growth towards the mask on the side (of those it lies beyond) where that costs least
+        options = [(mx2 - px1, "x1") if mx2 <= x1 else None, (px2 - mx1, "x2") if mx1 >= x2 else None,
+                   (my2 - py1, "y1") if my2 <= y1 else None, (py2 - my1, "y2") if my1 >= y2 else None]
+        _, side = min(option for option in options if option)
+        px1, py1 = (mx2 if side == "x1" else px1), (my2 if side == "y1" else py1)
+        px2, py2 = (mx1 if side == "x2" else px2), (my1 if side == "y2" else py2)
+    return int(px1), int(py1), int(px2), int(py2)
+
+
+class RegionScheduler:
+    """Decides which regions to run each frame and merges their boxes."""
+
+    def __init__(self, regions, masks=(), self_class=None, margin=0.05):
+        self.regions = [dict(r) for r in regions]
+        self.masks = list(masks)
+        self.margin = margin  # Crop overlap past each region, as a fraction of the frame width
+        self.self_class = self_class  # Class id anchored regions follow
+        self._lock = threading.Lock()
+        self._frame = 0
+        self._last = [None] * len(self.regions)  # Last boxes per region (full-frame coords)
+        self._anchor = (0.5, 0.5)  # Player centre as fractions of the frame
+        self.runs = [0] * len(self.regions)
+
+    def _rects(self, w, h):
+        """Pixel rects of every region for a w x h frame, and the (padded) crops they run on."""
+        rects = []
+        for region in self.regions:
+            x1, y1, x2, y2 = region["rect"]
+            if region.get("anchor") == "self":
+                half_w, half_h = (x2 - x1) / 2, (y2 - y1) / 2
+                ax, ay = self._anchor
+                x1, x2 = ax - half_w, ax + half_w
+                y1, y2 = ay - half_h, ay + half_h
+            x1, x2 = int(max(0.0, x1) * w), int(min(1.0, x2) * w)
+            y1, y2 = int(max(0.0, y1) * h), int(min(1.0, y2) * h)
+            rects.append((x1, y1, x2, y2))
+        masks = [(int(mx1 * w), int(my1 * h), int(mx2 * w), int(my2 * h)) for mx1, my1, mx2, my2 in self.masks]
+        crops = [_pad(rect, self.margin * w, masks, w, h) for rect in rects]
+        return rects, crops
+
+    def detect(self, yolo, img, conf):
+        """Run the model on the regions due this frame; returns (N, 6) full-frame rows."""
+        h, w = img.shape[:2]
+        with self._lock:
+            rects, crops = self._rects(w, h)
+            due = [i for i, region in enumerate(self.regions)
+                   if self._last[i] is None or self._frame % max(1, region.get("every", 1)) == 0]
+            self._frame += 1
+
+        due = [i for i in due if crops[i][2] - crops[i][0] >= MIN_CROP and crops[i][3] - crops[i][1] >= MIN_CROP]
+        fresh = {}
+        if due:
+            # One batched call for all crops
+            images = [img[crops[i][1]:crops[i][3], crops[i][0]:crops[i][2]] for i in due]
+            results = yolo(images, verbose=False, conf=conf)
+            for i, result in zip(due, results):
+                rows = result_rows([result])
+                rows[:, [0, 2]] += crops[i][0]
+                rows[:, [1, 3]] += crops[i][1]
+                fresh[i] = rows[_whole(rows, crops[i], w, h)]  # Cut-off objects are left to a neighbour
+
+        with self._lock:
+            for i, rows in fresh.items():
+                self._last[i] = rows
+                self.runs[i] += 1
+            merged = self._merge(rects, crops, w, h)
+            self._update_anchor(merged, w, h)
+        return merged
+
+    def _merge(self, rects, crops, w, h):
+        live = [i for i, rows in enumerate(self._last) if rows is not None]
+        parts = []
+        for i in live:
+            rows = self._last[i]
+            if len(rows) == 0:
+                continue
+            # Keep boxes owned by this region: of the regions whose crop holds a box whole, the
+            # first containing its centre (ranked below len(regions)), else the first at all
+            rank = np.full(len(rows), np.inf)
+            owner = np.full(len(rows), -1)
+            for j in live:
+                r = np.where(_in_rect(rows, rects[j]), j, j + len(self.regions))
+                r = np.where(_whole(rows, crops[j], w, h) | (j == i), r, np.inf)  # Ours were checked when inferred
+                better = r < rank
+                rank[better], owner[better] = r[better], j
+            parts.append(rows[owner == i])
+        rows = np.concatenate(parts) if parts else empty_rows()
+
+        for mx1, my1, mx2, my2 in self.masks:
+            rows = rows[~_in_rect(rows, (mx1 * w, my1 * h, mx2 * w, my2 * h))]
+        return rows
+
+    def _update_anchor(self, rows, w, h):
+        if self.self_class is None:
+            return
+        mine = rows[rows[:, 5] == self.self_class]
+        if len(mine):
+            best = mine[np.argmax(mine[:, 4])]
+            self._anchor = (float(best[0] + best[2]) / 2 / w, float(best[1] + best[3]) / 2 / h)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": self._frame,
+                "regions": [{"name": r.get("name", str(i)), "every": r.get("every", 1), "runs": self.runs[i]}
+                            for i, r in enumerate(self.regions)],
+            }
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Fast score/level reader for the arras stats bar.
+
+The bar is drawn in a fixed game font, so instead of asking a vision-language
+model we binarize the crop, split it into text lines, words and glyphs, and
+match each glyph against digit templates with normalized cross-correlation. A
+word is a number when it holds no lowercase letters; a glyph in it that matches
+no digit well lowers the read's confidence instead of cutting the number short.
+A read takes a few milliseconds, and results are cached by a hash of the
+binarized crop, so identical HUD frames are never processed twice.
+
+Templates are rendered from a TrueType font (arras uses Ubuntu Bold) at every
+size in TEMPLATE_SIZES and segmented like the glyphs they are matched with, so a
+glyph is compared with digits rendered at its own pixel height, give or take a
+pixel (HUD digits are only 7-12 pixels tall), unless a directory of
+glyphs captured from the game, named 0.png ... 9.png, is given; captured glyphs
+match the game's rendering best. --save-glyphs dumps the
+segmented glyphs of a crop so they can be renamed into such a directory.
+
+Usage:
+    python stats_reader.py crop.png [--templates DIR] [--save-glyphs DIR]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+GLYPH_SIZE = (12, 16)  # (w, h) glyphs and templates are compared at
+TEXT_THRESHOLD = 180  # Gray level above which a pixel counts as (white) text
+MIN_LINE_HEIGHT = 5  # Shorter ink bands are noise, not text lines
+PUNCT_HEIGHT = 0.6  # Glyphs under this fraction of the line height are commas/colons
+DIGIT_HEIGHT = 0.85  # Digits are cap height; shorter glyphs are lowercase letters
+MIN_DIGIT_PIXELS = 7  # Shorter digits are misread too often to trust; such lines yield no numbers
+MIN_MATCH = 0.7  # Words whose best glyph correlates less with every digit template hold no digits
+SOFT_GAP = 0.4  # Gaps wider than this fraction of the digit height may separate words...
+HARD_GAP = 0.6  # ...and wider than this always do (digits sit up to ~0.4 apart, spaces ~0.45+)
+HEIGHT_SLACK = 1  # Glyphs are also matched against templates this many pixels taller or shorter
+TEMPLATE_SIZES = range(6, 49)  # Font sizes templates are rendered at
+TEMPLATE_BACKGROUNDS = (0, 30, 60, 90, 120)  # Gray levels behind rendered templates (antialiasing binarizes differently)
+FONT_CANDIDATES = [
+    "Ubuntu-B.ttf",
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+]
+
+
+def binarize(crop):
+    """White text pixels -> 255, everything else -> 0."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return cv2.threshold(gray, TEXT_THRESHOLD, 255, cv2.THRESH_BINARY)[1]
+
+
+def text_lines(binary):
+    """(y1, y2) bands of rows that contain ink."""
+    ink = binary.max(axis=1) > 0
+    lines, start = [], None
+    for y, has_ink in enumerate(np.append(ink, False)):
+        if has_ink and start is None:
+            start = y
+        elif not has_ink and start is not None:
+            if y - start >= MIN_LINE_HEIGHT:
+                lines.append((start, y))
+            start = None
+    return lines
+
+
+def segment_glyphs(line):
+    """Connected components of a binarized line as (x, w, h, image), left to right."""
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(line, connectivity=8)
+    glyphs = []
+    for i in range(1, n):
+        x, y, w, h, area = stats[i]
+        if area < 2:
+            continue
+        glyphs.append((int(x), int(w), int(h), (labels[y:y + h, x:x + w] == i).astype(np.uint8) * 255))
+    return sorted(glyphs, key=lambda g: g[0])
+
+
+def _normalize(img):
+    # Pad narrow glyphs to the template aspect first, so a '1' is not stretched into a block
+    h, w = img.shape
+    side = max(w, round(h * GLYPH_SIZE[0] / GLYPH_SIZE[1]))
+    if side > w:
+        padded = np.zeros((h, side), img.dtype)
+        padded[:, (side - w) // 2:(side - w) // 2 + w] = img
+        img = padded
+    v = cv2.resize(img, GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    v -= v.mean()
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+class DigitTemplates:
+    """Digit templates 0-9 as normalized vectors, from captured glyphs or a font.
+
+    Rendered templates are grouped by the pixel height of the binarized glyph;
+    a glyph is matched against the group of its own height and the heights
+    HEIGHT_SLACK around it (the nearest group outside the rendered range).
+    Captured glyphs form a single group.
+    """
+
+    def __init__(self, directory=None, font_path=None, sizes=TEMPLATE_SIZES):
+        groups = {}  # glyph height -> ([digit], [vector])
+        aspects = []
+        if directory:
+            images = [cv2.imread(os.path.join(directory, f"{d}.png"), cv2.IMREAD_GRAYSCALE) for d in range(10)]
+            missing = [str(d) for d, img in enumerate(images) if img is None]
+            if missing:
+                raise FileNotFoundError(f"Missing templates in {directory}: {', '.join(missing)}")
+            glyphs = [self._glyph(binarize(img)) for img in images]
+            groups[0] = (list(range(10)), [_normalize(glyph) for glyph in glyphs])
+            aspects = [glyph.shape[1] / glyph.shape[0] for glyph in glyphs]
+        else:
+            for size in sizes:
+                font = self._font(font_path, size)
+                for d in range(10):
+                    ink = self._render(str(d), font, size).astype(np.float32) / 255
+                    for background in TEMPLATE_BACKGROUNDS:
+                        gray = (background + ink * (255 - background)).astype(np.uint8)
+                        glyph = self._glyph(binarize(gray))
+                        digits, vectors = groups.setdefault(glyph.shape[0], ([], []))
+                        digits.append(d)
+                        vectors.append(_normalize(glyph))
+                        aspects.append(glyph.shape[1] / glyph.shape[0])
+        self.heights = np.array(sorted(groups))
+        # A glyph's binarized height varies by a pixel with its position and background, so each
+        # group also holds the templates of the neighbouring heights
+        self.groups = {}
+        for h in groups:
+            near = [groups[n] for n in sorted(groups) if abs(n - h) <= HEIGHT_SLACK]
+            self.groups[h] = (np.array([d for digits, _ in near for d in digits]),
+                              np.stack([v for _, vectors in near for v in vectors]))
+        self.aspect = float(np.median(aspects))  # Digit width / height
+
+    @staticmethod
+    def _font(font_path, size):
+        for path in ([font_path] if font_path else []) + FONT_CANDIDATES:
+            try:
+                return ImageFont.truetype(path, size)
+            except (IOError, OSError):
+                continue
+        return ImageFont.load_default()
+
+    @staticmethod
+    def _render(text, font, size):
+        img = Image.new("L", (size * 2 + 8, size * 2 + 8), 0)
+        ImageDraw.Draw(img).text((4, 4), text, fill=255, font=font)
+        return np.array(img)
+
+    @staticmethod
+    def _glyph(binary):
+        """The tallest component of a binarized digit, segmented like the glyphs it is matched with."""
+        glyphs = segment_glyphs(binary)
+        return max(glyphs, key=lambda g: (g[2], g[1]))[3] if glyphs else binary
+
+    def width(self, height):
+        """Typical digit width in pixels at a glyph height."""
+        return self.aspect * height
+
+    def match(self, glyph):
+        """Best (digit, score) for a glyph image; score is correlation in [-1, 1]."""
+        height = self.heights[np.argmin(np.abs(self.heights - glyph.shape[0]))]
+        digits, vectors = self.groups[height]
+        scores = vectors @ _normalize(glyph)
+        best = int(np.argmax(scores))
+        return int(digits[best]), float(scores[best])
+
+
+class StatsReader:
+    """Reads {score, level} from the stats bar crop, with a result cache."""
+
+    def __init__(self, templates=None, min_match=MIN_MATCH, cache_size=256):
+        self.templates = templates or DigitTemplates()
+        self.min_match = min_match
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.cache_hits = 0
+
+    def read(self, crop):
+        """Returns {"score", "level", "confidence"}; numbers are None if not found."""
+        binary = binarize(crop)
+        key = hashlib.blake2b(binary.tobytes() + bytes(str(binary.shape), "ascii"), digest_size=16).digest()
+        with self._lock:
+            self.reads += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return dict(self._cache[key])
+
+        result = self._read(binary)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(result)
+
+    def _numbers(self, line):
+        """Numbers in one text line as (value, min match score).
+
+        Glyphs are grouped into pieces at gaps wider than SOFT_GAP (never right
+        after a comma, a lone punctuation glyph; a colon's dots are stacked).
+        Neighbouring pieces are joined unless the gap is wider than HARD_GAP or
+        either piece holds a lowercase letter, so a digit with wide side bearings
+        stays in its number while "Lvl 11 Twin" still splits before the capital.
+        A word with a lowercase letter is text; in any other word every glyph of
+        digit height is read as its best digit (commas and colons are skipped),
+        so a glyph matching no digit well keeps its place in the number and only
+        lowers the score. Words where no glyph matches a digit (capitals) are skipped.
+        """
+        glyphs = segment_glyphs(line)
+        if not glyphs:
+            return []
+        line_h = max(h for _, _, h, _ in glyphs)
+        tall = [h for _, _, h, _ in glyphs if h >= DIGIT_HEIGHT * line_h]
+        digit_h = float(np.median(tall))
+        if digit_h < MIN_DIGIT_PIXELS:
+            return []
+        glyphs = [part for glyph in glyphs for part in self._split_touching(glyph, line_h)]
+
+        def lowercase(h):
+            return PUNCT_HEIGHT * line_h <= h < DIGIT_HEIGHT * line_h
+
+        # (glyphs, has lowercase, gap before)
+        pieces, end, comma = [], None, False
+        for i, glyph in enumerate(glyphs):
+            x, w, h = glyph[0], glyph[1], glyph[2]
+            gap = x - end if end is not None else None
+            if gap is None or (gap > SOFT_GAP * digit_h and not comma):
+                pieces.append([[], False, gap])
+            pieces[-1][0].append(glyph)
+            pieces[-1][1] |= lowercase(h)
+            end = x + w if end is None else max(end, x + w)
+            comma = h < PUNCT_HEIGHT * line_h and not any(
+                j != i and gx < x + w and x < gx + gw for j, (gx, gw, _, _) in enumerate(glyphs))
+        words = []
+        for piece, text, gap in pieces:
+            if words and gap <= HARD_GAP * digit_h and not text and not words[-1][1]:
+                words[-1][0].extend(piece)
+            else:
+                words.append([piece, text])
+
+        numbers = []
+        for word, text in words:
+            if text:
+                continue
+            matches = [self.templates.match(img) for _, _, h, img in word if h >= DIGIT_HEIGHT * line_h]
+            if not matches or max(score for _, score in matches) < self.min_match:
+                continue  # Punctuation only, or capitals
+            numbers.append((int("".join(str(digit) for digit, _ in matches)), min(score for _, score in matches)))
+        return numbers
+
+    def _split_touching(self, glyph, line_h):
+        """Split a digit-height component as wide as several digits at its thinnest columns."""
+        x, w, h, img = glyph
+        digit_w = self.templates.width(h)
+        count = int(round((w + 1) / (digit_w + 1)))
+        if h < DIGIT_HEIGHT * line_h or count < 2 or w < 1.5 * digit_w:
+            return [glyph]
+        ink = (img > 0).sum(axis=0)
+        cuts, start = [], 0
+        for k in range(1, count):
+            nominal = round(k * w / count)
+            lo, hi = max(start + 1, nominal - 1), min(w - 1, nominal + 1)
+            cut = lo + int(np.argmin(ink[lo:hi + 1])) if hi >= lo else nominal
+            cuts.append(cut)
+            start = cut
+        parts = []
+        for a, b in zip([0] + cuts, cuts + [w]):
+            part = img[:, a:b]
+            rows = np.nonzero(part.max(axis=1))[0]
+            if len(rows):
+                parts.append((x + a, b - a, int(rows[-1] - rows[0] + 1), part[rows[0]:rows[-1] + 1]))
+        return parts
+
+    def _read(self, binary):
+        lines = [self._numbers(binary[y1:y2]) for y1, y2 in text_lines(binary)]
+        # The score is on the upper line of the bar, the level ("Lvl N <tank>") on the lower one;
+        # a line without a number leaves its value None rather than borrowing the other line's
+        score, score_conf = lines[0][0] if lines and lines[0] else (None, 0.0)
+        level, level_conf = lines[-1][0] if len(lines) > 1 and lines[-1] else (None, 1.0)
+        return {"score": score, "level": level, "confidence": round(min(score_conf, level_conf), 3)}
+
+    def stats(self):
+        with self._lock:
+            return {"reads": self.reads, "cache_hits": self.cache_hits, "cached": len(self._cache)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read score/level from a cropped arras stats bar")
+    parser.add_argument("crop", help="Path to a cropped stats bar image")
+    parser.add_argument("--templates", help="Directory with captured glyphs 0.png ... 9.png")
+    parser.add_argument("--font", help="TrueType font to render templates from")
+    parser.add_argument("--save-glyphs", help="Write every segmented glyph here (to build templates)")
+    args = parser.parse_args()
+
+    crop = cv2.imread(args.crop)
+    if crop is None:
+        sys.exit(f"Error: could not read {args.crop}")
+
+    if args.save_glyphs:
+        os.makedirs(args.save_glyphs, exist_ok=True)
+        binary = binarize(crop)
+        count = 0
+        for li, (y1, y2) in enumerate(text_lines(binary)):
+            for gi, (_, _, _, img) in enumerate(segment_glyphs(binary[y1:y2])):
+                cv2.imwrite(os.path.join(args.save_glyphs, f"line{li}_glyph{gi}.png"), img)
+                count += 1
+        print(f"Saved {count} glyph(s) to {args.save_glyphs}")
+
+    reader = StatsReader(DigitTemplates(args.templates, args.font))
+    t0 = time.perf_counter()
+    result = reader.read(crop)
+    print(f"{result}  ({(time.perf_counter() - t0) * 1000:.2f}ms)")
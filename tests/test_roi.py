@@ -0,0 +1,72 @@
+"""Objects on a region border are reported once, whole, whichever crops cut them."""
+
+import numpy as np
+
+from arras import ROI_MARGIN, ROI_MASKS, ROI_REGIONS
+from roi import RegionScheduler
+
+W, H = 640, 360
+
+
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = self
+        self._data = data
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._data
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.boxes = FakeBoxes(data)
+
+
+class FakeModel:
+    """Sees the visible part of every object in a crop, as a detector does."""
+
+    def __init__(self, objects):
+        self.objects = np.array(objects, np.float32)  # (x1, y1, x2, y2, conf, cls), frame coords
+
+    def __call__(self, crops, **kwargs):
+        results = []
+        for crop in crops:
+            # Frame pixels hold their own (x, y), so a crop knows where it came from
+            x0, y0 = crop[0, 0]
+            h, w = crop.shape[:2]
+            boxes = self.objects.copy()
+            boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]] - x0, 0, w)
+            boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]] - y0, 0, h)
+            visible = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+            results.append(FakeResult(boxes[visible]))
+        return results
+
+
+def detect(objects):
+    frame = np.stack(np.meshgrid(np.arange(W), np.arange(H)), axis=-1)
+    scheduler = RegionScheduler(ROI_REGIONS, ROI_MASKS, self_class=None, margin=ROI_MARGIN)
+    return scheduler.detect(FakeModel(objects), frame, 0.25)
+
+
+def test_object_straddling_self_crop_edge():
+    # The self region ends at x=448; its crop cuts this object, which the playfield sees whole
+    box = [400, 150, 520, 230, 0.9, 3]
+    rows = detect([box])
+    np.testing.assert_allclose(rows, [box])
+
+
+def test_object_straddling_adjacent_regions():
+    # On the border of playfield (y >= 79) and playfield_top; the playfield crop cannot grow
+    # upwards into the upgrade tree mask, so only playfield_top sees it whole
+    box = [300, 60, 340, 100, 0.8, 5]
+    rows = detect([box])
+    np.testing.assert_allclose(rows, [box])
+
+
+def test_objects_inside_overlapping_regions_reported_once():
+    boxes = [[300, 160, 330, 190, 0.9, 1], [150, 300, 180, 330, 0.7, 2]]
+    rows = detect(boxes)
+    np.testing.assert_allclose(rows[np.argsort(-rows[:, 4])], boxes)
@@ -0,0 +1,42 @@
+"""HUD-size digits must come back from the stats reader above the confidence arras publishes at."""
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from arras import STATS_MIN_CONFIDENCE
+from stats_reader import DigitTemplates, StatsReader
+
+SIZES = range(10, 17)  # Font sizes of the stats bar at common window sizes
+
+
+@pytest.fixture(scope="module")
+def reader():
+    return StatsReader(DigitTemplates(), cache_size=0)
+
+
+def render(lines, size, background=40):
+    """A stats bar crop: white text lines on a dark background, as BGR."""
+    font = DigitTemplates._font(None, size)
+    img = Image.new("RGB", (size * 12, len(lines) * (size + 3) + 6), (background,) * 3)
+    draw = ImageDraw.Draw(img)
+    for i, text in enumerate(lines):
+        draw.text((5, 3 + i * (size + 3)), text, fill=(255, 255, 255), font=font)
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("background", [0, 40, 100])
+def test_reads_score_and_level(reader, size, background):
+    result = reader.read(render(["Score: 1111", "Lvl 45 Twin"], size, background))
+    assert (result["score"], result["level"]) == (1111, 45)
+    assert result["confidence"] >= STATS_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("text, value", [("45", 45), ("1111", 1111), ("5555", 5555)])
+def test_reads_number(reader, size, text, value):
+    result = reader.read(render([text], size))
+    assert result["score"] == value
+    assert result["confidence"] >= STATS_MIN_CONFIDENCE
@@ -0,0 +1,155 @@
+"""Sliced (SAHI-style) inference for small objects.
+
+The model is trained at imgsz=256, so a 640px frame gets shrunk before
+inference and small bullets and traps disappear. Slicing runs the frame as
+overlapping tiles at native resolution instead: all tiles (plus, optionally,
+the whole frame for objects bigger than a tile) go through the model as one
+batched call, boxes are shifted back to frame coordinates, and duplicates from
+overlapping tiles are merged with class-aware NMS or weighted box fusion.
+
+In "auto" mode tiling only kicks in while frames are crowded, so quiet scenes
+keep the cheap single-pass speed.
+"""
+
+import threading
+
+import numpy as np
+
+from postprocess import empty_rows, result_rows
+
+
+def tile_rects(w, h, tile, overlap):
+    """Overlapping tile rects (x1, y1, x2, y2) covering a w x h frame."""
+    def starts(size):
+        if size <= tile:
+            return [0]
+        step = max(1, int(tile * (1 - overlap)))
+        positions = list(range(0, size - tile, step))
+        positions.append(size - tile)  # Last tile flush with the edge
+        return positions
+
+    return [(x, y, min(x + tile, w), min(y + tile, h)) for y in starts(h) for x in starts(w)]
+
+
+def overlap_matrix(a, b, metric="iou"):
+    """Pairwise overlap of xyxy boxes: IoU, or "ios" (intersection over the smaller box)."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    if metric == "ios":
+        denom = np.minimum(area_a[:, None], area_b[None, :])
+    else:
+        denom = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(denom, 1e-6)
+
+
+def _clusters(rows, threshold, metric):
+    """Greedy same-class clusters, seeded in descending confidence order."""
+    order = np.argsort(-rows[:, 4], kind="stable")
+    ov = overlap_matrix(rows[:, :4], rows[:, :4], metric)
+    ov[rows[:, 5][:, None] != rows[:, 5][None, :]] = 0
+    taken = np.zeros(len(rows), bool)
+    for i in order:
+        if taken[i]:
+            continue
+        members = ~taken & (ov[i] > threshold)
+        members[i] = True
+        taken |= members
+        yield i, np.flatnonzero(members)
+
+
+def nms(rows, threshold=0.5, metric="iou"):
+    """Class-aware non-maximum suppression of (N, 6) rows."""
+    if len(rows) < 2:
+        return rows
+    return rows[[seed for seed, _ in _clusters(rows, threshold, metric)]]
+
+
+def weighted_box_fusion(rows, threshold=0.5, metric="iou"):
+    """Class-aware weighted box fusion: each cluster becomes its conf-weighted mean box."""
+    if len(rows) < 2:
+        return rows
+    fused = []
+    for seed, members in _clusters(rows, threshold, metric):
+        group = rows[members]
+        weights = group[:, 4:5]
+        box = (group[:, :4] * weights).sum(0) / weights.sum()
+        fused.append([*box, group[:, 4].max(), rows[seed, 5]])
+    return np.array(fused, np.float32)
+
+
+class SlicedDetector:
+    """Runs frames as batched overlapping tiles, always or only when crowded.
+
+    mode: "always", or "auto" to tile only while the previous frame had at
+        least auto_min_detections boxes (plus every auto_probe-th frame, so a
+        crowd hidden by downscaling is still noticed)
+    """
+
+    def __init__(self, tile=256, overlap=0.2, mode="auto", full_frame=True, merge="nms",
+                 merge_threshold=0.5, metric="ios", auto_min_detections=25, auto_probe=30):
+        self.tile = tile
+        self.overlap = overlap
+        self.mode = mode
+        self.full_frame = full_frame
+        self.merge = weighted_box_fusion if merge == "wbf" else nms
+        self.merge_threshold = merge_threshold
+        self.metric = metric
+        self.auto_min_detections = auto_min_detections
+        self.auto_probe = auto_probe
+        self._lock = threading.Lock()
+        self._last_count = 0
+        self.frames = 0
+        self.tiled_frames = 0
+        self.tiles_run = 0
+
+    def _should_tile(self):
+        if self.mode == "always":
+            return True
+        return self._last_count >= self.auto_min_detections or self.frames % max(1, self.auto_probe) == 0
+
+    def detect(self, yolo, img, conf):
+        """Detect on img, sliced if the policy says so; returns (N, 6) full-frame rows."""
+        h, w = img.shape[:2]
+        with self._lock:
+            tiled = self._should_tile()
+            self.frames += 1
+        rects = tile_rects(w, h, self.tile, self.overlap) if tiled else []
+        if len(rects) <= 1:
+            rows = result_rows(yolo(img, verbose=False, conf=conf))
+            with self._lock:
+                self._last_count = len(rows)
+            return rows
+
+        crops = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in rects]
+        if self.full_frame:
+            crops.append(img)
+            rects.append((0, 0, w, h))
+        parts = []
+        for (x1, y1, _, _), result in zip(rects, yolo(crops, verbose=False, conf=conf)):
+            rows = result_rows([result])
+            rows[:, [0, 2]] += x1
+            rows[:, [1, 3]] += y1
+            parts.append(rows)
+        rows = np.concatenate(parts) if parts else empty_rows()
+        rows = self.merge(rows, self.merge_threshold, self.metric)
+
+        with self._lock:
+            self._last_count = len(rows)
+            self.tiled_frames += 1
+            self.tiles_run += len(rects)
+        return rows
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "frames": self.frames,
+                "tiled_frames": self.tiled_frames,
+                "tiles_run": self.tiles_run,
+                "last_count": self._last_count,
+            }
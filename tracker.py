@@ -0,0 +1,184 @@
+"""SORT/ByteTrack-style multi-object tracker for the overlay.
+
+Detections are associated to existing tracks by IoU (same class only) in two
+passes like ByteTrack: confident boxes first, then low-confidence boxes against
+whatever tracks are still unmatched. Every track runs a constant-velocity Kalman
+filter over (cx, cy, w, h), which gives it a stable id and a velocity in pixels
+per second that the client uses to move boxes between detections.
+
+Usage:
+    tracker = Tracker()
+    rows = tracker.update(rows, time.time())  # (N, 6) in, (N, 9) out
+"""
+
+import numpy as np
+
+# Extra columns appended to [x1, y1, x2, y2, conf, cls] rows
+TRACK_COLUMNS = ["id", "vx", "vy"]
+
+# Kalman filter noise (pixels, pixels/second)
+POS_NOISE = 4.0        # Process noise on position per second
+VEL_NOISE = 200.0      # Process noise on velocity per second (arras bullets are fast)
+MEAS_NOISE = 2.0       # Measurement noise of a YOLO box edge
+INIT_VEL_VAR = 500.0 ** 2  # Variance of the (unknown) velocity of a new track
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(iou, threshold):
+    """Match rows to columns greedily by descending IoU; returns a list of (row, col)."""
+    candidates = np.argwhere(iou >= threshold)
+    if len(candidates) == 0:
+        return []
+    order = np.argsort(-iou[candidates[:, 0], candidates[:, 1]], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for r, c in candidates[order].tolist():
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def xyxy_to_cxcywh(boxes):
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1)
+
+
+def cxcywh_to_xyxy(boxes):
+    half_w, half_h = boxes[:, 2] / 2, boxes[:, 3] / 2
+    return np.stack([boxes[:, 0] - half_w, boxes[:, 1] - half_h,
+                     boxes[:, 0] + half_w, boxes[:, 1] + half_h], axis=1)
+
+
+class Tracker:
+    """Tracks boxes across frames; all tracks are filtered together as arrays.
+
+    iou_threshold: minimum IoU to associate a detection with a track
+    high_conf: detections at or above this confidence are matched first and may
+        start new tracks; weaker ones only extend existing tracks
+    max_age: seconds a track survives without a matching detection
+    """
+
+    def __init__(self, iou_threshold=0.3, high_conf=0.5, max_age=0.5):
+        self.iou_threshold = iou_threshold
+        self.high_conf = high_conf
+        self.max_age = max_age
+        self.next_id = 1
+        self.t = None
+        self.x = np.zeros((0, 8))        # cx, cy, w, h, vcx, vcy, vw, vh
+        self.P = np.zeros((0, 8, 8))
+        self.ids = np.zeros(0, np.int64)
+        self.cls = np.zeros(0, np.int64)
+        self.hits = np.zeros(0, np.int64)
+        self.last_seen = np.zeros(0)
+
+    def reset(self):
+        self.__init__(self.iou_threshold, self.high_conf, self.max_age)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _predict(self, dt):
+        if dt <= 0 or len(self.ids) == 0:
+            return
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        Q = np.diag([POS_NOISE ** 2] * 4 + [VEL_NOISE ** 2] * 4) * dt
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+
+    def _correct(self, idx, z):
+        """Batched Kalman measurement update of tracks idx with (K, 4) cxcywh boxes."""
+        P = self.P[idx]
+        S = P[:, :4, :4] + np.eye(4) * MEAS_NOISE ** 2
+        K = P[:, :, :4] @ np.linalg.inv(S)
+        y = z - self.x[idx, :4]
+        self.x[idx] += (K @ y[:, :, None])[:, :, 0]
+        self.P[idx] = P - K @ P[:, :4, :]
+
+    def update(self, rows, t):
+        """Associate one frame's detections and advance all tracks.
+
+        rows: (N, 6) float array of [x1, y1, x2, y2, conf, cls]
+        t: capture time of the frame in seconds (frames arriving out of order
+            are tracked without moving time backwards)
+
+        Returns (N, 9) float32 rows with track id, vx and vy appended. Weak
+        detections that match no track get id 0; velocities stay 0 until a
+        track has been seen twice.
+        """
+        rows = np.asarray(rows, np.float32)[:, :6]
+        dt = 0.0 if self.t is None else max(0.0, t - self.t)
+        self.t = t if self.t is None else max(self.t, t)
+        self._predict(dt)
+
+        n = len(rows)
+        det_track = np.full(n, -1)
+        track_free = np.ones(len(self.ids), bool)
+        track_boxes = cxcywh_to_xyxy(self.x[:, :4])
+        det_cls = rows[:, 5].astype(np.int64)
+        high = rows[:, 4] >= self.high_conf
+
+        # ByteTrack: confident detections first, then weak ones on leftover tracks
+        for mask in (high, ~high):
+            d_idx = np.flatnonzero(mask)
+            t_idx = np.flatnonzero(track_free)
+            if len(d_idx) == 0 or len(t_idx) == 0:
+                continue
+            iou = iou_matrix(rows[d_idx, :4], track_boxes[t_idx])
+            iou[det_cls[d_idx, None] != self.cls[None, t_idx]] = 0
+            for d, k in greedy_match(iou, self.iou_threshold):
+                det_track[d_idx[d]] = t_idx[k]
+                track_free[t_idx[k]] = False
+
+        matched = np.flatnonzero(det_track >= 0)
+        if len(matched):
+            tracks = det_track[matched]
+            self._correct(tracks, xyxy_to_cxcywh(rows[matched, :4]))
+            self.hits[tracks] += 1
+            self.last_seen[tracks] = self.t
+
+        # New tracks from unmatched confident detections
+        new = np.flatnonzero((det_track < 0) & high)
+        if len(new):
+            first = len(self.ids)
+            self.x = np.concatenate([self.x, np.zeros((len(new), 8))])
+            self.x[first:, :4] = xyxy_to_cxcywh(rows[new, :4])
+            P0 = np.diag([MEAS_NOISE ** 2] * 4 + [INIT_VEL_VAR] * 4)
+            self.P = np.concatenate([self.P, np.repeat(P0[None], len(new), axis=0)])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+            self.cls = np.concatenate([self.cls, det_cls[new]])
+            self.hits = np.concatenate([self.hits, np.ones(len(new), np.int64)])
+            self.last_seen = np.concatenate([self.last_seen, np.full(len(new), self.t)])
+            det_track[new] = np.arange(first, first + len(new))
+            self.next_id += len(new)
+
+        out = np.zeros((n, 9), np.float32)
+        out[:, :6] = rows
+        has_track = det_track >= 0
+        tracks = det_track[has_track]
+        out[has_track, 6] = self.ids[tracks]
+        moving = self.hits[tracks] >= 2
+        out[np.flatnonzero(has_track)[moving], 7:9] = self.x[tracks[moving], 4:6]
+
+        # Forget tracks that have not been seen for a while
+        alive = self.t - self.last_seen <= self.max_age
+        if not alive.all():
+            self.x, self.P = self.x[alive], self.P[alive]
+            self.ids, self.cls = self.ids[alive], self.cls[alive]
+            self.hits, self.last_seen = self.hits[alive], self.last_seen[alive]
+        return out
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Train the overlay model with augment.py's augmentations applied on the fly.
+
+Instead of training on pre-augmented PNGs, every sample is augmented freshly
+each time it is loaded: augment.py's albumentations pipeline (flips,
+brightness/contrast, ShiftScaleRotate, HSV) runs inside Ultralytics' own
+augmentation stage, in the dataloader worker processes, with its bounding boxes.
+Each image is decoded once per worker and kept in a bounded LRU cache, and an
+epoch visits every image REPEAT times (default 1 + augment.AUG_PER_IMAGE, the
+number of samples the original plus its pre-augmented copies used to give),
+so nothing but dataset/images and dataset/labels is needed on disk.
+
+Usage:
+    python train.py [--model yolo26s.pt] [--epochs 25] [--repeat 6] [key=value ...]
+"""
+
+import argparse
+from collections import OrderedDict
+
+from ultralytics import YOLO
+from ultralytics.cfg import smart_value
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import unwrap_model
+
+import augment
+
+# --------------- Configuration ---------------
+MODEL = "yolo26s.pt"
+DATA = "arras_data.yaml"
+EPOCHS = 25
+IMGSZ = 256
+BATCH = 16
+DEVICE = "mps"
+WORKERS = 4                 # Dataloader processes; each augments its own share of every batch
+NAME = "arras_train_fast"
+REPEAT = 1 + augment.AUG_PER_IMAGE  # Times each image is sampled (and freshly augmented) per epoch
+CACHE_MB = 1024             # Decoded-image LRU cache per dataloader worker
+
+
+class StreamingDataset(YOLODataset):
+    """YOLODataset that repeats every image per epoch and keeps decoded images in an LRU cache."""
+
+    def __init__(self, *args, repeat=REPEAT, cache_mb=CACHE_MB, **kwargs):
+        self.repeat = max(1, repeat)
+        self.lru = OrderedDict()  # (index, rect_mode, resize_short) -> load_image result
+        self.lru_bytes, self.lru_limit = 0, cache_mb << 20
+        super().__init__(*args, **kwargs)
+
+    def __len__(self):
+        return len(self.labels) * self.repeat
+
+    def get_image_and_label(self, index):
+        return super().get_image_and_label(index % len(self.labels))
+
+    def load_image(self, i, rect_mode=True, resize_short=False):
+        """Decode (and resize) image i once; later epochs and mosaic partners reuse it."""
+        key = (i, rect_mode, resize_short)
+        hit = self.lru.get(key)
+        if hit is not None:
+            self.lru.move_to_end(key)
+            return hit
+        loaded = super().load_image(i, rect_mode, resize_short)
+        self.lru[key] = loaded
+        self.lru_bytes += loaded[0].nbytes
+        while self.lru_bytes > self.lru_limit and len(self.lru) > 1:
+            _, old = self.lru.popitem(last=False)
+            self.lru_bytes -= old[0].nbytes
+        return loaded
+
+
+class StreamingTrainer(DetectionTrainer):
+    """DetectionTrainer whose training split is a StreamingDataset (validation is unchanged)."""
+
+    repeat = REPEAT
+    cache_mb = CACHE_MB
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        if mode != "train":
+            return super().build_dataset(img_path, mode, batch)
+        cfg = self.args
+        return StreamingDataset(img_path=img_path, imgsz=cfg.imgsz, batch_size=batch, augment=True, hyp=cfg,
+                                rect=cfg.rect, cache=cfg.cache or None, single_cls=cfg.single_cls or False,
+                                stride=max(int(unwrap_model(self.model).stride.max()), 32), pad=0.0,
+                                prefix=colorstr("train: "), task=cfg.task, classes=cfg.classes, data=self.data,
+                                fraction=cfg.fraction, repeat=self.repeat, cache_mb=self.cache_mb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train with on-the-fly augmentation (no pre-augmented copies)")
+    parser.add_argument("--model", default=MODEL, help=f"Starting weights (default: {MODEL})")
+    parser.add_argument("--data", default=DATA, help=f"Dataset yaml (default: {DATA})")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help=f"Epochs (default: {EPOCHS})")
+    parser.add_argument("--imgsz", type=int, default=IMGSZ, help=f"Input size (default: {IMGSZ})")
+    parser.add_argument("--batch", type=int, default=BATCH, help=f"Batch size (default: {BATCH})")
+    parser.add_argument("--device", default=DEVICE, help=f"Device (default: {DEVICE})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"Dataloader processes (default: {WORKERS})")
+    parser.add_argument("--name", default=NAME, help=f"Run name (default: {NAME})")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help=f"Augmented samples of each image per epoch (default: {REPEAT})")
+    parser.add_argument("--cache-mb", type=int, default=CACHE_MB,
+                        help=f"Decoded-image cache per dataloader worker in MB (default: {CACHE_MB})")
+    parser.add_argument("overrides", nargs="*", help="Extra Ultralytics settings as key=value, e.g. val=True")
+    args = parser.parse_args()
+
+    StreamingTrainer.repeat, StreamingTrainer.cache_mb = args.repeat, args.cache_mb
+    settings = dict(data=args.data, epochs=args.epochs, imgsz=args.imgsz, batch=args.batch, device=args.device,
+                    workers=args.workers, name=args.name, val=False, half=True,
+                    augmentations=augment.augmentations())
+    for override in args.overrides:
+        key, _, value = override.partition("=")
+        settings[key] = smart_value(value)
+    YOLO(args.model).train(trainer=StreamingTrainer, **settings)
@@ -1,21 +1,52 @@
 #!/usr/bin/env python3
-"""Downscale an image to 320px and run YOLOv8 detection using yolo26n.pt."""
+"""Downscale images and run YOLO detection on them with one or more models.
+
+Each model is loaded once. Images are decoded and downscaled ahead of time by a
+pool of threads, go through the model in batches, and annotated copies are
+written in the background, so a directory of thousands of screenshots is bound
+by inference rather than by reloading and disk I/O. A per-model summary
+(throughput, detections per class, mean confidence) is printed at the end.
+
+With --eval, images are scored against their YOLO labels instead (per-class
+precision/recall and mAP@0.5:0.95, plus latency); predictions are cached on
+disk (see evaluate.py), so trying another --conf or --nms-iou is instant.
+"""
 
 import argparse
 import os
 import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # Force CPU-only mode to avoid CUDA initialization hang
 os.environ['CUDA_VISIBLE_DEVICES'] = ''
 
+import cv2
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-from ultralytics import YOLO
+
+import evaluate
+from backends import BACKENDS, load_model
+from dataset import DatasetIndex, labels_to_xyxy
+from postprocess import result_rows
+from tiling import nms
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
+
+# (name, weights, output suffix)
+MODELS = [
+    ("nano", "yolo26n.pt", "_1n"),
+    ("small", "yolo26s.pt", "_2s"),
+    ("medium", "yolo26m.pt", "_3m")
+]
 
 
 def downscale(image_path: str, target_size: int = 320) -> Image.Image:
     """Load and downscale an image so its longest side is target_size. If target_size is 0, don't downscale."""
-    img = Image.open(image_path)
+    img = Image.open(image_path).convert("RGB")
     if target_size == 0:
         return img
     ratio = target_size / max(img.size)
@@ -25,43 +56,52 @@ def downscale(image_path: str, target_size: int = 320) -> Image.Image:
     return img
 
 
+@lru_cache(maxsize=None)
+def get_model(model_path: str, backend: str = "torch", threads: int = 0):
+    """Load a model once per (weights, backend, threads) and reuse it."""
+    return load_model(model_path, backend, threads=threads)
+
+
+@lru_cache(maxsize=1)
+def label_font():
+    try:
+        return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 12)
+    except (IOError, OSError):
+        return ImageFont.load_default()
+
+
+def annotate(img: Image.Image, rows, names: dict) -> Image.Image:
+    """Draw [x1, y1, x2, y2, conf, cls] rows with their labels onto img."""
+    draw = ImageDraw.Draw(img)
+    font = label_font()
+    for x1, y1, x2, y2, conf, cls_id in rows.tolist():
+        label = names.get(int(cls_id), str(int(cls_id)))
+        draw.rectangle([x1, y1, x2, y2], outline="lime", width=2)
+        text = f"{label} {conf:.0%}"
+        bbox = draw.textbbox((x1, y1), text, font=font)
+        draw.rectangle([bbox[0] - 1, bbox[1] - 1, bbox[2] + 1, bbox[3] + 1], fill="lime")
+        draw.text((x1, y1), text, fill="black", font=font)
+    return img
+
+
 def analyze(image_path: str, model_path: str = "yolo26n.pt", target_size: int = 320,
-            output_path: str | None = None):
+            output_path: str | None = None, backend: str = "torch", threads: int = 0):
     """Downscale the image, run YOLO inference, and save annotated output."""
     img = downscale(image_path, target_size)
     print(f"Image resized to {img.size[0]}x{img.size[1]}")
 
-    model = YOLO(model_path)
-    results = model(img)
+    results = get_model(model_path, backend, threads)(img, verbose=False)
 
-    # Draw bounding boxes and labels
-    draw = ImageDraw.Draw(img)
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 12)
-    except (IOError, OSError):
-        font = ImageFont.load_default()
-
-    for result in results:
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            label = result.names[cls_id]
-            conf = float(box.conf[0])
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            print(f"  {label}: {conf:.2f}  [{x1:.0f}, {y1:.0f}, {x2:.0f}, {y2:.0f}]")
-
-            # Draw rectangle
-            draw.rectangle([x1, y1, x2, y2], outline="lime", width=2)
-
-            # Draw label background + text
-            text = f"{label} {conf:.0%}"
-            bbox = draw.textbbox((x1, y1), text, font=font)
-            draw.rectangle([bbox[0] - 1, bbox[1] - 1, bbox[2] + 1, bbox[3] + 1], fill="lime")
-            draw.text((x1, y1), text, fill="black", font=font)
-
-    if not any(r.boxes for r in results):
+    # All boxes come out of the tensors in one transfer (see postprocess.py)
+    rows = result_rows(results)
+    names = results[0].names if results else {}
+    for x1, y1, x2, y2, conf, cls_id in rows.tolist():
+        label = names.get(int(cls_id), str(int(cls_id)))
+        print(f"  {label}: {conf:.2f}  [{x1:.0f}, {y1:.0f}, {x2:.0f}, {y2:.0f}]")
+    if len(rows) == 0:
         print("No detections.")
 
-    # Save annotated image
+    annotate(img, rows, names)
     if output_path is None:
         p = Path(image_path)
         output_path = str(p.with_stem(p.stem + "_detected"))
@@ -71,67 +111,228 @@ def analyze(image_path: str, model_path: str = "yolo26n.pt", target_size: int =
     return results
 
 
+def prefetch(pool, fn, items, depth):
+    """Like pool.map(fn, items) in order, but with at most depth items decoded ahead."""
+    pending = deque()
+    for item in items:
+        pending.append((item, pool.submit(fn, item)))
+        if len(pending) >= depth:
+            yield pending[0][0], pending.popleft()[1].result()
+    while pending:
+        yield pending[0][0], pending.popleft()[1].result()
+
+
+def run_model(model_path: str, suffix: str, images: list, target_size: int = 320, backend: str = "torch",
+              threads: int = 0, batch: int = 8, workers: int = 4):
+    """Detect on every image with one model; returns a summary dict for the final report."""
+    yolo = get_model(model_path, backend, threads)
+    counts, conf_sum, failed = Counter(), 0.0, 0
+    writes = []
+
+    def flush(chunk):
+        nonlocal conf_sum
+        results = yolo([img for _, img in chunk], verbose=False)
+        for (path, img), result in zip(chunk, results):
+            rows = result_rows([result])
+            counts.update(result.names.get(int(c), str(int(c))) for c in rows[:, 5])
+            conf_sum += float(rows[:, 4].sum())
+            output_path = path.parent / f"{path.stem}{suffix}{path.suffix}"
+            writes.append(writers.submit(lambda img=img, rows=rows, names=result.names, out=output_path:
+                                         annotate(img, rows, names).save(out)))
+
+    def load(path):
+        try:
+            return downscale(str(path), target_size)
+        except Exception as e:
+            print(f"Error reading {path.name}: {e}")
+            return None
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(workers, thread_name_prefix="decode") as readers, \
+            ThreadPoolExecutor(2, thread_name_prefix="write") as writers:
+        chunk = []
+        for path, img in prefetch(readers, load, images, depth=max(batch * 2, workers)):
+            if img is None:
+                failed += 1
+                continue
+            chunk.append((path, img))
+            if len(chunk) >= batch:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+        for write in writes:
+            try:
+                write.result()
+            except Exception as e:
+                print(f"Error writing output: {e}")
+    seconds = time.perf_counter() - t0
+
+    done = len(images) - failed
+    detections = sum(counts.values())
+    return {"images": done, "failed": failed, "seconds": seconds, "detections": detections,
+            "mean_conf": conf_sum / detections if detections else 0.0, "counts": counts}
+
+
+def evaluate_model(model_path: str, images: list, labels_dir: str, backend: str = "torch", threads: int = 0,
+                   batch: int = 8, workers: int = 4, conf: float = 0.25, nms_iou: float = 0.7, imgsz: int = 0):
+    """Score one model against the labels of images, inferring only images not in its prediction cache."""
+    cache = evaluate.PredictionCache(model_path, backend, imgsz)
+    index = DatasetIndex.build(str(images[0].parent), labels_dir, workers=workers)
+    positions = [index.find(path.name) for path in images]
+    hashes = [str(index.hashes[i]) for i in positions]
+    missing = [(path, h) for path, h in zip(images, hashes) if h not in cache]
+    print(f"{len(images) - len(missing)} cached prediction(s), {len(missing)} to infer")
+
+    if missing:
+        yolo = get_model(model_path, backend, threads)
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+
+        def infer(chunk):
+            results = yolo([img for _, img in chunk], verbose=False, conf=evaluate.PRED_CONF,
+                           iou=evaluate.PRED_IOU, **kwargs)
+            for ((path, h), img), result in zip(chunk, results):
+                cache.put(h, result_rows([result]), (img.shape[1], img.shape[0]), sum(result.speed.values()))
+            cache.names = dict(results[0].names)
+
+        with ThreadPoolExecutor(workers, thread_name_prefix="decode") as readers:
+            chunk = []
+            for item, img in prefetch(readers, lambda item: cv2.imread(str(item[0])), missing, max(batch * 2, workers)):
+                if img is None:
+                    print(f"Error reading {item[0]}")
+                    continue
+                chunk.append((item, img))
+                if len(chunk) >= batch:
+                    infer(chunk)
+                    chunk = []
+            if chunk:
+                infer(chunk)
+        cache.save()
+
+    tps, confs, pred_classes, gt_classes, latencies = [], [], [], [], []
+    for i, h in zip(positions, hashes):
+        if h not in cache:
+            continue
+        rows, (w, h_px), latency = cache.get(h)
+        if nms_iou < evaluate.PRED_IOU:
+            rows = nms(rows, nms_iou, "iou")
+        gt_boxes, gt_cls = labels_to_xyxy(index.labels_of(i), w, h_px)
+        tps.append(evaluate.match_predictions(rows, gt_boxes, gt_cls))
+        confs.append(rows[:, 4])
+        pred_classes.append(rows[:, 5].astype(np.int64))
+        gt_classes.append(gt_cls)
+        latencies.append(latency)
+
+    per_class = evaluate.ap_per_class(np.concatenate(tps), np.concatenate(confs), np.concatenate(pred_classes),
+                                      np.concatenate(gt_classes), conf)
+    return {"per_class": per_class, "names": cache.names, "images": len(latencies),
+            "latency_ms": float(np.mean(latencies)) if latencies else 0.0, **evaluate.summarize(per_class)}
+
+
+def print_eval(model_name: str, s: dict):
+    print(f"\n{model_name}: {s['images']} image(s), {s['latency_ms']:.1f} ms/image")
+    print(f"  {'class':<16} {'inst':>6} {'pred':>6} {'P':>6} {'R':>6} {'mAP50':>7} {'mAP50-95':>9}")
+    for c, cs in sorted(s["per_class"].items()):
+        name = s["names"].get(c, str(c))
+        print(f"  {name:<16} {cs['instances']:>6} {cs['predictions']:>6} {cs['precision']:>6.3f} "
+              f"{cs['recall']:>6.3f} {cs['map50']:>7.3f} {cs['map50_95']:>9.3f}")
+    print(f"  {'all':<16} {sum(cs['instances'] for cs in s['per_class'].values()):>6} "
+          f"{sum(cs['predictions'] for cs in s['per_class'].values()):>6} {s['precision']:>6.3f} "
+          f"{s['recall']:>6.3f} {s['map50']:>7.3f} {s['map50_95']:>9.3f}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="YOLO object detection on a downscaled image or directory of images")
     parser.add_argument("input", help="Path to the input image or directory")
     parser.add_argument("--size", type=int, default=320, help="Target downscale size (default: 320)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="Inference backend; non-torch backends export once and cache (default: torch)")
+    parser.add_argument("--threads", type=int, default=0, help="CPU inference threads (default: backend default)")
+    parser.add_argument("--models", help="Comma-separated weights to use instead of yolo26n/s/m "
+                                         "(outputs get a _<weights name> suffix)")
+    parser.add_argument("--batch", type=int, default=8, help="Images per model call (default: 8)")
+    parser.add_argument("--workers", type=int, default=4, help="Threads decoding/downscaling ahead (default: 4)")
+    parser.add_argument("--eval", action="store_true",
+                        help="Score against YOLO labels (precision/recall/mAP) instead of writing annotated images")
+    parser.add_argument("--labels", help="Label directory for --eval (default: the images directory's sibling "
+                                         "'labels', e.g. dataset/labels for dataset/images)")
+    parser.add_argument("--conf", type=float, default=0.25, help="--eval: confidence for precision/recall (default: 0.25)")
+    parser.add_argument("--nms-iou", type=float, default=0.7, help="--eval: NMS IoU threshold (default: 0.7)")
+    parser.add_argument("--imgsz", type=int, default=0, help="--eval: model input size (default: the model's own)")
+    parser.add_argument("--min-map", type=float, default=0.0,
+                        help="--eval: report the fastest model with at least this mAP@0.5:0.95")
     args = parser.parse_args()
 
     input_path = Path(args.input)
     if not input_path.exists():
         sys.exit(f"Error: path not found: {args.input}")
-    
+
     # Gather all image files to process
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
     images_to_process = []
-    
     if input_path.is_file():
-        if input_path.suffix.lower() in image_extensions:
+        if input_path.suffix.lower() in IMAGE_EXTENSIONS:
             images_to_process.append(input_path)
         else:
             sys.exit(f"Error: {args.input} is not a supported image format")
     elif input_path.is_dir():
         # Get all image files in the directory at start time (to avoid processing outputs)
-        for file in input_path.iterdir():
-            if file.is_file() and file.suffix.lower() in image_extensions:
-                images_to_process.append(file)
+        images_to_process = sorted(file for file in input_path.iterdir()
+                                   if file.is_file() and file.suffix.lower() in IMAGE_EXTENSIONS)
         if not images_to_process:
             sys.exit(f"Error: no image files found in directory: {args.input}")
         print(f"Found {len(images_to_process)} image(s) to process")
     else:
         sys.exit(f"Error: {args.input} is neither a file nor a directory")
-    
-    # Models to use
-    models = [
-        ("nano", "yolo26n.pt", "_1n"),
-        ("small", "yolo26s.pt", "_2s"),
-        ("medium", "yolo26m.pt", "_3m")
-    ]
-    
-    # Process each image with all models
-    for image_path in images_to_process:
-        print(f"\n{'='*60}")
-        print(f"Processing: {image_path.name}")
-        print(f"{'='*60}")
-        
-        for model_name, model_path, suffix in models:
+
+    models = MODELS
+    if args.models:
+        models = [(Path(m).stem, m, f"_{Path(m).stem}") for m in args.models.split(",")]
+
+    if args.eval:
+        labels_dir = args.labels or str(images_to_process[0].parent.parent / "labels")
+        if not Path(labels_dir).is_dir():
+            sys.exit(f"Error: label directory not found: {labels_dir} (use --labels)")
+        results = {}
+        for model_name, model_path, _ in models:
             if not Path(model_path).exists():
                 print(f"Warning: model {model_path} not found, skipping {model_name}")
                 continue
-                
-            print(f"\nAnalyzing with {model_name} model ({model_path})...")
-            
-            # Construct output filename
-            stem = image_path.stem
-            ext = image_path.suffix
-            output_filename = f"{stem}{suffix}{ext}"
-            output_path = image_path.parent / output_filename
-            
-            try:
-                analyze(str(image_path), model_path, args.size, str(output_path))
-            except Exception as e:
-                print(f"Error processing {image_path.name} with {model_name}: {e}")
-    
+            print(f"\nEvaluating {model_name} model ({model_path}) on {len(images_to_process)} image(s)...")
+            results[model_name] = evaluate_model(model_path, images_to_process, labels_dir, args.backend,
+                                                 args.threads, args.batch, args.workers, args.conf,
+                                                 args.nms_iou, args.imgsz)
+            print_eval(model_name, results[model_name])
+
+        print(f"\n{'model':<12} {'ms/img':>8} {'P':>6} {'R':>6} {'mAP50':>7} {'mAP50-95':>9}")
+        for model_name, s in sorted(results.items(), key=lambda item: item[1]["latency_ms"]):
+            print(f"{model_name:<12} {s['latency_ms']:>8.1f} {s['precision']:>6.3f} {s['recall']:>6.3f} "
+                  f"{s['map50']:>7.3f} {s['map50_95']:>9.3f}")
+        passing = [(s["latency_ms"], name) for name, s in results.items() if s["map50_95"] >= args.min_map]
+        if args.min_map and passing:
+            print(f"\nFastest model with mAP50-95 >= {args.min_map}: {min(passing)[1]}")
+        elif args.min_map:
+            print(f"\nNo model reaches mAP50-95 >= {args.min_map}")
+        sys.exit(0)
+
+    summaries = {}
+    for model_name, model_path, suffix in models:
+        if not Path(model_path).exists():
+            print(f"Warning: model {model_path} not found, skipping {model_name}")
+            continue
+        print(f"\nAnalyzing {len(images_to_process)} image(s) with {model_name} model ({model_path})...")
+        try:
+            summaries[model_name] = run_model(model_path, suffix, images_to_process, args.size, args.backend,
+                                              args.threads, args.batch, args.workers)
+        except Exception as e:
+            print(f"Error running {model_name}: {e}")
+
     print(f"\n{'='*60}")
-    print("Processing complete!")
+    print("Summary")
     print(f"{'='*60}")
+    for model_name, s in summaries.items():
+        rate = s["images"] / s["seconds"] if s["seconds"] else 0.0
+        print(f"\n{model_name}: {s['images']} image(s) in {s['seconds']:.1f}s ({rate:.1f} img/s), "
+              f"{s['detections']} detection(s), mean conf {s['mean_conf']:.2f}"
+              + (f", {s['failed']} unreadable" if s["failed"] else ""))
+        for name, count in s["counts"].most_common():
+            print(f"  {name:<16} {count}")